@@ -4,11 +4,12 @@ Handlers: маршрути простих команд пам'яті (суміс
 """
 
 try:
-    from memory.manager import MEMORY as memory
+    from memory.manager import MEMORY as memory  # лінивий: сховище читається при першому виклику
 except Exception:
     try:
+        from memory.lazy import LazyProxy
         from memory.manager import MemoryManager
-        memory = MemoryManager()
+        memory = LazyProxy(MemoryManager)
     except Exception:
         memory = None
 
@@ -1,26 +1,44 @@
 import difflib
+from main import memory_store
 from main.memory_store import list_memories
 from tools.emotion_config_loader import EMOTIONS
 from config.behavioral_styles import STYLES
+from memory.vector_index import CharNgramVectors
 
 def normalize_text(text):
     return str(text).lower().strip().replace("’", "'").replace("  ", " ")
 
-def vector_guessing(prompt):
-    """Пошук схожих думок із пам’яті для слабкої інтуїції."""
-    text = normalize_text(prompt)
-    memory = list_memories("thoughts")
-    matches = []
+# Кеш TF-IDF думок: (сигнал зміни, тексти, вектори) — перебудова лише при зміні пам'яті.
+# Сигнал — generation() сховища (один os.stat, без читання пам'яті); сховище без
+# generation() — відбиток самих текстів (читання пам'яті на кожен запит, але без перебудови).
+_VECTORS = (None, [], None)
 
-    for key, entries in memory.items():
-        for e in entries:
-            value = normalize_text(e.get("value", ""))
-            score = difflib.SequenceMatcher(None, text, value).ratio()
-            if 0.4 < score <= 0.6:
-                matches.append((score, value))
+def _thought_vectors():
+    global _VECTORS
+    generation = getattr(memory_store, "generation", None)
+    if generation is not None:
+        sig = ("gen", generation())
+        if _VECTORS[0] == sig:
+            return _VECTORS[1], _VECTORS[2]
+    memory = list_memories("thoughts")
+    values = [
+        normalize_text(e.get("value", ""))
+        for entries in memory.values() for e in entries
+    ]
+    if generation is None:
+        sig = ("hash", hash(tuple(values)))
+        if _VECTORS[0] == sig:
+            return _VECTORS[1], _VECTORS[2]
+    _VECTORS = (sig, values, CharNgramVectors(enumerate(values)))
+    return _VECTORS[1], _VECTORS[2]
 
-    matches.sort(reverse=True)
-    return matches[0][1] if matches else None
+def vector_guessing(prompt):
+    """Пошук схожих думок із пам’яті для слабкої інтуїції (косинус TF-IDF символьних n-грам)."""
+    text = normalize_text(prompt)
+    values, vectors = _thought_vectors()
+    # "слабка" схожість: схоже, але не та сама думка
+    matches = vectors.top_k(text, k=1, min_score=0.4, max_score=0.6)
+    return values[matches[0][0]] if matches else None
 
 def analyze_and_guess(prompt):
     text = normalize_text(prompt)
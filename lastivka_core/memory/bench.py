@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+bench.py — бенчмарк підсистеми пам'яті на синтетичних українських сховищах.
+
+    python -m lastivka_core.memory.bench --sizes 1k,10k,100k --out bench.json
+    python -m lastivka_core.memory.bench --sizes 10k --baseline bench.json
+
+Сховище відтворюване (seed): ключі — українські іменники в різних відмінках
+(одна лема під кількома ключами), словосполучення "прикметник + іменник",
+імена й міста (власні назви не стемляться), рубрики "тема/іменник" і довгий
+хвіст синтетичних основ із закінченнями; частоти — за Ципфом. У записах —
+речення з шаблонів, тон, теги, трійка (key, rel, obj) і час.
+Запити — інші словоформи тих самих лем, питання для ask і ключі з одруківками.
+
+Для кожного розміру: побудова MemoryIndex (с, приріст RSS), старт менеджера,
+перший пошук (з відкриттям індексу), p50/p99 smart_search / ask / find_thoughts
+і add_thought/с (журнальний режим). JSON містить коміт, Python і seed —
+результати різних комітів порівнювані; --baseline друкує відношення метрик.
+1M записів (--sizes 1m) потребує кількох ГБ RAM і хвилин на розмір.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import manager as _mgr
+from .index import MemoryIndex, normalize_key
+from .record import as_record
+from .storage import JsonStorage
+
+DEFAULT_SIZES = "1k,10k,100k"
+DEFAULT_SEED = 20250101
+# Часова шкала сховища фіксована: однаковий seed — однакові записи в будь-який день
+EPOCH = datetime(2025, 1, 1)
+SPAN_DAYS = 365
+
+# ===== Словник =====
+# Основи + закінчення відмінків; морфологія спрощена, але дає ті самі розбіжності
+# словоформ, що й справжні записи ("кава"/"каву"/"кавою").
+# Порядок форм іменника: називний, родовий, давальний, знахідний, орудний, місцевий,
+# непрямий відмінок множини
+NOM, GEN, DAT, ACC, INS, LOC, PL = range(7)
+_NOUN_CLASSES = (
+    # (основи, закінчення, рід: 0 — чоловічий, 1 — жіночий, 2 — середній)
+    ("кав вод книг робот школ кімнат машин ковбас сметан квартир дорог пошт аптек".split(),
+     ("а", "и", "і", "у", "ою", "і", "ами"), 1),
+    ("хліб сир мед звіт план банк лист проєкт телефон ремонт концерт магазин".split(),
+     ("", "а", "у", "", "ом", "і", "ів"), 0),
+    ("молок масл вікн міст сел озер яблук печив".split(),
+     ("о", "а", "у", "о", "ом", "і", "а"), 2),
+)
+_ADJ = "зелен чорн свіж гаряч нов стар смачн велик тепл холодн дорог важлив ранков солодк".split()
+# форми прикметника: називний ч/ж/с, знахідний ч/ж/с, родовий ч, множина
+_ADJ_END = ("ий", "а", "е", "ий", "у", "е", "ого", "і")
+_VERBS = (
+    ("купити", "купив", "купила", "купили"),
+    ("зробити", "зробив", "зробила", "зробили"),
+    ("подзвонити", "подзвонив", "подзвонила", "подзвонили"),
+    ("написати", "написав", "написала", "написали"),
+    ("прочитати", "прочитав", "прочитала", "прочитали"),
+    ("приготувати", "приготував", "приготувала", "приготували"),
+    ("забрати", "забрав", "забрала", "забрали"),
+    ("оплатити", "оплатив", "оплатила", "оплатили"),
+    ("замовити", "замовив", "замовила", "замовили"),
+    ("перевірити", "перевірив", "перевірила", "перевірили"),
+)
+# (ім'я, рід) — підмет речення; міста — лише ключі
+_PEOPLE = (("Олена", 1), ("Андрій", 0), ("Марія", 1), ("Тарас", 0), ("Оксана", 1), ("Богдан", 0),
+           ("Ірина", 1), ("Дмитро", 0))
+_NAMES = tuple(name for name, _ in _PEOPLE) + ("Київ", "Львів", "Одеса", "Харків")
+_TIMES = ("зранку", "ввечері", "завтра", "сьогодні", "у понеділок", "на вихідних", "після обіду", "вчора")
+_TOPICS = ("покупки", "справи", "дім", "робота", "здоров'я", "навчання")
+_TONES = ("нейтральний", "радість", "сум", "тривога", "натхнення")
+_TAGS = ("покупка", "напій", "їжа", "робота", "дім", "здоров'я", "навчання", "сім'я", "подорож", "магазин")
+_RELS = ("is", "має", "любить", "треба", "де")
+
+_CONS, _VOWS = "бвгджзклмнпрстфхцчшщ", "аеиіоуяюєї"
+_TAIL_END = ("", "а", "и", "у", "ом", "ою", "і", "ів", "ами", "ий", "ого")
+
+
+def _nouns() -> List[Tuple[Tuple[str, ...], int]]:
+    """Усі іменники: (словоформи у порядку NOM..PL, рід)."""
+    return [
+        (tuple(stem + e for e in ends), gender)
+        for stems, ends, gender in _NOUN_CLASSES for stem in stems
+    ]
+
+
+def _zipf_weights(n: int) -> List[float]:
+    """Накопичені ваги Ципфа для random.choices(cum_weights=...)."""
+    acc, out = 0.0, []
+    for r in range(n):
+        acc += 1.0 / (r + 1)
+        out.append(acc)
+    return out
+
+
+class _Vocab:
+    """Словоформи, ключі та шаблони речень для одного seed."""
+
+    def __init__(self, rnd: random.Random, n_tail: int) -> None:
+        self.rnd = rnd
+        self.nouns = _nouns()
+        rnd.shuffle(self.nouns)
+        self._noun_w = _zipf_weights(len(self.nouns))
+        self.adjs = [tuple(s + e for e in _ADJ_END) for s in _ADJ]
+        # довгий хвіст: синтетичні основи (як у бенчмарку стемера), щоб ключів вистачило на 1M
+        self.tail = [
+            "".join(rnd.choice(_CONS) + rnd.choice(_VOWS) for _ in range(rnd.randint(2, 4)))
+            for _ in range(n_tail)
+        ]
+        self._tail_w = _zipf_weights(n_tail)
+
+    def noun(self) -> Tuple[Tuple[str, ...], int]:
+        return self.rnd.choices(self.nouns, cum_weights=self._noun_w)[0]
+
+    def tail_words(self, k: int) -> List[str]:
+        return self.rnd.choices(self.tail, cum_weights=self._tail_w, k=k)
+
+    def adj(self) -> Tuple[str, ...]:
+        return self.rnd.choice(self.adjs)
+
+    def phrase(self, case: int = NOM) -> str:
+        """Прикметник + іменник, узгоджені в роді (називний або знахідний)."""
+        (forms, gender), adj = self.noun(), self.adj()
+        return f"{adj[gender + (3 if case == ACC else 0)]} {forms[case]}"
+
+    def key(self) -> str:
+        rnd = self.rnd
+        kind = rnd.random()
+        if kind < 0.35:
+            return rnd.choice(self.noun()[0])                    # будь-який відмінок
+        if kind < 0.50:
+            return self.phrase()
+        if kind < 0.58:
+            return rnd.choice(_NAMES)
+        if kind < 0.68:
+            return f"{rnd.choice(_TOPICS)}/{self.noun()[0][NOM]}"
+        return self.tail_words(1)[0] + rnd.choice(_TAIL_END)
+
+    def sentence(self) -> Tuple[str, str]:
+        """(текст, об'єкт трійки)."""
+        rnd = self.rnd
+        verb = rnd.choice(_VERBS)
+        obj = self.phrase()
+        form = rnd.randrange(4)
+        if form == 0:
+            text = f"{verb[0]} {self.phrase(ACC)} {rnd.choice(_TIMES)}"
+        elif form == 1:
+            name, gender = rnd.choice(_PEOPLE)
+            text = f"{name} {verb[1 + gender]} {self.noun()[0][ACC]} і {self.noun()[0][ACC]}"
+        elif form == 2:
+            text = f"не забути {verb[0]} {self.noun()[0][ACC]} та {self.noun()[0][PL]} {rnd.choice(_TIMES)}"
+        else:
+            text = f"{obj} {' '.join(self.tail_words(rnd.randint(1, 4)))}"
+        return text, obj
+
+
+def synthetic_memory(n: int, seed: int = DEFAULT_SEED) -> Dict[str, List[dict]]:
+    """Відтворюване сховище з n записів: key_norm -> [записи у форматі JSON-сховища]."""
+    rnd = random.Random(seed)
+    vocab = _Vocab(rnd, n_tail=max(200, min(n // 4, 50_000)))
+    step = SPAN_DAYS * 86400.0 / max(n, 1)
+    memory: Dict[str, List[dict]] = {}
+    for i in range(n):
+        key_raw = vocab.key()
+        key_norm = normalize_key(key_raw)
+        text, obj = vocab.sentence()
+        ts = EPOCH + timedelta(seconds=i * step + rnd.random() * step)
+        memory.setdefault(key_norm, []).append({
+            "key_raw": key_raw,
+            "key_norm": key_norm,
+            "text": text,
+            "tone": rnd.choice(_TONES),
+            "timestamp": ts.isoformat(timespec="seconds"),
+            "tags": rnd.sample(_TAGS, rnd.choice((0, 1, 1, 2, 3))),
+            "rel": None,
+            "triple": [key_norm, rnd.choice(_RELS), obj],
+        })
+    return memory
+
+
+def synthetic_queries(n: int, seed: int = DEFAULT_SEED) -> Dict[str, List[str]]:
+    """Різні запити (кеш не допомагає): smart — інші словоформи, ask — питання, find — ключі з одруківками."""
+    rnd = random.Random(seed + 1)
+    vocab = _Vocab(rnd, n_tail=200)
+    smart: Dict[str, None] = {}
+    ask: Dict[str, None] = {}
+    find: Dict[str, None] = {}
+    for _ in range(n * 50):
+        if len(smart) >= n and len(ask) >= n and len(find) >= n:
+            break
+        (noun, gender), adj, verb = vocab.noun(), vocab.adj(), rnd.choice(_VERBS)
+        if len(smart) < n:
+            smart[rnd.choice((
+                f"{verb[0]} {noun[GEN]}",
+                vocab.phrase(rnd.choice((NOM, ACC))),
+                f"{rnd.choice(_PEOPLE)[0]} {rnd.choice(verb[1:])}",
+                f"{rnd.choice(noun)} {rnd.choice(_TIMES)}",
+            ))] = None
+        if len(ask) < n:
+            ask[rnd.choice((
+                f"що в мене {adj[gender]}?",
+                f"що я казав про {noun[ACC]}?",
+                f"що я тобі казав {verb[0]}?",
+                f"що було {rnd.choice(_TIMES)} про {noun[ACC]}?",
+                f"де {noun[NOM]}?",
+            ))] = None
+        if len(find) < n:
+            word = rnd.choice(noun)
+            if rnd.random() < 0.5 and len(word) > 3:
+                j = rnd.randrange(1, len(word) - 1)
+                word = word[:j] + word[j + 1] + word[j] + word[j + 2:]  # перестановка літер
+            find[word] = None
+    return {"smart": list(smart), "ask": list(ask), "find": list(find)}
+
+
+# ===== Вимірювання =====
+def _rss_mb() -> Optional[float]:
+    """Поточний RSS процесу (МБ): psutil, /proc або пік із resource; None — невідомо."""
+    try:
+        import psutil  # type: ignore
+        return psutil.Process().memory_info().rss / (1024 ** 2)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 ** 2)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 ** 2 if platform.system() == "Darwin" else 1024)
+    except Exception:
+        return None
+
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, Optional[float]]:
+    if not samples_ms:
+        return {"n": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    s = sorted(samples_ms)
+
+    def rank(q: float) -> float:  # nearest-rank
+        return s[min(len(s) - 1, max(0, int(round(q * len(s) + 0.5)) - 1))]
+
+    return {"n": len(s), "p50_ms": round(rank(0.50), 4), "p99_ms": round(rank(0.99), 4), "max_ms": round(s[-1], 4)}
+
+
+def _timed(fn: Callable[[str], Any], queries: Sequence[str]) -> Dict[str, Optional[float]]:
+    clock = time.perf_counter
+    samples: List[float] = []
+    for q in queries:
+        t0 = clock()
+        fn(q)
+        samples.append((clock() - t0) * 1000.0)
+    return _percentiles(samples)
+
+
+@contextmanager
+def _store_at(path: Path) -> Iterator[None]:
+    """Тимчасово направити MemoryManager на файли бенчмарку (як фікстура store у тестах)."""
+    names = ("CONFIG_FILE", "INDEX_FILE", "JOURNAL_FILE", "SNAPSHOT_FILE")
+    saved = {name: getattr(_mgr, name) for name in names}
+    _mgr.CONFIG_FILE = path
+    _mgr.INDEX_FILE = path.with_suffix(".idx")
+    _mgr.JOURNAL_FILE = path.with_suffix(".journal")
+    _mgr.SNAPSHOT_FILE = path.with_suffix(".snap")
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(_mgr, name, value)
+
+
+def run_size(
+    n: int,
+    *,
+    seed: int = DEFAULT_SEED,
+    queries: int = 200,
+    adds: int = 500,
+    workdir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Усі метрики для сховища з n записів."""
+    clock = time.perf_counter
+    t0 = clock()
+    raw = synthetic_memory(n, seed)
+    qs = synthetic_queries(queries, seed)
+    res: Dict[str, Any] = {
+        "records": n,
+        "keys": len(raw),
+        "generate_s": round(clock() - t0, 4),
+    }
+
+    # 1) MemoryIndex на записах у RAM (як у менеджері)
+    memory = {k: [as_record(r) for r in v] for k, v in raw.items()}
+    rss0 = _rss_mb()
+    t0 = clock()
+    idx = MemoryIndex(memory)
+    res["index_build_s"] = round(clock() - t0, 4)
+    rss1 = _rss_mb()
+    res["index_rss_mb"] = round(rss1 - rss0, 2) if rss0 is not None and rss1 is not None else None
+    res["postings"] = sum(len(p) for p in idx.inv.values())
+    idx.close()
+    del idx, memory
+
+    # 2) MemoryManager над JSON-файлом (журнальний режим: add_thought не переписує весь файл)
+    with tempfile.TemporaryDirectory(prefix="lastivka-bench-", dir=workdir) as tmp:
+        path = Path(tmp) / "memory_store.json"
+        JsonStorage(path).save(raw, {}, {})
+        res["store_mb"] = round(path.stat().st_size / (1024 ** 2), 2)
+        del raw
+        with _store_at(path):
+            t0 = clock()
+            mm = _mgr.MemoryManager(journal=True)
+            res["load_s"] = round(clock() - t0, 4)
+            try:
+                t0 = clock()
+                mm.smart_search(qs["smart"][0])
+                res["first_search_ms"] = round((clock() - t0) * 1000.0, 3)
+                res["smart_search"] = _timed(mm.smart_search, qs["smart"][1:])
+                res["ask"] = _timed(mm.ask, qs["ask"])
+                res["find_thoughts"] = _timed(mm.find_thoughts, qs["find"])
+                res["search_stages"] = {
+                    name: {"ms_avg": row["ms_avg"], "p99_ms": row["p99_ms"]}
+                    for name, row in mm.search_stats()["stages"].items()
+                }
+
+                rnd = random.Random(seed + 2)
+                vocab = _Vocab(rnd, n_tail=200)
+                t0 = clock()
+                mm.add_thought("бенчмарк", "перший запис бенчмарку")  # будує індекси дублікатів
+                res["first_add_ms"] = round((clock() - t0) * 1000.0, 3)
+                accepted = 0
+                t0 = clock()
+                for i in range(adds):
+                    text, _ = vocab.sentence()
+                    accepted += mm.add_thought(vocab.key(), f"{text} {i}", tone=rnd.choice(_TONES))
+                dt = clock() - t0
+                res["add_thought"] = {
+                    "n": adds,
+                    "accepted": accepted,
+                    "per_s": round(adds / dt, 1) if dt > 0 else None,
+                }
+            finally:
+                mm.close()
+    rss = _rss_mb()
+    res["rss_mb"] = round(rss, 2) if rss is not None else None
+    return res
+
+
+def parse_sizes(spec: str) -> List[int]:
+    """"1k,10k,100k,1m" -> [1000, 10000, 100000, 1000000]."""
+    out: List[int] = []
+    for part in spec.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        mult = {"k": 1_000, "m": 1_000_000}.get(part[-1], 1)
+        out.append(int(float(part[:-1] if mult > 1 else part) * mult))
+    return out
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(Path(__file__).resolve().parent),
+            capture_output=True, text=True, timeout=10, check=True,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(
+    sizes: Sequence[int],
+    *,
+    seed: int = DEFAULT_SEED,
+    queries: int = 200,
+    adds: int = 500,
+    workdir: Optional[Path] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Бенчмарк усіх розмірів; результат — JSON-сумісний dict (meta + results)."""
+    out: Dict[str, Any] = {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "queries": queries,
+            "adds": adds,
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": [],
+    }
+    for n in sizes:
+        if log:
+            log(f"[bench] {n} записів...")
+        out["results"].append(run_size(n, seed=seed, queries=queries, adds=adds, workdir=workdir))
+    return out
+
+
+# Метрики для порівняння з --baseline: (шлях, більше = краще)
+_COMPARE = (
+    ("index_build_s", False), ("index_rss_mb", False), ("load_s", False), ("first_search_ms", False),
+    ("smart_search.p50_ms", False), ("smart_search.p99_ms", False),
+    ("ask.p50_ms", False), ("ask.p99_ms", False),
+    ("find_thoughts.p50_ms", False), ("find_thoughts.p99_ms", False),
+    ("first_add_ms", False), ("add_thought.per_s", True),
+)
+
+
+def _get(d: Dict[str, Any], path: str) -> Optional[float]:
+    for part in path.split("."):
+        if not isinstance(d, dict):
+            return None
+        d = d.get(part)
+    return d if isinstance(d, (int, float)) else None
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Рядки (records, metric, old, new, ratio); ratio > 1 — стало краще."""
+    rows: List[Dict[str, Any]] = []
+    base = {r.get("records"): r for r in old.get("results", [])}
+    for cur in new.get("results", []):
+        prev = base.get(cur["records"])
+        if prev is None:
+            continue
+        for path, higher_better in _COMPARE:
+            a, b = _get(prev, path), _get(cur, path)
+            if a is None or b is None or not a or not b:
+                continue
+            rows.append({
+                "records": cur["records"], "metric": path, "old": a, "new": b,
+                "ratio": round(b / a if higher_better else a / b, 3),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    p = argparse.ArgumentParser(description="Бенчмарк пам'яті на синтетичних українських сховищах")
+    p.add_argument("--sizes", type=str, default=DEFAULT_SIZES, help="напр. 1k,10k,100k,1m")
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.add_argument("--queries", type=int, default=200, help="різних запитів на кожен тип")
+    p.add_argument("--adds", type=int, default=500)
+    p.add_argument("--workdir", type=str, default=None, help="каталог для тимчасових сховищ")
+    p.add_argument("--out", type=str, default=None, help="записати JSON у файл (інакше — stdout)")
+    p.add_argument("--baseline", type=str, default=None, help="JSON попереднього запуску для порівняння")
+    args = p.parse_args()
+
+    result = run(
+        parse_sizes(args.sizes), seed=args.seed, queries=args.queries, adds=args.adds,
+        workdir=Path(args.workdir) if args.workdir else None,
+        log=lambda msg: print(msg, file=sys.stderr),
+    )
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline:
+        old = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if old.get("meta", {}).get("seed") != args.seed:
+            print("[bench] увага: інший seed — сховища не однакові", file=sys.stderr)
+        for row in compare(result, old):
+            print(f"{row['records']:>9} {row['metric']:<22} {row['old']:>12g} -> {row['new']:<12g} x{row['ratio']}",
+                  file=sys.stderr)
@@ -1,8 +1,30 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+import heapq
+import math
+import os
 import re
+import time
+from array import array
+from collections.abc import Mapping
 from difflib import SequenceMatcher
-from typing import Dict, List, Tuple, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Tuple, Optional, Union
+
+from .key_index import KeyIndex
+from .record import iso_to_ts
+from .search_stats import SearchProfile, SearchStats
+from .stemmer import SuffixStemmer
+from .index_file import (
+    IndexFileError, MappedPostings, OverlayPostings, memory_fingerprint, read_header, write_index,
+)
+
+if TYPE_CHECKING:  # vector_index (і NumPy) імпортуються при першому векторному запиті
+    from .vector_index import CharNgramVectors
+
+# Файл індексу для CLI (rebuild/verify/compact)
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = Path(os.getenv("LASTIVKA_MEMORY_INDEX", ROOT.parent / "indices" / "memory.idx"))
 
 # ===== Нормалізація / токенізація =====
 UA_ALNUM = r"a-zA-Zа-щА-ЩЬьЮюЯяІіЇїЄєҐґ0-9"
@@ -11,17 +33,12 @@ _UA_ENDINGS = (
     "ями", "ами", "ові", "еві", "ах", "ях", "ів", "іїв", "ей", "ій", "ам", "ям",
     "ою", "ею", "ом", "ем", "у", "ю", "і", "ї", "я", "а", "о", "е"
 )
+# Власний набір закінчень індексу (стеми потрапляють у файл індексу — не змінювати мовчки)
+_STEMMER = SuffixStemmer(_UA_ENDINGS)
 
 def _ua_stem(w: str) -> str:
-    """Stem Ukrainian words, preserving proper nouns."""
-    w = (w or "").lower().replace("’", "'").strip()
-    # Preserve proper nouns (starting with a capital letter in original)
-    if w and w[0].isupper():
-        return w
-    for suf in sorted(_UA_ENDINGS, key=len, reverse=True):
-        if w.endswith(suf) and len(w) > len(suf) + 1:
-            return w[:-len(suf)]
-    return w
+    """Stem Ukrainian words (compiled suffix trie + LRU cache)."""
+    return _STEMMER.stem(w or "")
 
 def normalize(text: str) -> str:
     return CLEAN_RE.sub(" ", (text or "").lower()).strip()
@@ -38,11 +55,19 @@ def tokenize(text: str) -> List[str]:
     return [t for t in normalize(text).split() if t and len(t) > 1]
 
 def stem_token(tok: str) -> str:
-    return _ua_stem(tok or "")
+    return _STEMMER.stem(tok or "")
+
+def stem_many(toks) -> List[str]:
+    return _STEMMER.stem_many(toks)
 
 def fuzzy(a: str, b: str) -> float:
     return SequenceMatcher(None, a, b).ratio()
 
+def _key_match_terms(key: str) -> Tuple[set[str], set[str]]:
+    """(токени, стеми) ключа для стадії 0 пошуку."""
+    k_tokens = set(tokenize(key))
+    return k_tokens, {stem_token(t) for t in k_tokens} | {stem_token(key)}
+
 # ===== Допоміжне: нормалізація та мердж формату пам'яті =====
 def _normalize_memory_dict(raw: dict) -> Dict[str, List[dict]]:
     """
@@ -70,78 +95,599 @@ def _normalize_memory_dict(raw: dict) -> Dict[str, List[dict]]:
 
 def _merge_mem_dicts(a: dict, b: dict) -> dict:
     """
-    Об'єднати два словники пам'яті формату dict[str] -> list[dict] з
-    простим дедупом за ('text' або 'value', 'tone').
+    Об'єднати два словники пам'яті формату dict[str] -> list[dict] за один прохід
+    з простим дедупом за ('text' або 'value', 'tone') у межах ключа.
     """
     out: Dict[str, List[dict]] = {}
+    seen: Dict[str, set] = {}
     for src in (a or {}), (b or {}):
         for k, arr in src.items():
             if not isinstance(arr, list):
                 continue
             bucket = out.setdefault(k, [])
-            seen = {
-                (
-                    (x.get("text") or x.get("value") or "").strip().lower(),
-                    (x.get("tone") or "").strip().lower()
-                )
-                for x in bucket if isinstance(x, dict)
-            }
+            sigs = seen.setdefault(k, set())
             for rec in arr:
-                if not isinstance(rec, dict):
+                if not isinstance(rec, Mapping):
                     continue
-                sig = (
-                    (rec.get("text") or rec.get("value") or "").strip().lower(),
-                    (rec.get("tone") or "").strip().lower()
-                )
-                if sig not in seen:
+                text = rec.get("text") or rec.get("value") or ""
+                sig = (text.strip().lower(), (rec.get("tone") or "").strip().lower())
+                if sig not in sigs:
                     bucket.append(rec)
-                    seen.add(sig)
+                    sigs.add(sig)
     return out
 
 # ===== Індекс =====
+def _record_text(t: Mapping) -> str:
+    return t.get("text", "") or t.get("value", "") or ""
+
+def _record_ts(t: Mapping) -> float:
+    """Числовий час запису (MemoryRecord.ts або розібраний ISO); NaN — невідомо."""
+    ts = getattr(t, "ts", None)
+    if ts is None:
+        ts = iso_to_ts(t.get("timestamp"))
+    return math.nan if ts is None else float(ts)
+
+# Поля BM25 у порядку зберігання статистики: key, text, obj
+_BM25_FIELDS = ("key", "text", "obj")
+
+# Компакція tombstones: не раніше ніж набереться стільки видалених записів
+_COMPACT_MIN_DEAD = 256
+_COMPACT_RATIO = 0.2
+
+# "Немає запису" у масивах record id
+_NO_ID = 0xFFFFFFFF
+
+# Скільки RecordFeatures тримати в RAM (решта рахується при зверненні)
+FEATURE_CACHE = int(os.getenv("LASTIVKA_INDEX_FEATURE_CACHE", "20000"))
+
+class RecordFeatures(NamedTuple):
+    """Передобчислені ознаки запису для скорингу (рахуються один раз при індексації)."""
+    text_n: str
+    tokens: FrozenSet[str]
+    stems: FrozenSet[str]
+    fuzzy_s: str                      # text_n[:256] для SequenceMatcher
+    obj_n: Optional[str]              # None, якщо triple відсутній
+    obj_tokens: FrozenSet[str]
+    obj_stems: FrozenSet[str]
+    text_len: int                     # довжини полів (у токенах) для BM25
+    obj_len: int
+
+    @classmethod
+    def of(cls, t: dict) -> "RecordFeatures":
+        # текст запису (підтримуємо 'text' і 'value')
+        text = t.get("text", "") or t.get("value", "") or ""
+        text_n = normalize(text)
+        text_list = tokenize(text_n)
+        tokens = frozenset(text_list)
+        obj_n: Optional[str] = None
+        obj_list: List[str] = []
+        tri = t.get("triple")
+        if tri and isinstance(tri, (list, tuple)) and len(tri) == 3:
+            obj_n = normalize(tri[2] or "")
+            obj_list = tokenize(obj_n)
+        obj_tokens = frozenset(obj_list)
+        return cls(
+            text_n=text_n,
+            tokens=tokens,
+            stems=frozenset(stem_many(tokens)),
+            fuzzy_s=text_n[:256],
+            obj_n=obj_n,
+            obj_tokens=obj_tokens,
+            obj_stems=frozenset(stem_many(obj_tokens)),
+            text_len=len(text_list),
+            obj_len=len(obj_list),
+        )
+
+
 class MemoryIndex:
-    def __init__(self, memory: Optional[Dict[str, List[dict]]] = None) -> None:
-        self.memory: Dict[str, List[dict]] = memory or {}
-        self.inv: Dict[str, List[Tuple[str, int]]] = {}
-        self._build()
+    def __init__(self, memory: Optional[Dict[str, List[dict]]] = None, *, build: bool = True) -> None:
+        self.memory: Dict[str, List[dict]] = memory if memory is not None else {}
+        # постинги: token -> зростаючі record id (array('I'), 4 байти на постинг)
+        self.inv: Dict[str, array] = {}
+        self.path: Optional[Path] = None
+        # таблиця записів: record id -> (self._kname[rec_kid[id]], rec_idx[id])
+        self._kname: List[str] = []
+        self._kid: Dict[str, int] = {}
+        self._rec_kid = array("I")
+        self._rec_idx = array("I")
+        # час запису (epoch; NaN — без часу) для recency-бусту
+        self._rec_ts = array("d")
+        # key -> record id кожного запису ключа (за позицією у списку; _NO_ID — не індексовано)
+        self._key_ids: Dict[str, array] = {}
+        # tombstones: id видалених записів (їхні постинги прибираються в compact())
+        self._dead: set[int] = set()
+        self._n_live = 0
+        # обмежений кеш ознак записів: record id -> RecordFeatures
+        self._feat: Dict[int, RecordFeatures] = {}
+        # BM25: сумарні довжини полів [key, text, obj] живих записів; кеш токенів ключів
+        self._len_sum: List[int] = [0, 0, 0]
+        self._ktok: Dict[str, Tuple[FrozenSet[str], int]] = {}
+        # індекс ключів: exact/prefix/fuzzy по normalize_key та токени ключів
+        self._keys = KeyIndex(norm=normalize_key, tokens=_key_match_terms)
+        # TF-IDF символьних n-грам текстів (будується при першому запиті з text_vector)
+        self._vec: Optional[CharNgramVectors] = None
+        # статистика стадій останнього пошуку; profile — накопичувач гістограм (задає власник)
+        self.last_stats: Optional[SearchStats] = None
+        self.profile: Optional[SearchProfile] = None
+        if build:
+            self._build()
+
+    @staticmethod
+    def _key_tokens(k: str) -> set[str]:
+        # токени + стеми з ключа
+        k_tokens = set(tokenize(k))
+        k_tokens |= {stem_token(t) for t in k_tokens}
+        return k_tokens
+
+    @staticmethod
+    def _record_tokens(f: RecordFeatures, k_tokens: set[str]) -> set[str]:
+        # текст + triple.obj, їхні стеми та токени ключа
+        tokens = set(f.tokens | f.obj_tokens | f.stems | f.obj_stems)
+        tokens |= k_tokens
+        tokens.discard("")
+        return tokens
+
+    def _key_field(self, key: str) -> Tuple[FrozenSet[str], int]:
+        """(токени+стеми ключа, довжина ключа у токенах) — кешується per key."""
+        kf = self._ktok.get(key)
+        if kf is None:
+            k_list = tokenize(key)
+            kf = self._ktok[key] = (frozenset(self._key_tokens(key)), len(k_list))
+        return kf
+
+    def _account(self, key: str, f: RecordFeatures, sign: int) -> None:
+        self._n_live += sign
+        self._len_sum[0] += sign * self._key_field(key)[1]
+        self._len_sum[1] += sign * f.text_len
+        self._len_sum[2] += sign * f.obj_len
+
+    def _pair(self, rid: int) -> Tuple[str, int]:
+        return self._kname[self._rec_kid[rid]], self._rec_idx[rid]
+
+    def _ids_of(self, key: str) -> Iterator[int]:
+        for rid in self._key_ids.get(key, ()):
+            if rid != _NO_ID:
+                yield rid
+
+    def _features(self, rid: int) -> RecordFeatures:
+        """Ознаки запису з кешу; рахуються при першому зверненні (кеш обмежений FEATURE_CACHE)."""
+        f = self._feat.get(rid)
+        if f is None:
+            key, i = self._pair(rid)
+            f = RecordFeatures.of(self.memory[key][i])
+            if len(self._feat) >= FEATURE_CACHE:
+                # FIFO-витіснення: найстаріший запис кешу
+                del self._feat[next(iter(self._feat))]
+            self._feat[rid] = f
+        return f
+
+    def _new_rid(self, key: str, i: int, t: Mapping) -> int:
+        kid = self._kid.get(key)
+        if kid is None:
+            kid = self._kid[key] = len(self._kname)
+            self._kname.append(key)
+        rid = len(self._rec_kid)
+        self._rec_kid.append(kid)
+        self._rec_idx.append(i)
+        self._rec_ts.append(_record_ts(t))
+        ids = self._key_ids.get(key)
+        if ids is None:
+            ids = self._key_ids[key] = array("I")
+        if i < len(ids):
+            ids[i] = rid
+        else:
+            ids.extend([_NO_ID] * (i - len(ids)))
+            ids.append(rid)
+        return rid
+
+    def _post(self, rid: int, tokens) -> None:
+        inv = self.inv
+        if isinstance(inv, MappedPostings):
+            inv = self.inv = OverlayPostings(inv)
+        if isinstance(inv, OverlayPostings):
+            for tok in tokens:
+                inv.append(tok, rid)
+            return
+        for tok in tokens:
+            plist = inv.get(tok)
+            if plist is None:
+                inv[tok] = array("I", (rid,))
+            else:
+                plist.append(rid)
+
+    def _reset(self) -> None:
+        self._release()
+        self.inv = {}
+        self._kname = []
+        self._kid = {}
+        self._rec_kid = array("I")
+        self._rec_idx = array("I")
+        self._rec_ts = array("d")
+        self._key_ids = {}
+        self._dead = set()
+        self._feat = {}
+        self._ktok = {}
+        self._n_live = 0
+        self._len_sum = [0, 0, 0]
+        self._keys.clear()
+        self._vec = None
 
     def _build(self) -> None:
-        self.inv.clear()
+        self._reset()
+        self._keys.update(k for k, thoughts in self.memory.items() if isinstance(thoughts, list))
         for k, thoughts in self.memory.items():
             if not isinstance(thoughts, list):
                 continue
-            # токени + стеми з ключа
-            k_tokens = set(tokenize(k))
-            k_tokens |= {stem_token(t) for t in k_tokens}
+            k_tokens = set(self._key_field(k)[0])
             for i, t in enumerate(thoughts):
-                if not isinstance(t, dict):
+                if not isinstance(t, Mapping):
                     continue
-                tokens: set[str] = set()
-                # текст запису (підтримуємо 'text' і 'value')
-                text = t.get("text", "") or t.get("value", "") or ""
-                tokens |= set(tokenize(text))
-                # triple.obj → індексуємо
-                tri = t.get("triple")
-                if tri and isinstance(tri, (list, tuple)) and len(tri) == 3:
-                    obj = tri[2] or ""
-                    tokens |= set(tokenize(obj))
-                # додати стеми та токени ключа
-                tokens |= {stem_token(tt) for tt in tokens}
-                tokens |= k_tokens
-                for tok in tokens:
-                    if tok:
-                        self.inv.setdefault(tok, []).append((k, i))
+                f = RecordFeatures.of(t)
+                rid = self._new_rid(k, i, t)
+                if len(self._feat) < FEATURE_CACHE:
+                    self._feat[rid] = f
+                self._post(rid, self._record_tokens(f, k_tokens))
+                self._account(k, f, +1)
 
     def build(self) -> None:
         self._build()
 
-    def search(
+    # --- Інкрементальні зміни ---
+    def add_record(self, key: str, i: int) -> None:
+        """Доіндексувати запис self.memory[key][i]: O(токенів запису)."""
+        t = self.memory[key][i]
+        if not isinstance(t, Mapping):
+            return
+        ids = self._key_ids.get(key)
+        if ids is not None and i < len(ids) and ids[i] != _NO_ID and ids[i] not in self._dead:
+            # позицію перезаписано без remove_key — старий id стає tombstone
+            old = ids[i]
+            self._dead.add(old)
+            if self._vec is not None:
+                self._vec.discard(old)
+            f_old = self._feat.pop(old, None)
+            if f_old is not None:
+                self._account(key, f_old, -1)
+        self._keys.add(key)
+        f = RecordFeatures.of(t)
+        rid = self._new_rid(key, i, t)
+        if len(self._feat) < FEATURE_CACHE:
+            self._feat[rid] = f
+        self._post(rid, self._record_tokens(f, set(self._key_field(key)[0])))
+        self._account(key, f, +1)
+        if self._vec is not None:
+            self._vec.add(rid, _record_text(t))
+
+    def remove_key(self, key: str) -> None:
+        """Позначити всі записи ключа як видалені (викликати ДО видалення з пам'яті)."""
+        thoughts = self.memory.get(key)
+        ids = self._key_ids.pop(key, None)
+        if not isinstance(thoughts, list) or ids is None:
+            self._keys.discard(key)
+            return
+        for i, rid in enumerate(ids):
+            if rid == _NO_ID or rid in self._dead or i >= len(thoughts):
+                continue
+            f = self._feat.pop(rid, None) or RecordFeatures.of(thoughts[i])
+            self._dead.add(rid)
+            self._account(key, f, -1)
+            if self._vec is not None:
+                self._vec.discard(rid)
+        self._keys.discard(key)
+
+    def clear(self) -> None:
+        self._reset()
+
+    def needs_compaction(self) -> bool:
+        return len(self._dead) >= max(_COMPACT_MIN_DEAD, int(self._n_live * _COMPACT_RATIO))
+
+    def compact(self) -> int:
+        """
+        Переписати постинги без видалених записів і перенумерувати record id щільно
+        (0..n_live-1, у порядку старих id — постинги лишаються відсортованими).
+        Повертає кількість прибраних записів.
+        """
+        dead = self._dead
+        n = len(dead)
+        if not n:
+            return 0
+        remap = array("I", [_NO_ID]) * len(self._rec_kid)
+        kname: List[str] = []
+        kid_of: Dict[str, int] = {}
+        rec_kid, rec_idx, rec_ts = array("I"), array("I"), array("d")
+        for old, (okid, idx, ts) in enumerate(zip(self._rec_kid, self._rec_idx, self._rec_ts)):
+            if old in dead:
+                continue
+            key = self._kname[okid]
+            kid = kid_of.get(key)
+            if kid is None:
+                kid = kid_of[key] = len(kname)
+                kname.append(key)
+            remap[old] = len(rec_kid)
+            rec_kid.append(kid)
+            rec_idx.append(idx)
+            rec_ts.append(ts)
+        inv: Dict[str, array] = {}
+        for tok, plist in self.inv.items():
+            kept = array("I", [remap[r] for r in plist if remap[r] != _NO_ID])
+            if kept:
+                inv[tok] = kept
+        self._release()  # постинги файлу (і дельта над ними) тепер цілком у RAM
+        self.inv = inv
+        self._key_ids = {
+            key: array("I", [_NO_ID if r == _NO_ID else remap[r] for r in ids])
+            for key, ids in self._key_ids.items()
+        }
+        self._feat = {remap[r]: f for r, f in self._feat.items() if remap[r] != _NO_ID}
+        self._kname, self._kid = kname, kid_of
+        self._rec_kid, self._rec_idx, self._rec_ts = rec_kid, rec_idx, rec_ts
+        self._dead = set()
+        self._vec = None  # id змінились
+        return n
+
+    # --- On-disk (mmap) ---
+    def _release(self) -> None:
+        if isinstance(self.inv, (MappedPostings, OverlayPostings)):
+            self.inv.close()
+
+    def _materialize(self) -> None:
+        """Перенести постинги з mmap (разом із дельтою) у RAM — перед перезаписом того ж файлу."""
+        if isinstance(self.inv, (MappedPostings, OverlayPostings)):
+            inv = {tok: self.inv[tok] for tok in self.inv}
+            self.inv.close()
+            self.inv = inv
+
+    def load(self, path: Path, fingerprint: Optional[bytes] = None) -> bool:
+        """
+        Підняти індекс із файлу, якщо його відбиток збігається з поточною пам'яттю.
+        fingerprint — відбиток стану від власника пам'яті (state_fingerprint: stamp сховища +
+        seq журналу, O(1)); без нього рахується memory_fingerprint() по всіх записах.
+        """
+        try:
+            mapped = MappedPostings(path)
+        except (OSError, IndexFileError):
+            return False
+        fingerprint = fingerprint or memory_fingerprint(self.memory)
+        if mapped.fingerprint != fingerprint:
+            mapped.close()
+            return False
+        self._reset()
+        self.inv = mapped
+        self.path = Path(path)
+        self._kname = list(mapped.key_names)
+        self._kid = {k: i for i, k in enumerate(self._kname)}
+        self._rec_kid, self._rec_idx, self._rec_ts = mapped.rec_kid, mapped.rec_idx, mapped.rec_ts
+        for rid, (kid, i) in enumerate(zip(self._rec_kid, self._rec_idx)):
+            key = self._kname[kid]
+            ids = self._key_ids.get(key)
+            if ids is None:
+                ids = self._key_ids[key] = array("I")
+            if i < len(ids):
+                ids[i] = rid
+            else:
+                ids.extend([_NO_ID] * (i - len(ids)))
+                ids.append(rid)
+        self._n_live, *lens = mapped.stats
+        self._len_sum = list(lens)
+        self._keys.update(k for k, thoughts in self.memory.items() if isinstance(thoughts, list))
+        return True
+
+    def save(self, path: Path, fingerprint: Optional[bytes] = None) -> bool:
+        """Записати індекс; fingerprint — відбиток поточного стану пам'яті (див. load())."""
+        path = Path(path)
+        if isinstance(self.inv, (MappedPostings, OverlayPostings)) and self.inv.path == path:
+            self._materialize()
+        self.compact()
+        fingerprint = fingerprint or memory_fingerprint(self.memory)
+        try:
+            write_index(path, self.inv, (self._kname, self._rec_kid, self._rec_idx, self._rec_ts),
+                        fingerprint, (self._n_live, *self._len_sum))
+        except OSError:
+            return False
+        self.path = path
+        return True
+
+    @classmethod
+    def open(
+        cls, memory: Dict[str, List[dict]], path: Path, fingerprint: Optional[bytes] = None,
+    ) -> "MemoryIndex":
+        """Завантажити індекс із диска, або перебудувати й зберегти, якщо файл застарів."""
+        idx = cls(memory, build=False)
+        if not idx.load(path, fingerprint):
+            idx._build()
+            idx.save(path, fingerprint)
+        return idx
+
+    def close(self) -> None:
+        self._release()
+
+    def _score_classic(
+        self,
+        q_text: str,
+        q_key: str,
+        q_tokens: set[str],
+        q_stems: set[str],
+        W: dict,
+        candidates: Dict[int, float],
+        limit: Optional[int] = None,
+        boost: Optional[Callable[[int], float]] = None,
+        stats: Optional[SearchStats] = None,
+    ) -> None:
+        # boost(rid) — добавка до остаточної оцінки (recency, text_vector); додається в _candidates,
+        # а тут лише враховується у межах відсікання top-k
+        stats = stats if stats is not None else SearchStats()
+        clock = time.perf_counter
+        # 0) збіг токенів/стемів КЛЮЧА з токенами запиту
+        st = stats.stage("key_token")
+        t0 = clock()
+        for key in self._keys.token_match(q_tokens, q_stems):
+            for rid in self._ids_of(key):
+                st.postings += 1
+                candidates[rid] = max(candidates.get(rid, 0.0), W["key_token"])
+        st.candidates = st.postings  # record id ключа трапляється один раз
+        st.ms = (clock() - t0) * 1000.0
+        # 1) матчі по ключу: exact / prefix / fuzzy — з індексу ключів
+        st = stats.stage("key_fuzzy")
+        t0 = clock()
+        ratio_calls = self._keys.ratio_calls
+        key_base: Dict[str, float] = {}
+        if W["fuzzy"] > 0:
+            for key, r in self._keys.fuzzy(q_key, 20.0 / W["fuzzy"], cut=64):
+                key_base[key] = W["fuzzy"] * r
+        for key in self._keys.prefix(q_key):
+            key_base[key] = W["prefix"]
+        for key in self._keys.exact(q_key):
+            key_base[key] = W["exact"]
+        for key, base in key_base.items():
+            if base >= 20.0:
+                for rid in self._ids_of(key):
+                    st.postings += 1
+                    candidates[rid] = max(candidates.get(rid, 0.0), base)
+        st.candidates = st.postings
+        st.seq_calls = self._keys.ratio_calls - ratio_calls
+        st.ms = (clock() - t0) * 1000.0
+        # 2) лексичний індекс (токени + стеми) — унікальні кандидати, скоринг по кешу ознак
+        st = stats.stage("lexical")
+        t0 = clock()
+        hits: set[int] = set()
+        for tok in q_tokens | q_stems:
+            plist = self.inv.get(tok, ())
+            st.postings += len(plist)
+            hits.update(plist)
+        dead = self._dead
+        # дешева частина оцінки для всіх; SequenceMatcher (text_fuzzy) — лише для тих,
+        # чия верхня межа ще може потрапити в top-k
+        w_fuzzy = W["text_fuzzy"]
+        pending: List[Tuple[float, float, int, RecordFeatures, float]] = []
+        for rid in hits:
+            if dead and rid in dead:
+                continue
+            f = self._features(rid)
+            text_tokens = f.tokens
+            score = W["token"] * len(text_tokens & q_tokens)
+            if q_text in f.text_n:
+                score += W["text_match"]
+            for qt in q_tokens:
+                if any(w.startswith(qt) for w in text_tokens):
+                    score += W["prefix_token"]
+            if f.stems & q_stems:
+                score += W["stem_bonus"]
+            if f.obj_n is not None:
+                if q_text in f.obj_n:
+                    score += W["triple_obj"]
+                score += W["token"] * len(f.obj_tokens & q_tokens)
+                if f.obj_stems & q_stems:
+                    score += W["stem_bonus"]
+            b = boost(rid) if boost else 0.0
+            pending.append((score + max(w_fuzzy, 0.0) + b, score, rid, f, b))
+        st.candidates = len(pending)
+        pending.sort(key=lambda p: p[0], reverse=True)
+        # мін-купа k найкращих ОСТАТОЧНИХ оцінок: кандидати стадій 0/1 поза hits + вже пораховані
+        top: List[float] = []
+        if limit:
+            in_hits = {p[2] for p in pending}
+            top = heapq.nlargest(limit, (
+                sc + (boost(rid) if boost else 0.0) for rid, sc in candidates.items() if rid not in in_hits
+            ))
+            heapq.heapify(top)
+        q_fuzzy = q_text[:256]
+        for n, (upper, score, rid, f, b) in enumerate(pending):
+            if limit and len(top) >= limit and upper < top[0]:
+                # решта не переможе k-ту оцінку: лишаємо нижню межу без SequenceMatcher
+                for _, rest, rest_rid, _, _ in pending[n:]:
+                    if rest > candidates.get(rest_rid, 0.0):
+                        candidates[rest_rid] = rest
+                break
+            if w_fuzzy:
+                score += w_fuzzy * fuzzy(f.fuzzy_s, q_fuzzy)
+                st.seq_calls += 1
+            prev = candidates.get(rid, 0.0)
+            if score > prev:
+                candidates[rid] = prev = score
+            if limit:
+                if len(top) < limit:
+                    heapq.heappush(top, prev + b)
+                elif prev + b > top[0]:
+                    heapq.heapreplace(top, prev + b)
+        st.ms = (clock() - t0) * 1000.0
+
+    def _vectors(self) -> CharNgramVectors:
+        """TF-IDF текстів живих записів; перебудова, коли дельта стала завеликою."""
+        if self._vec is None or self._vec.stale():
+            from .vector_index import CharNgramVectors
+
+            dead = self._dead
+            self._vec = CharNgramVectors(
+                (rid, _record_text(self.memory[key][i]))
+                for rid, (key, i) in ((r, self._pair(r)) for r in range(len(self._rec_kid)))
+                if rid not in dead
+            )
+        return self._vec
+
+    def similar(self, text: str, limit: int = 10, min_score: float = 0.0) -> List[Tuple[str, dict, float]]:
+        """Схожі за символьними n-грамами записи: (key, запис, косинус) за спаданням."""
+        out: List[Tuple[str, dict, float]] = []
+        for rid, cos in self._vectors().top_k(text, limit, min_score=min_score):
+            key, i = self._pair(rid)
+            out.append((key, self.memory[key][i], cos))
+        return out
+
+    def _score_bm25(
+        self,
+        q_terms: set[str],
+        W: dict,
+        candidates: Dict[int, float],
+        stats: Optional[SearchStats] = None,
+    ) -> None:
+        """
+        BM25F: df = довжина списку постингів, довжини полів — із кешу ознак,
+        середні довжини — зі збереженої статистики. Без SequenceMatcher.
+        """
+        st = (stats if stats is not None else SearchStats()).stage("lexical")
+        t0 = time.perf_counter()
+        scored: set[int] = set()
+        n_docs = max(self._n_live, 1)
+        avg = [max(total / n_docs, 1e-9) for total in self._len_sum]
+        k1, b = float(W["bm25_k1"]), float(W["bm25_b"])
+        boost = [float(W["bm25_" + name]) for name in _BM25_FIELDS]
+        scale = float(W["bm25_scale"])
+        dead = self._dead
+        for term in q_terms:
+            plist = self.inv.get(term)
+            if not plist:
+                continue
+            df = len(plist)
+            st.postings += df
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for rid in plist:
+                if dead and rid in dead:
+                    continue
+                f = self._features(rid)
+                k_terms, k_len = self._key_field(self._kname[self._rec_kid[rid]])
+                tf = 0.0
+                for fi, present, length in (
+                    (0, term in k_terms, k_len),
+                    (1, term in f.tokens or term in f.stems, f.text_len),
+                    (2, term in f.obj_tokens or term in f.obj_stems, f.obj_len),
+                ):
+                    if present:
+                        tf += boost[fi] / (1.0 - b + b * length / avg[fi])
+                if tf:
+                    candidates[rid] = candidates.get(rid, 0.0) + scale * idf * tf / (k1 + tf)
+                    scored.add(rid)
+        st.candidates = len(scored)
+        st.ms = (time.perf_counter() - t0) * 1000.0
+
+    def _candidates(
         self,
         query: str,
-        limit: int = 10,
-        weights: Optional[dict] = None,
-        debug: bool = False
-    ) -> List[Tuple[str, dict, float]]:
+        limit: Optional[int],
+        weights: Optional[dict],
+        debug: bool,
+        stats: Optional[SearchStats] = None,
+    ) -> Dict[int, float]:
+        """record id -> оцінка; з limit оцінки поза top-k можуть бути лише нижніми межами."""
+        stats = stats if stats is not None else SearchStats(query)
         q_text = normalize(query)
         q_key = normalize_key(q_text)
         q_tokens_text = set(tokenize(q_text))
@@ -154,8 +700,8 @@ class MemoryIndex:
                   f"Q_TOKENS(key)={sorted(q_tokens_key)} "
                   f"Q_STEMS={sorted(q_stems)}")
         if not q_tokens:
-            return []
-        candidates: Dict[Tuple[str, int], float] = {}
+            return {}
+        candidates: Dict[int, float] = {}
         # Ваги ранжування
         W = {
             "exact": 100.0,
@@ -168,87 +714,152 @@ class MemoryIndex:
             "triple_obj": 40.0,
             "stem_bonus": 5.0,
             "key_token": 60.0,
+            # ranking="bm25": BM25F по полях key/text/obj замість адитивних ваг
+            "ranking": "classic",
+            "bm25_k1": 1.2,
+            "bm25_b": 0.75,
+            "bm25_key": 2.0,
+            "bm25_text": 1.0,
+            "bm25_obj": 0.5,
+            "bm25_scale": 20.0,
+            # recency: + recency * 0.5^(вік / recency_half_life днів); 0 — вимкнено
+            "recency": 0.0,
+            "recency_half_life": 30.0,
+            # text_vector: + text_vector * косинус TF-IDF символьних 3–5-грам (0 — вимкнено);
+            # знаходить і записи без спільних токенів. Швидка заміна text_fuzzy:
+            # {"text_fuzzy": 0, "text_vector": 30}
+            "text_vector": 0.0,
+            "text_vector_min": 0.1,
         }
         if isinstance(weights, dict):
             W.update(weights)
-        # 0) збіг токенів/стемів КЛЮЧА з токенами запиту
-        for key, thoughts in self.memory.items():
-            k_tokens = set(tokenize(key))
-            k_stems = {stem_token(t) for t in k_tokens} | {stem_token(key)}
-            if (k_tokens & q_tokens) or (k_stems & q_stems) or (key in q_tokens):
-                for i in range(len(thoughts)):
-                    candidates[(key, i)] = max(candidates.get((key, i), 0.0), W["key_token"])
-        # 1) матчі по ключу
-        for key, thoughts in self.memory.items():
-            key_n = normalize_key(key)
-            if key_n == q_key:
-                base = W["exact"]
-            elif key_n.startswith(q_key):
-                base = W["prefix"]
-            else:
-                base = W["fuzzy"] * fuzzy(key_n[:64], q_key[:64])
-            if base >= 20.0:
-                for i in range(len(thoughts)):
-                    candidates[(key, i)] = max(candidates.get((key, i), 0.0), base)
-        # 2) лексичний індекс (токени + стеми)
-        hits: List[Tuple[str, int]] = []
-        for tok in q_tokens:
-            hits.extend(self.inv.get(tok, []))
-        for st in q_stems:
-            hits.extend(self.inv.get(st, []))
-        for key, i in hits:
-            t = self.memory[key][i]
-            text = t.get("text", "") or t.get("value", "") or ""
-            text_n = normalize(text)
-            text_tokens = set(tokenize(text_n))
-            text_stems = {stem_token(w) for w in text_tokens}
-            score = W["token"] * len(text_tokens & q_tokens)
-            if q_text in text_n:
-                score += W["text_match"]
-            for qt in q_tokens:
-                if any(w.startswith(qt) for w in text_tokens):
-                    score += W["prefix_token"]
-            if text_stems & q_stems:
-                score += W["stem_bonus"]
-            score += W["text_fuzzy"] * fuzzy(text_n[:256], q_text[:256])
-            tri = t.get("triple")
-            if tri and isinstance(tri, (list, tuple)) and len(tri) == 3:
-                obj = tri[2] or ""
-                obj_n = normalize(obj)
-                obj_tokens = set(tokenize(obj_n))
-                obj_stems = {stem_token(w) for w in obj_tokens}
-                if q_text in obj_n:
-                    score += W["triple_obj"]
-                score += W["token"] * len(obj_tokens & q_tokens)
-                if obj_stems & q_stems:
-                    score += W["stem_bonus"]
-            prev = candidates.get((key, i), 0.0)
-            if score > prev:
-                candidates[(key, i)] = score
+        stats.ranking = str(W.get("ranking") or "classic")
+        boost = self._recency_boost(W)
+        w_vec = float(W.get("text_vector") or 0.0)
+        if w_vec > 0:
+            st = stats.stage("vector")
+            t0 = time.perf_counter()
+            k = None if limit is None else max(4 * limit, 50)
+            vec = {
+                rid: w_vec * cos
+                for rid, cos in self._vectors().top_k(q_text, k, min_score=float(W["text_vector_min"]))
+            }
+            for rid in vec:
+                candidates.setdefault(rid, 0.0)
+            st.candidates = len(vec)
+            st.ms = (time.perf_counter() - t0) * 1000.0
+            recency = boost
+            boost = lambda rid: vec.get(rid, 0.0) + (recency(rid) if recency else 0.0)
+        if W.get("ranking") == "bm25":
+            self._score_bm25(q_tokens | q_stems, W, candidates, stats)
+        else:
+            self._score_classic(q_text, q_key, q_tokens, q_stems, W, candidates, limit, boost, stats)
         # 3) fallback: частковий збіг ключів
         if not candidates:
-            for key, thoughts in self.memory.items():
-                k = normalize_key(key)
-                if any(k.startswith(t) or t.startswith(k) for t in q_tokens | q_stems):
-                    for i in range(len(thoughts)):
-                        candidates[(key, i)] = max(candidates.get((key, i), 0.0), 35.0)
-        ranked = sorted(candidates.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+            st = stats.stage("fallback")
+            t0 = time.perf_counter()
+            fallback: set[str] = set()
+            for t in q_tokens | q_stems:
+                fallback.update(self._keys.prefix(t))
+                fallback.update(self._keys.prefixes_of(t))
+            for key in fallback:
+                for rid in self._ids_of(key):
+                    st.postings += 1
+                    candidates[rid] = max(candidates.get(rid, 0.0), 35.0)
+            st.candidates = len(candidates)
+            st.ms = (time.perf_counter() - t0) * 1000.0
+        if boost:
+            for rid in candidates:
+                candidates[rid] += boost(rid)
+        return candidates
+
+    def _recency_boost(self, W: dict) -> Optional[Callable[[int], float]]:
+        """rid -> експоненційний бонус за свіжість (з числового стовпця часу) або None."""
+        weight = float(W.get("recency") or 0.0)
+        if weight <= 0:
+            return None
+        half_life = max(float(W.get("recency_half_life") or 30.0), 1e-9) * 86400.0
+        now = float(W.get("now") or time.time())
+        rec_ts = self._rec_ts
+        decay = math.log(2.0) / half_life
+
+        def boost(rid: int) -> float:
+            ts = rec_ts[rid]
+            if ts != ts:  # NaN — запис без часу
+                return 0.0
+            return weight * math.exp(-decay * max(now - ts, 0.0))
+
+        return boost
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        weights: Optional[dict] = None,
+        debug: bool = False,
+        with_stats: bool = False,
+    ) -> Union[List[Tuple[str, dict, float]], Tuple[List[Tuple[str, dict, float]], SearchStats]]:
+        """
+        Top-limit результатів (key, запис, оцінка). Статистика стадій пошуку — у last_stats
+        (і в profile, якщо задано); with_stats=True повертає (результати, SearchStats).
+        """
+        stats = SearchStats(query)
+        t0 = time.perf_counter()
+        candidates = self._candidates(query, max(int(limit), 0), weights, debug, stats)
+        # top-k купою: O(n log k) замість повного сортування (порядок рівних — як у sorted)
+        ranked = heapq.nlargest(limit, candidates.items(), key=lambda kv: kv[1])
         out: List[Tuple[str, dict, float]] = []
-        for (key, i), sc in ranked:
+        for rid, sc in ranked:
+            key, i = self._pair(rid)
             out.append((key, self.memory[key][i], sc))
+        stats.total_ms = (time.perf_counter() - t0) * 1000.0
+        stats.results = len(out)
+        self._record_stats(stats)
         if debug:
-            dbg = [round(sc, 2) for (_, _), sc in ranked]
+            dbg = [round(sc, 2) for _, sc in ranked]
             print(f"[DEBUG] index.search('{query}') -> {len(out)}: {dbg}")
-        return out
+        return (out, stats) if with_stats else out
+
+    def _record_stats(self, stats: SearchStats) -> None:
+        self.last_stats = stats
+        if self.profile is not None:
+            self.profile.record(stats)
+
+    def iter_search(
+        self,
+        query: str,
+        weights: Optional[dict] = None,
+        debug: bool = False,
+    ) -> Iterator[Tuple[str, dict, float]]:
+        """
+        Усі результати у порядку спадання оцінки, ліниво (для посторінкового виводу):
+        купа будується за O(n), кожен наступний результат — O(log n).
+        """
+        stats = SearchStats(query)
+        t0 = time.perf_counter()
+        candidates = self._candidates(query, None, weights, debug, stats)
+        # час — лише відбору кандидатів: решту споживач тягне ліниво
+        stats.total_ms = (time.perf_counter() - t0) * 1000.0
+        stats.results = len(candidates)
+        self._record_stats(stats)
+        heap = [(-sc, n, rid) for n, (rid, sc) in enumerate(candidates.items())]
+        heapq.heapify(heap)
+        while heap:
+            neg, _, rid = heapq.heappop(heap)
+            key, i = self._pair(rid)
+            bucket = self.memory.get(key)
+            if bucket is None or i >= len(bucket):
+                continue  # пам'ять змінилась під час ітерації
+            yield key, bucket[i], -neg
 
 # ====== PUBLIC WRAPPERS for CLI (rebuild/verify/compact) ======
 _LAST_INDEX: Optional[MemoryIndex] = None
 
 def _get_api():
-    """Підхопити високорівневий менеджер пам'яті, якщо є."""
+    """Підхопити високорівневий менеджер пам'яті, якщо є (спільний MEMORY, а не новий екземпляр)."""
     try:
-        from .manager import MemoryManager
-        return MemoryManager()
+        from .manager import MEMORY
+        return MEMORY
     except Exception:
         return None
 
@@ -316,35 +927,69 @@ def _load_memory_dict() -> Tuple[Dict[str, List[dict]], str]:
         return lm_nm, lm_src
     return {}, "empty"
 
-def rebuild() -> bool:
-    """Перебудова індексу з актуальної пам'яті + діагностика джерела."""
+def rebuild(path: Optional[Path] = None) -> bool:
+    """Перебудова індексу з актуальної пам'яті, запис у файл + діагностика джерела."""
     global _LAST_INDEX
+    path = Path(path or INDEX_FILE)
     memory, source = _load_memory_dict()
+    if _LAST_INDEX is not None:
+        _LAST_INDEX.close()
     _LAST_INDEX = MemoryIndex(memory)
+    saved = _LAST_INDEX.save(path)
     try:
         keys = len(memory)
         entries = sum(len(v) for v in memory.values())
         toks = len(_LAST_INDEX.inv)
-        print(f"[INDEX] rebuild: source={source}, keys={keys}, entries={entries}, tokens={toks}")
+        print(f"[INDEX] rebuild: source={source}, keys={keys}, entries={entries}, tokens={toks}, "
+              f"file={path if saved else 'WRITE FAILED'}")
     except Exception:
         print(f"[INDEX] rebuild: source={source}, OK")
-    return True
+    return saved
 
-def verify() -> bool:
-    """Легка перевірка індексу."""
+def verify(path: Optional[Path] = None) -> bool:
+    """Перевірка файлу індексу: формат, CRC, відповідність пам'яті, пробний пошук."""
     global _LAST_INDEX
-    if _LAST_INDEX is None:
-        rebuild()
+    path = Path(path or INDEX_FILE)
     try:
-        toks = len(_LAST_INDEX.inv)
+        mapped = MappedPostings(path)
+    except (OSError, IndexFileError) as e:
+        print(f"[INDEX] verify: FAIL → {path}: {e}")
+        return False
+    try:
+        if not mapped.check_crc():
+            print(f"[INDEX] verify: FAIL → {path}: crc mismatch")
+            return False
+        memory, source = _load_memory_dict()
+        if mapped.fingerprint != memory_fingerprint(memory):
+            print(f"[INDEX] verify: STALE → {path} (source={source}); потрібен rebuild")
+            return False
+        toks = len(mapped)
+    finally:
+        mapped.close()
+    try:
+        if _LAST_INDEX is None or _LAST_INDEX.path != path:
+            if _LAST_INDEX is not None:
+                _LAST_INDEX.close()
+            _LAST_INDEX = MemoryIndex.open(memory, path)
         _ = _LAST_INDEX.search("перевірка", limit=1)
-        print(f"[INDEX] verify: tokens={toks}, probe=OK")
+        print(f"[INDEX] verify: v{read_header(path)['version']}, tokens={toks}, probe=OK")
     except Exception as e:
         print(f"[INDEX] verify: WARN → {e}")
         return False
     return True
 
-def compact() -> bool:
-    """Поки що no-op (індекс у пам'яті)."""
-    print("[INDEX] compact: nothing to compact (noop)")
-    return True
\ No newline at end of file
+def compact(path: Optional[Path] = None) -> bool:
+    """Переписати файл індексу начисто з актуальної пам'яті."""
+    global _LAST_INDEX
+    path = Path(path or INDEX_FILE)
+    before = path.stat().st_size if path.exists() else 0
+    memory, _ = _load_memory_dict()
+    if _LAST_INDEX is not None:
+        _LAST_INDEX.close()
+    _LAST_INDEX = MemoryIndex.open(memory, path)
+    if not _LAST_INDEX.save(path):
+        print(f"[INDEX] compact: FAIL → не вдалося записати {path}")
+        return False
+    after = path.stat().st_size
+    print(f"[INDEX] compact: {before} → {after} bytes")
+    return True
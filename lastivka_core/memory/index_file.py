@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+index_file.py — версіонований on-disk формат інвертованого індексу пам'яті.
+
+Структура файлу (little-endian):
+    HEADER   magic, version, flags, n_keys, n_tokens, n_records, n_postings,
+             fingerprint(16), crc32(тіла), зсуви секцій, розмір файлу,
+             статистика для BM25 (n_docs, сумарні довжини полів key/text/obj)
+    KEYS     для кожного ключа: u32 довжина + utf-8 байти
+    RECORDS  u32[n_records] key_id, u32[n_records] rec_idx: record id -> (key, idx),
+             далі f64[n_records] ts (epoch; NaN — без часу)
+    TABLE    n_tokens × (tok_off, tok_len, post_off, post_cnt, post_len), відсортовано за байтами токена
+    TOKENS   суцільний utf-8 блоб токенів
+    POSTINGS для кожного токена: зростаючі record id, дельти у varint (LEB128)
+
+Файл читається через mmap: на старті розбираються заголовок, таблиця ключів і
+масиви records (memcpy), а словник токенів шукається бінарним пошуком прямо
+у відображеному файлі; постинги декодуються лише для запитаних токенів.
+Записи, додані після завантаження, потрапляють у дельту в RAM (OverlayPostings)
+і зливаються з файлом лише при компакції або збереженні індексу.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b"LVMIDX\x00\x00"
+VERSION = 4
+
+_HEADER = struct.Struct("<8sHHIIQQ16sIQQQQQQQQQQ")
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<IIQII")
+
+
+class IndexFileError(ValueError):
+    """Файл індексу відсутній, пошкоджений або іншої версії."""
+
+
+def memory_fingerprint(memory: Dict[str, List[dict]]) -> bytes:
+    """
+    Відбиток індексованого вмісту пам'яті (ключі, тексти, об'єкти triple, час) —
+    обхід усіх записів; для пам'яті без відомого stamp сховища (CLI rebuild/verify).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for k, thoughts in memory.items():
+        if not isinstance(thoughts, list):
+            continue
+        parts = [str(k), str(len(thoughts))]
+        for t in thoughts:
+            if not isinstance(t, Mapping):
+                parts.append("")
+                continue
+            text = t.get("text", "") or t.get("value", "") or ""
+            tri = t.get("triple")
+            obj = tri[2] if tri and isinstance(tri, (list, tuple)) and len(tri) == 3 else ""
+            ts = getattr(t, "ts", None)
+            parts.append(f"{text}\x1f{obj or ''}\x1f{t.get('timestamp') if ts is None else repr(ts)}")
+        h.update("\x1e".join(parts).encode("utf-8", "surrogatepass"))
+        h.update(b"\x1d")
+    return h.digest()
+
+
+def state_fingerprint(stamp: Sequence[int], seq: int = 0) -> bytes:
+    """
+    Відбиток стану сховища без обходу записів: stamp файлу (розмір, mtime_ns, inode)
+    на момент завантаження/запису + seq журналу поверх нього. Будь-яка зміна файлу
+    (включно з часом записів) дає інший stamp, тож індекс старого стану не підхопиться.
+    """
+    h = hashlib.blake2b(digest_size=16, person=b"lvm-state")
+    h.update(repr((tuple(int(x) for x in stamp), int(seq))).encode("ascii"))
+    return h.digest()
+
+
+def _le(arr: array) -> bytes:
+    """Байти масиву (u32 / f64) в little-endian."""
+    if sys.byteorder == "little":
+        return arr.tobytes()
+    swapped = array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _from_le(raw: bytes, typecode: str = "I") -> array:
+    arr = array(typecode)
+    arr.frombytes(raw)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def encode_postings(ids: Iterable[int]) -> bytes:
+    """Зростаючі record id -> дельти у varint (7 біт на байт, старший біт — продовження)."""
+    out = bytearray()
+    prev = 0
+    for rid in ids:
+        d = rid - prev
+        prev = rid
+        while d >= 0x80:
+            out.append((d & 0x7F) | 0x80)
+            d >>= 7
+        out.append(d)
+    return bytes(out)
+
+
+def decode_postings(buf: bytes) -> array:
+    out = array("I")
+    prev = val = shift = 0
+    for b in buf:
+        if b & 0x80:
+            val |= (b & 0x7F) << shift
+            shift += 7
+        else:
+            prev += val | (b << shift)
+            out.append(prev)
+            val = shift = 0
+    return out
+
+
+def write_index(
+    path: Path,
+    inv: Mapping,
+    records: Tuple[Sequence[str], array, array, array],
+    fingerprint: bytes,
+    stats: Tuple[int, int, int, int] = (0, 0, 0, 0),
+) -> None:
+    """
+    Атомарно записати індекс token -> [record id] у файл.
+    records = (імена ключів, key_id, idx у списку ключа, ts — для кожного record id).
+    stats = (n_docs, len_key, len_text, len_obj) — сумарні довжини полів для BM25.
+    """
+    path = Path(path)
+    keys, rec_kid, rec_idx, rec_ts = records
+    tokens = sorted((tok.encode("utf-8"), tok) for tok in inv.keys() if tok)
+
+    table = bytearray()
+    tok_blob = bytearray()
+    postings = bytearray()
+    n_postings = 0
+    for tok_b, tok in tokens:
+        plist = inv.get(tok) or ()
+        blob = encode_postings(sorted(plist))
+        table += _ENTRY.pack(len(tok_blob), len(tok_b), len(postings), len(plist), len(blob))
+        tok_blob += tok_b
+        postings += blob
+        n_postings += len(plist)
+
+    keys_blob = bytearray()
+    for key in keys:
+        kb = key.encode("utf-8")
+        keys_blob += _U32.pack(len(kb)) + kb
+    recs_blob = _le(array("I", rec_kid)) + _le(array("I", rec_idx)) + _le(array("d", rec_ts))
+
+    off_keys = _HEADER.size
+    off_recs = off_keys + len(keys_blob)
+    off_table = off_recs + len(recs_blob)
+    off_tokens = off_table + len(table)
+    off_postings = off_tokens + len(tok_blob)
+    end = off_postings + len(postings)
+    body = bytes(keys_blob) + recs_blob + bytes(table) + bytes(tok_blob) + bytes(postings)
+    header = _HEADER.pack(
+        MAGIC, VERSION, 0, len(keys), len(tokens), len(rec_kid), n_postings,
+        fingerprint, zlib.crc32(body), off_keys, off_recs, off_table, off_tokens, off_postings, end,
+        *stats,
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(tmp_fd, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+class MappedPostings(Mapping):
+    """
+    Read-only відображення token -> array('I') record id поверх mmap-файлу індексу.
+    Постинги декодуються лише для запитаних токенів; records (id -> key, idx) — у RAM.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # порожній файл
+                raise IndexFileError(f"empty index file: {self.path}") from e
+        try:
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise IndexFileError("truncated header")
+        (magic, version, _flags, n_keys, n_tokens, n_records, n_postings,
+         fingerprint, crc, off_keys, off_recs, off_table, off_tokens, off_postings, end,
+         *stats) = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise IndexFileError("bad magic")
+        if version != VERSION:
+            raise IndexFileError(f"unsupported version {version}")
+        if end != len(mm) or off_table != off_recs + 16 * n_records:
+            raise IndexFileError("size mismatch")
+        self.version = version
+        self.fingerprint: bytes = fingerprint
+        self.crc = crc
+        self.n_tokens = n_tokens
+        self.n_records = n_records
+        self.n_postings = n_postings
+        self.stats: Tuple[int, int, int, int] = tuple(stats)
+        self._off_table = off_table
+        self._off_tokens = off_tokens
+        self._off_postings = off_postings
+        keys: List[str] = []
+        pos = off_keys
+        for _ in range(n_keys):
+            (ln,) = _U32.unpack_from(mm, pos)
+            pos += _U32.size
+            keys.append(mm[pos:pos + ln].decode("utf-8"))
+            pos += ln
+        if pos != off_recs:
+            raise IndexFileError("corrupt key table")
+        self.key_names = keys
+        mid = off_recs + 4 * n_records
+        ts_off = mid + 4 * n_records
+        self.rec_kid = _from_le(mm[off_recs:mid])
+        self.rec_idx = _from_le(mm[mid:ts_off])
+        self.rec_ts = _from_le(mm[ts_off:off_table], "d")
+
+    # --- службове ---
+    def _entry(self, i: int) -> Tuple[int, int, int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._off_table + i * _ENTRY.size)
+
+    def _token_bytes(self, tok_off: int, tok_len: int) -> bytes:
+        start = self._off_tokens + tok_off
+        return self._mm[start:start + tok_len]
+
+    def _find(self, tok: str) -> Optional[Tuple[int, int]]:
+        needle = tok.encode("utf-8")
+        lo, hi = 0, self.n_tokens
+        while lo < hi:
+            mid = (lo + hi) // 2
+            tok_off, tok_len, post_off, _cnt, post_len = self._entry(mid)
+            cur = self._token_bytes(tok_off, tok_len)
+            if cur < needle:
+                lo = mid + 1
+            elif cur > needle:
+                hi = mid
+            else:
+                return post_off, post_len
+        return None
+
+    def _decode(self, post_off: int, post_len: int) -> array:
+        start = self._off_postings + post_off
+        return decode_postings(self._mm[start:start + post_len])
+
+    # --- Mapping API ---
+    def __getitem__(self, tok: str) -> array:
+        if not isinstance(tok, str):
+            raise KeyError(tok)
+        hit = self._find(tok)
+        if hit is None:
+            raise KeyError(tok)
+        return self._decode(*hit)
+
+    def __contains__(self, tok: object) -> bool:
+        return isinstance(tok, str) and self._find(tok) is not None
+
+    def __len__(self) -> int:
+        return self.n_tokens
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.n_tokens):
+            tok_off, tok_len, *_ = self._entry(i)
+            yield self._token_bytes(tok_off, tok_len).decode("utf-8")
+
+    def check_crc(self) -> bool:
+        return zlib.crc32(self._mm[_HEADER.size:]) == self.crc
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+
+
+class OverlayPostings(Mapping):
+    """
+    Постинги mmap-файлу + дельта в RAM: record id, дописані після load() (add_record).
+    Нові id завжди більші за id у файлі, тож base + delta лишається відсортованим.
+    Файл не декодується цілком: дельта зливається з ним лише при compact()/save().
+    """
+
+    def __init__(self, base: MappedPostings) -> None:
+        self.base = base
+        self.path = base.path
+        self.delta: Dict[str, array] = {}
+        self._new: List[str] = []  # токени, яких немає у файлі (у порядку появи)
+
+    def append(self, tok: str, rid: int) -> None:
+        plist = self.delta.get(tok)
+        if plist is None:
+            if tok not in self.base:
+                self._new.append(tok)
+            self.delta[tok] = array("I", (rid,))
+        else:
+            plist.append(rid)
+
+    def __getitem__(self, tok: str) -> array:
+        extra = self.delta.get(tok)
+        if extra is None:
+            return self.base[tok]
+        try:
+            return self.base[tok] + extra
+        except KeyError:
+            return array("I", extra)
+
+    def __contains__(self, tok: object) -> bool:
+        return tok in self.delta or tok in self.base
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self._new)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.base
+        yield from self._new
+
+    def close(self) -> None:
+        self.base.close()
+
+
+def read_header(path: Path) -> dict:
+    """Прочитати заголовок файлу індексу без відображення тіла."""
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise IndexFileError("truncated header")
+    (magic, version, _flags, n_keys, n_tokens, n_records, n_postings,
+     fingerprint, crc, _ok, _or, _ot, _otk, _op, _end, n_docs, *_lens) = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise IndexFileError("bad magic")
+    return {
+        "version": version,
+        "keys": n_keys,
+        "tokens": n_tokens,
+        "records": n_records,
+        "postings": n_postings,
+        "docs": n_docs,
+        "fingerprint": fingerprint.hex(),
+        "crc32": crc,
+    }
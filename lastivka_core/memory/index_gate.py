@@ -3,6 +3,7 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 from lastivka_core.core.gate import parse_mode, open_report, manifest_path, apply_change
+from lastivka_core.memory import index as memory_index
 
 SCRIPT = "memory_index"
 ROOT = Path(r"C:\Lastivka\lastivka_core")
@@ -13,13 +14,14 @@ def main(argv=None) -> int:
     mf = manifest_path()
     w, rp = open_report(SCRIPT)
     try:
-        # приклад: створення/оновлення індексів (поки що плейсхолдер)
+        # перебудова on-disk індексу пам'яті (формат: memory/index_file.py)
         idx = INDICES / "memory.idx"
         if dry:
             apply_change(SCRIPT, "UPDATE", idx, None, True, mf, w)
         else:
             INDICES.mkdir(parents=True, exist_ok=True)
-            idx.write_text("index: placeholder\n", encoding="utf-8")
+            if not memory_index.rebuild(idx) or not memory_index.verify(idx):
+                raise RuntimeError(f"index rebuild/verify failed: {idx}")
             apply_change(SCRIPT, "UPDATE", idx, None, False, mf, w)
         w.write(f"[INFO] memory index ok (dry-run: {str(dry).lower()})\n"); w.flush()
         return 0
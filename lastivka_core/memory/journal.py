@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+journal.py — append-only журнал змін пам'яті (write-ahead log у форматі JSONL).
+
+Кожна мутація — один компактний рядок {"seq": N, "op": ..., ...}. Знімок
+(memory_store.json) пам'ятає seq останньої врахованої операції, тому при
+відновленні повторно застосовуються лише записи з більшим seq, а обірваний
+останній рядок (збій посеред запису) відкидається.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from .record import json_default
+
+
+class Journal:
+    def __init__(self, path: Path, fsync: bool = True) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self.ops = 0  # записів у журналі з моменту останнього checkpoint
+        self.end_offset = 0  # зсув кінця останнього валідного рядка після replay()
+        self._fh = None
+
+    # --- запис ---
+    def _open(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "ab")
+        return self._fh
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.append_many([entry])
+
+    def append_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Дописати кілька записів одним write + одним fsync (коміт пакета)."""
+        if not entries:
+            return
+        blob = "".join(
+            json.dumps(e, ensure_ascii=False, separators=(",", ":"), default=json_default) + "\n" for e in entries
+        )
+        fh = self._open()
+        fh.write(blob.encode("utf-8"))
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+        self.ops += len(entries)
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def truncate(self) -> None:
+        """Очистити журнал після checkpoint."""
+        self.close()
+        with open(self.path, "wb") as f:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.ops = 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+    # --- читання ---
+    def replay(self, after_seq: int = 0, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Записи з seq > after_seq, починаючи з байтового зсуву offset.
+        Обірваний хвіст (рядок без '\\n' або невалідний JSON) обрізається з файлу.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        good = offset
+        lines = 0
+        torn = False
+        with f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    torn = True
+                    break
+                try:
+                    entry = json.loads(raw.decode("utf-8"))
+                except (ValueError, UnicodeDecodeError):
+                    torn = True
+                    break
+                good += len(raw)
+                lines += 1
+                if isinstance(entry, dict) and int(entry.get("seq", 0)) > after_seq:
+                    yield entry
+        self.end_offset = good
+        if offset == 0:
+            self.ops = lines
+        if torn:
+            self.close()
+            try:
+                with open(self.path, "r+b") as f:
+                    f.truncate(good)
+            except OSError:
+                pass
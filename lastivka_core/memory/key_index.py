@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+key_index.py — індекс ключів пам'яті для точного, префіксного та нечіткого пошуку.
+
+- exact / prefix: відсортований список рядків + bisect;
+- fuzzy: кандидати з триграмного індексу, далі дешеві верхні межі
+  (довжина, quick_ratio) і лише потім SequenceMatcher.ratio();
+- token_match: токени/стеми ключа -> ключі (стадія 0 у MemoryIndex.search).
+
+Нечіткий пошук наближений: ключ без жодної спільної триграми із запитом
+не розглядається, навіть якщо його ratio формально пройшов би поріг.
+"""
+from __future__ import annotations
+
+import bisect
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+_PAD = "  "
+
+
+def trigrams(s: str) -> Set[str]:
+    p = f"{_PAD}{s}{_PAD}"
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+class KeyIndex:
+    """
+    Індекс ключів. norm(key) — рядок, за яким шукаємо (напр. normalize_key);
+    tokens(key) — (токени, стеми) ключа для token_match, якщо потрібен.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = (),
+        norm: Optional[Callable[[str], str]] = None,
+        tokens: Optional[Callable[[str], Tuple[Iterable[str], Iterable[str]]]] = None,
+    ) -> None:
+        self._norm = norm or (lambda k: k)
+        self._tokens = tokens
+        self.ratio_calls = 0  # лічильник SequenceMatcher.ratio() у fuzzy (для SearchStats)
+        self.clear()
+        self.update(keys)
+
+    def clear(self) -> None:
+        self._key_s: Dict[str, str] = {}             # key -> індексований рядок
+        self._by_s: Dict[str, Set[str]] = {}         # рядок -> ключі
+        self._sorted: List[str] = []                 # унікальні рядки, відсортовані
+        self._tri: Dict[str, Set[str]] = {}          # триграма -> рядки
+        self._by_tok: Dict[str, Set[str]] = {}       # токен ключа -> ключі
+        self._by_stem: Dict[str, Set[str]] = {}      # стем ключа -> ключі
+
+    def __len__(self) -> int:
+        return len(self._key_s)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_s
+
+    # --- підтримка ---
+    def update(self, keys: Iterable[str]) -> None:
+        """Масове додавання: рядки сортуються один раз у кінці, а не insort на кожен ключ."""
+        n = len(self._sorted)
+        for k in keys:
+            self._add(k, False)
+        if len(self._sorted) != n:
+            self._sorted.sort()
+
+    def add(self, key: str) -> None:
+        self._add(key, True)
+
+    def _add(self, key: str, keep_sorted: bool) -> None:
+        if key in self._key_s:
+            return
+        s = self._norm(key)
+        self._key_s[key] = s
+        owners = self._by_s.get(s)
+        if owners is None:
+            owners = self._by_s[s] = set()
+            if keep_sorted:
+                bisect.insort(self._sorted, s)
+            else:
+                self._sorted.append(s)
+            for g in trigrams(s):
+                self._tri.setdefault(g, set()).add(s)
+        owners.add(key)
+        if self._tokens is not None:
+            toks, stems = self._tokens(key)
+            for t in toks:
+                self._by_tok.setdefault(t, set()).add(key)
+            for t in stems:
+                self._by_stem.setdefault(t, set()).add(key)
+
+    def discard(self, key: str) -> None:
+        s = self._key_s.pop(key, None)
+        if s is None:
+            return
+        owners = self._by_s[s]
+        owners.discard(key)
+        if not owners:
+            del self._by_s[s]
+            i = bisect.bisect_left(self._sorted, s)
+            if i < len(self._sorted) and self._sorted[i] == s:
+                del self._sorted[i]
+            for g in trigrams(s):
+                bucket = self._tri.get(g)
+                if bucket is not None:
+                    bucket.discard(s)
+                    if not bucket:
+                        del self._tri[g]
+        if self._tokens is not None:
+            toks, stems = self._tokens(key)
+            for table, items in ((self._by_tok, toks), (self._by_stem, stems)):
+                for t in items:
+                    bucket = table.get(t)
+                    if bucket is not None:
+                        bucket.discard(key)
+                        if not bucket:
+                            del table[t]
+
+    # --- запити ---
+    def exact(self, s: str) -> Set[str]:
+        return set(self._by_s.get(s, ()))
+
+    def prefix(self, p: str) -> List[str]:
+        """Ключі, чий рядок починається з p (у порядку сортування рядків)."""
+        out: List[str] = []
+        i = bisect.bisect_left(self._sorted, p)
+        while i < len(self._sorted) and self._sorted[i].startswith(p):
+            out.extend(self._by_s[self._sorted[i]])
+            i += 1
+        return out
+
+    def prefixes_of(self, s: str) -> List[str]:
+        """Ключі, чий рядок є префіксом s (включно з самим s)."""
+        out: List[str] = []
+        for n in range(1, len(s) + 1):
+            out.extend(self._by_s.get(s[:n], ()))
+        return out
+
+    def fuzzy(
+        self,
+        q: str,
+        min_ratio: float,
+        *,
+        cut: Optional[int] = None,
+        max_len_diff: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        [(key, ratio)] з ratio >= min_ratio, де ratio = SequenceMatcher(s[:cut], q[:cut]).
+        """
+        qc = q[:cut] if cut else q
+        seen: Set[str] = set()
+        for g in trigrams(q):
+            seen.update(self._tri.get(g, ()))
+        sm = SequenceMatcher(None, "", qc)  # кешує b = запит
+        out: List[Tuple[str, float]] = []
+        for s in seen:
+            if max_len_diff is not None and abs(len(s) - len(q)) > max_len_diff:
+                continue
+            sc = s[:cut] if cut else s
+            total = len(sc) + len(qc)
+            if total and 2.0 * min(len(sc), len(qc)) / total < min_ratio:
+                continue
+            sm.set_seq1(sc)
+            if sm.quick_ratio() < min_ratio:
+                continue
+            r = sm.ratio()
+            self.ratio_calls += 1
+            if r >= min_ratio:
+                out.extend((k, r) for k in self._by_s[s])
+        return out
+
+    def token_match(self, q_tokens: Iterable[str], q_stems: Iterable[str]) -> Set[str]:
+        """Ключі, що мають спільний токен/стем із запитом або дорівнюють токену запиту."""
+        out: Set[str] = set()
+        for t in q_tokens:
+            out.update(self._by_tok.get(t, ()))
+            if t in self._key_s:
+                out.add(t)
+        for t in q_stems:
+            out.update(self._by_stem.get(t, ()))
+        return out
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+lazy.py — ліниві модульні singleton-и.
+
+MEMORY (manager) і _stm_singleton (short_term) створювались під час імпорту:
+імпорт пакета memory читав усе сховище і створював файли, навіть якщо процесу
+(CLI-довідка, підпроцес, тест іншого модуля) пам'ять не потрібна.
+LazyProxy відкладає створення об'єкта до першого звернення до атрибута;
+далі всі атрибути читаються/пишуться в реальний об'єкт.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable
+
+
+class LazyProxy:
+    __slots__ = ("_lazy_factory", "_lazy_obj", "_lazy_lock")
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_obj", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_target(self) -> Any:
+        obj = object.__getattribute__(self, "_lazy_obj")
+        if obj is None:
+            with object.__getattribute__(self, "_lazy_lock"):
+                obj = object.__getattribute__(self, "_lazy_obj")
+                if obj is None:  # інший потік міг створити, поки чекали на lock
+                    obj = object.__getattribute__(self, "_lazy_factory")()
+                    object.__setattr__(self, "_lazy_obj", obj)
+        return obj
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_target(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_target(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._lazy_target(), name)
+
+    def __dir__(self):
+        return dir(self._lazy_target())
+
+    def __repr__(self) -> str:
+        obj = object.__getattribute__(self, "_lazy_obj")
+        if obj is None:
+            factory = object.__getattribute__(self, "_lazy_factory")
+            return f"<lazy {getattr(factory, '__name__', 'object')} (not loaded)>"
+        return repr(obj)
+
+
+def is_loaded(proxy: Any) -> bool:
+    """Чи створено об'єкт за проксі (для не-проксі — завжди True)."""
+    if not isinstance(proxy, LazyProxy):
+        return True
+    return object.__getattribute__(proxy, "_lazy_obj") is not None
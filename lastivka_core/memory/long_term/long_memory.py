@@ -1,72 +1,329 @@
-﻿import json
+# -*- coding: utf-8 -*-
+"""
+long_memory.py — просте довготривале сховище (key -> [{value, timestamp, tone}]).
+
+Замість читання й перезапису всього memory_store.json на кожен виклик:
+- кеш у процесі; читання перевіряє stamp файлу (mtime_ns, розмір, inode) одним
+  os.stat і перечитує JSON лише після зовнішньої зміни;
+- запис: за замовчуванням одразу (FLUSH_DELAY = 0, як раніше), тож зовнішні зміни
+  файлу підхоплюються перед кожною мутацією. Write-behind — за бажанням
+  (LASTIVKA_LTM_FLUSH_DELAY > 0): зміни позначають кеш брудним, запис — один на
+  вікно FLUSH_DELAY секунд (таймер) і при виході; flush() — записати негайно.
+  Поки є незаписані зміни, зовнішні зміни файлу не підхоплюються й наш flush їх
+  перезапише — лише для одного записувача;
+- recall_from_question — триграмні індекси ключів і значень (будуються при першому
+  питанні, далі оновлюються інкрементально) з тією ж семантикою "перший збіг".
+Назовні віддаються копії (load_memory, recall, ...): кеш змінюється лише через
+remember/forget/save_memory, тож індекси й write-behind не розходяться з даними.
+generation() — дешевий сигнал зміни (один os.stat) для кешів поверх load_memory.
+"""
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
 
 MEMORY_FILE = Path(__file__).resolve().parent / "memory_store.json"
 ARCHIVE_FILE = Path(__file__).resolve().parent / "memory_archive.json"
 
+try:
+    FLUSH_DELAY = float(os.getenv("LASTIVKA_LTM_FLUSH_DELAY", "0"))
+except ValueError:
+    FLUSH_DELAY = 0.0
+
+
+# ===== Підрядковий індекс =====
+class _SubstringIndex:
+    """
+    Рядки з порівнюваними id; first(q) — найменший id рядка, що містить q.
+    Кандидати — перетин триграм запиту, далі перевірка `q in s`; запит коротший
+    за 3 символи — перебір рядків у RAM.
+    """
+
+    def __init__(self) -> None:
+        self._text: Dict[Hashable, str] = {}
+        self._tri: Dict[str, Set[Hashable]] = {}
+
+    @staticmethod
+    def _grams(s: str) -> Set[str]:
+        return {s[i:i + 3] for i in range(len(s) - 2)}
+
+    def add(self, id_: Hashable, text: str) -> None:
+        self._text[id_] = text
+        for g in self._grams(text):
+            self._tri.setdefault(g, set()).add(id_)
+
+    def remove(self, id_: Hashable) -> None:
+        text = self._text.pop(id_, None)
+        if text is None:
+            return
+        for g in self._grams(text):
+            bucket = self._tri.get(g)
+            if bucket is not None:
+                bucket.discard(id_)
+                if not bucket:
+                    del self._tri[g]
+
+    def first(self, q: str) -> Optional[Hashable]:
+        grams = self._grams(q)
+        if not grams:
+            hits = [i for i, s in self._text.items() if q in s]
+            return min(hits) if hits else None
+        buckets = sorted((self._tri.get(g, ()) for g in grams), key=len)
+        if not buckets[0]:
+            return None
+        cand = set(buckets[0])
+        for b in buckets[1:]:
+            cand &= b
+            if not cand:
+                return None
+        for id_ in sorted(cand):
+            if q in self._text[id_]:
+                return id_
+        return None
+
+
+class _QuestionIndex:
+    """Ключі та значення записів для recall_from_question (порядок = порядок dict)."""
+
+    def __init__(self, memory: Dict[str, Any]) -> None:
+        self.keys = _SubstringIndex()
+        self.values = _SubstringIndex()
+        self._seq: Dict[str, int] = {}
+        self._by_seq: Dict[int, str] = {}
+        self._next = 0
+        for k in memory:
+            self.add_key(k, memory[k])
+
+    def add_key(self, k: str, v: Any) -> None:
+        seq = self._seq[k] = self._next
+        self._by_seq[seq] = k
+        self._next += 1
+        self.keys.add(seq, k.lower())
+        self.set_items(k, None, v)
+
+    def set_items(self, k: str, old: Any, new: Any) -> None:
+        """Переіндексувати записи ключа (ключ лишається на своєму місці в порядку)."""
+        seq = self._seq[k]
+        for i in range(len(old) if isinstance(old, list) else 0):
+            self.values.remove((seq, i))
+        for i, item in enumerate(new if isinstance(new, list) else ()):
+            self.add_item(k, i, item)
+
+    def add_item(self, k: str, i: int, item: Any) -> None:
+        if isinstance(item, dict) and isinstance(item.get("value", ""), str):
+            self.values.add((self._seq[k], i), item.get("value", "").lower())
+
+    def remove_key(self, k: str, v: Any) -> None:
+        seq = self._seq.pop(k, None)
+        if seq is None:
+            return
+        del self._by_seq[seq]
+        self.keys.remove(seq)
+        for i in range(len(v) if isinstance(v, list) else 0):
+            self.values.remove((seq, i))
+
+    def find_key(self, q: str) -> Optional[str]:
+        seq = self.keys.first(q)
+        return None if seq is None else self._by_seq[seq]
+
+    def find_item(self, q: str) -> Optional[Tuple[str, int]]:
+        hit = self.values.first(q)
+        return None if hit is None else (self._by_seq[hit[0]], hit[1])
+
+
+# ===== Кеш зі write-behind =====
+class _Store:
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._path: Optional[Path] = None
+        self._data: Dict[str, Any] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.generation = 0  # +1 на кожну зміну кешу (наша чи перечитування з диска)
+        self.qindex: Optional[_QuestionIndex] = None  # будується при першому питанні
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def data(self) -> Dict[str, Any]:
+        """Кешований вміст MEMORY_FILE; перечитується, якщо файл змінили ззовні."""
+        with self.lock:
+            path = Path(MEMORY_FILE)
+            if path != self._path:
+                self.flush()  # шлях змінився (напр. тест підмінив MEMORY_FILE)
+                self._path, self._stamp = path, None
+                self._data, self.qindex = {}, None
+                self.generation += 1
+            if not self._dirty:
+                stamp = self._stat(path)
+                if stamp is None:
+                    if self._stamp is not None:
+                        self.generation += 1
+                    self._data, self.qindex = {}, None
+                elif stamp != self._stamp:
+                    self._data, self.qindex = self._read(path), None
+                    self.generation += 1
+                self._stamp = stamp
+            return self._data
+
+    @staticmethod
+    def _read(path: Path) -> Dict[str, Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def index(self) -> _QuestionIndex:
+        data = self.data()
+        if self.qindex is None:
+            self.qindex = _QuestionIndex(data)
+        return self.qindex
+
+    def replace(self, memory: Dict[str, Any]) -> None:
+        with self.lock:
+            self.data()
+            self._data, self.qindex = memory, None
+            self.changed()
+
+    def changed(self) -> None:
+        """Кеш змінено: запланувати запис (кілька змін у вікні — один запис)."""
+        with self.lock:
+            self._dirty = True
+            self.generation += 1
+            if FLUSH_DELAY <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(FLUSH_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self._path is None:
+                return
+            path = self._path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._stamp = self._stat(path)
+            self._dirty = False
+
+
+_STORE = _Store()
+atexit.register(_STORE.flush)
+
+
+# ===== API =====
 def load_memory():
-    if not MEMORY_FILE.exists():
-        return {}
-    try:
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+    """Копія вмісту сховища; зміни зберігаються лише через remember/forget/save_memory."""
+    with _STORE.lock:
+        return copy.deepcopy(_STORE.data())
 
 def save_memory(memory):
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(memory, f, ensure_ascii=False, indent=2)
+    _STORE.replace(copy.deepcopy(memory))
+
+def flush():
+    """Записати незбережені зміни негайно."""
+    _STORE.flush()
+
+def generation():
+    """Лічильник змін вмісту: інший — load_memory() міг змінитися (без копіювання даних)."""
+    with _STORE.lock:
+        _STORE.data()
+        return _STORE.generation
 
 def archive_memory():
-    memory = load_memory()
-    if memory:
-        archive = {"archived_at": datetime.now().isoformat(), "data": memory}
-        with open(ARCHIVE_FILE, "w", encoding="utf-8") as f:
-            json.dump(archive, f, ensure_ascii=False, indent=2)
-
-def remember(key, value, tone="радість"):
-    memory = load_memory()
-    record = {
-        "value": value,
-        "timestamp": datetime.now().isoformat(),
-        "tone": tone
-    }
-    if key in memory:
-        if isinstance(memory[key], list):
-            memory[key].append(record)
+    with _STORE.lock:  # кеш без копії: лише читання під блокуванням
+        memory = _STORE.data()
+        if memory:
+            archive = {"archived_at": datetime.now().isoformat(), "data": memory}
+            with open(ARCHIVE_FILE, "w", encoding="utf-8") as f:
+                json.dump(archive, f, ensure_ascii=False, indent=2)
+
+def remember(key, value, tone="радість", tags=None):
+    with _STORE.lock:
+        memory = _STORE.data()
+        index = _STORE.qindex
+        record = {
+            "value": value,
+            "timestamp": datetime.now().isoformat(),
+            "tone": tone
+        }
+        if tags:
+            record["tags"] = [str(t).strip() for t in tags if str(t).strip()]
+        if key in memory:
+            if isinstance(memory[key], list):
+                memory[key].append(record)
+                if index is not None:
+                    index.add_item(key, len(memory[key]) - 1, record)
+            else:
+                memory[key] = [memory[key], record]
+                if index is not None:
+                    index.set_items(key, None, memory[key])
         else:
-            memory[key] = [memory[key], record]
-    else:
-        memory[key] = [record]
-    save_memory(memory)
+            memory[key] = [record]
+            if index is not None:
+                index.add_key(key, memory[key])
+        _STORE.changed()
 
 def recall(key):
-    memory = load_memory()
-    return memory.get(key)
+    with _STORE.lock:
+        return copy.deepcopy(_STORE.data().get(key))
 
 def forget(key):
-    memory = load_memory()
-    if key in memory:
-        del memory[key]
-        save_memory(memory)
+    with _STORE.lock:
+        memory = _STORE.data()
+        if key in memory:
+            if _STORE.qindex is not None:
+                _STORE.qindex.remove_key(key, memory[key])
+            del memory[key]
+            _STORE.changed()
 
-def list_memories():
+def list_memories(archive=False):
+    if archive:
+        try:
+            with open(ARCHIVE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("data", {}) if isinstance(data, dict) else {}
+        except Exception:
+            return {}
     return load_memory()
 
 def recall_from_question(question):
     question = question.lower()
-    memory = load_memory()
+    with _STORE.lock:
+        memory = _STORE.data()
+        index = _STORE.index()
 
-    for k, v in memory.items():
-        if question in k.lower():
-            return v
+        k = index.find_key(question)
+        if k is not None:
+            return copy.deepcopy(memory[k])
 
-    for k, v in memory.items():
-        if isinstance(v, list):
-            for item in v:
-                if isinstance(item, dict) and question in item.get("value", "").lower():
-                    return f"{k} → {item['value']}"
+        hit = index.find_item(question)
+        if hit is not None:
+            k, i = hit
+            return f"{k} → {memory[k][i]['value']}"
 
     return None
@@ -11,16 +11,39 @@ manager.py — оновлений (2025-08-20)
 """
 from __future__ import annotations
 
-import argparse
+import atexit
+import contextlib
+import functools
 import json
 import os
 import re
-import tempfile
+import traceback
+import weakref
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .index import MemoryIndex, normalize, normalize_key, tokenize, fuzzy
+from .journal import Journal
+from .key_index import KeyIndex
+from .lazy import LazyProxy
+from .shared import SharedStore, Stamp
+from .query_cache import MISS, QueryCache, weights_key
+from .search_stats import SearchProfile
+from .record import MemoryRecord, as_dict, as_record
+from .tag_index import ALL as ALL_TAGS, TagIndex
+from .triple_index import TripleIndex, matches, object_terms, pattern_terms, record_terms
+from .time_index import TimeIndex, as_ts, parse_time_range
+from .near_dup import BandCache, NearDupIndex
+from .index_file import state_fingerprint
+from .snapshot import (
+    Snapshot, SnapshotError, index_blob, read_snapshot, restore_index,
+    verify_snapshot, write_snapshot,
+)
+from .storage import (
+    DEFAULT_STORE_SKELETON, MemoryStorage, Stamp as FileStamp, _ensure_json, _read_json, _safe_write,
+    backend_for, file_stamp, open_storage,
+)
 
 # alias для сумісності
 normalize_text = normalize
@@ -30,86 +53,685 @@ _lev1 = lev1  # для старих тестів
 # === Константи ===
 ROOT = Path(__file__).resolve().parents[1]
 CONFIG_FILE = Path(os.getenv("LASTIVKA_MEMORY_CONFIG", ROOT / "config" / "memory_store.json"))
+# Персистентний індекс лежить поруч зі сховищем (memory_store.idx)
+INDEX_FILE = CONFIG_FILE.with_suffix(".idx")
+# Журнал змін (JSONL) для режиму write-ahead; знімок = CONFIG_FILE
+JOURNAL_FILE = CONFIG_FILE.with_suffix(".journal")
+# Бінарний знімок (готові записи + смуги MinHash + файл індексу) для швидкого старту JSON-сховища
+SNAPSHOT_FILE = Path(os.getenv("LASTIVKA_MEMORY_SNAPSHOT", CONFIG_FILE.with_suffix(".snap")))
+JOURNAL_MODE = os.getenv("LASTIVKA_MEMORY_JOURNAL", "0").lower() in ("1", "true", "yes", "on")
+# Спільне сховище для кількох процесів (lock + stamp + хвіст журналу); вмикає журнал
+SHARED_MODE = os.getenv("LASTIVKA_MEMORY_SHARED", "0").lower() in ("1", "true", "yes", "on")
+# Checkpoint (перезапис знімка + очищення журналу) після стількох операцій / байтів журналу
+CHECKPOINT_OPS = 500
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+# Пакет із більшою кількістю додавань перебудовує індекс цілком замість інкрементального оновлення
+BATCH_REBUILD_MIN = 1000
+# Сховище: "json" (за замовчуванням) або "sqlite" (WAL + FTS5, записи читаються з диска).
+# Без явного значення визначається за розширенням CONFIG_FILE (.db/.sqlite/.sqlite3 -> sqlite)
+BACKEND = os.getenv("LASTIVKA_MEMORY_BACKEND", "").strip().lower()
+# Кеш результатів smart_search/ask (кількість запитів; 0 — вимкнено)
+try:
+    QUERY_CACHE_SIZE = int(os.getenv("LASTIVKA_QUERY_CACHE", "256"))
+except ValueError:
+    QUERY_CACHE_SIZE = 256
+# Поріг Jaccard для майже-дублікатів (MinHash/LSH) у межах ключа в add_thought
+# (напр. 0.85); 0 (за замовчуванням) — лише точний дедуп
+try:
+    NEAR_DUP_THRESHOLD = float(os.getenv("LASTIVKA_NEAR_DUP", "0"))
+except ValueError:
+    NEAR_DUP_THRESHOLD = 0.0
 
-DEFAULT_STORE_SKELETON: Dict[str, Any] = {"triggers": {}}
+# Теги, за якими ask() відповідає на "що купити" (вищий пріоритет — важливіший)
+_PURCHASE_TAG_PRIORITY = {"покупка": 3, "покупки": 3, "товар": 3, "магазин": 3, "напій": 2, "їжа": 1}
+
+# Питання до трійок: "що в мене зелене?", "що у мене є солодке?"
+_RELATIONAL_Q = re.compile(r"^що\s+(?:в|у)\s+мене\s+(?:є\s+)?(\S.*)$")
+# Службові слова питань про час ("що я казав вчора про каву?") — не впливають на вибір запису
+_TIME_Q_FILLER = frozenset((
+    "що", "я", "мені", "про", "було", "казав", "казала", "говорив", "говорила",
+    "записав", "записала", "згадував", "згадувала",
+))
+
+def _ts_or_min(rec: MemoryRecord) -> float:
+    return rec.ts if rec.ts is not None else float("-inf")
 
 # === Допоміжні IO-функції ===
-def _ensure_files() -> None:
-    CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    if not CONFIG_FILE.exists():
-        CONFIG_FILE.write_text(
-            json.dumps(DEFAULT_STORE_SKELETON, ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
+def _ensure_files(path: Optional[Path] = None) -> None:
+    _ensure_json(path or CONFIG_FILE)
+
+# === Вихід ===
+# Незакриті екземпляри зберігають своє при виході (_at_exit). Слабкі посилання, а не
+# atexit.register(self._at_exit): зібраний GC екземпляр не живе до кінця процесу й нічого не пише.
+_LIVE: "weakref.WeakSet[MemoryManager]" = weakref.WeakSet()
 
-def _safe_write(path: Path, data: dict) -> None:
-    tmp_fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
-    try:
-        with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-        os.replace(tmp_path, path)
-    finally:
+
+def _exit_live() -> None:
+    for m in list(_LIVE):
         try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
-
-def _read_json(path: Path) -> Dict[str, Any]:
-    try:
-        if not path.exists():
-            return {}
-        txt = path.read_text(encoding="utf-8-sig")
-        if not txt.strip():
-            return {}
-        data = json.loads(txt)
-        if isinstance(data, dict):
-            return data
-    except Exception:
-        pass
-    return {}
+            m._at_exit()
+        except Exception:  # як atexit: помилка одного екземпляра не зупиняє інших
+            traceback.print_exc()
+
+
+atexit.register(_exit_live)
+
+# === Спільний режим ===
+def _exclusive(fn):
+    """Мутація: у спільному режимі — під lock сховища, після підтягування чужих змін."""
+    @functools.wraps(fn)
+    def wrapper(self: "MemoryManager", *args: Any, **kwargs: Any) -> Any:
+        with self._locked():
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def _synced(fn):
+    """Читання: у спільному режимі — спершу застосувати зміни інших процесів."""
+    @functools.wraps(fn)
+    def wrapper(self: "MemoryManager", *args: Any, **kwargs: Any) -> Any:
+        self.refresh()
+        return fn(self, *args, **kwargs)
+    return wrapper
+
+
+# === Пакетний запис ===
+class _Batch:
+    """Стан відкритого пакета: відкладені записи журналу, undo-лог, відкладене індексування."""
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.entries: List[Dict[str, Any]] = []
+        self.undo: List[Tuple[Any, ...]] = []
+        self.pending: List[Tuple[str, int]] = []       # (key, idx) ще не проіндексовані
+        self.sigs: Dict[str, set] = {}                 # key -> {(text, tone)} для дедупу
+
+    def sigs_for(self, key: str, bucket: List[MemoryRecord]) -> set:
+        s = self.sigs.get(key)
+        if s is None:
+            s = self.sigs[key] = {((e.text or "").strip().lower(), e.tone) for e in bucket}
+        return s
+
 
 # === Клас пам'яті ===
 class MemoryManager:
-    def __init__(self) -> None:
-        self.memory: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(
+        self,
+        journal: Optional[bool] = None,
+        backend: Optional[str] = None,
+        shared: Optional[bool] = None,
+    ) -> None:
+        self.memory: Dict[str, List[MemoryRecord]] = {}
         self.triggers: Dict[str, Dict[str, Any]] = {}
+        # шляхи фіксуються на момент створення (atexit-збереження не має "переїхати")
+        self.config_file: Path = CONFIG_FILE
+        self.index_file: Path = INDEX_FILE
+        self.journal_file: Path = JOURNAL_FILE
+        self.snapshot_file: Path = SNAPSHOT_FILE
+        self._storage: MemoryStorage = open_storage(
+            backend or BACKEND or backend_for(self.config_file), self.config_file
+        )
+        # журнальний режим: мутації дописуються в journal_file, знімок — на checkpoint;
+        # транзакційне сховище (SQLite) має власний журнал
+        # спільний режим: зміни інших процесів приходять через журнал, тож він обов'язковий
+        use_shared = (SHARED_MODE if shared is None else shared) and not self._storage.transactional
+        use_journal = (
+            (JOURNAL_MODE if journal is None else journal) or use_shared
+        ) and not self._storage.transactional
+        self._journal: Optional[Journal] = Journal(self.journal_file) if use_journal else None
+        self._shared: Optional[SharedStore] = SharedStore(self.config_file) if use_shared else None
+        self._seq: int = 0  # seq останньої операції журналу, врахованої в пам'яті
+        self._epoch: int = 0  # epoch stamp спільного сховища (checkpoint-и інших процесів)
+        self._jpos: int = 0  # зсув журналу, до якого операції вже застосовано
         self._index: Optional[MemoryIndex] = None
+        self._keys: Optional[KeyIndex] = None  # індекс сирих ключів для find_thoughts
+        self._keys_version: int = 0  # data_version сховища, для якого збудовано _keys
+        # Похідні індекси будуються при першому зверненні (_tag_index() тощо), не на старті;
+        # SQLite (native_search) їх не має: теги — FTS, а трійки ("що в мене зелене?"),
+        # час ("що я казав вчора?", between()) і покупки в ask() — один прохід по таблиці
+        # records на запит (результат ask() кешується до наступної зміни сховища).
+        # тег -> записи + найсвіжіший запис тегу; SQLite шукає теги через FTS
+        self._tags: Optional[TagIndex] = None
+        # трійки (subject, rel, object) -> записи для match()/join()
+        self._triples: Optional[TripleIndex] = None
+        # відсортований час записів для between() і "що я казав вчора?"
+        self._times: Optional[TimeIndex] = None
+        # MinHash/LSH текстів записів — майже-дублікати в межах ключа (підпис ключа — ліниво)
+        self._dups: Optional[NearDupIndex] = None
+        self._band_seed: Optional[BandCache] = None  # смуги зі знімка для побудови _dups
+        # stamp файлу сховища на момент нашого останнього load/save: разом із _seq
+        # визначає стан пам'яті (відбиток файлу індексу) без обходу записів
+        self._stamp: FileStamp = (0, 0, 0)
+        self._snap_stamp: FileStamp = (0, 0, 0)  # stamp JSON-файлу, для якого знімок актуальний
+        # покоління після останнього load_memory: більше — були мутації цього екземпляра
+        self._load_gen: int = 0
+        self._used: bool = False  # були запити до пам'яті (індекси, пошук)
         self._dirty: bool = True
-        _ensure_files()
+        self._index_pending: bool = False  # індекс змінено інкрементально, файл застарів
+        self._batch: Optional[_Batch] = None
+        # покоління сховища: +1 на кожну мутацію, інвалідує кеш запитів
+        self._generation: int = 0
+        self._query_cache = QueryCache(QUERY_CACHE_SIZE)
+        # гістограми стадій MemoryIndex.search; при виході зливаються у stats_file
+        self.search_profile = SearchProfile()
+        self.stats_file: Path = self.config_file.with_suffix(".stats")
         self.load_memory()
+        _LIVE.add(self)
 
     # --- Службове ---
     def _maybe_build(self) -> None:
+        self._used = True
         if self._index is None or self._dirty:
-            self._index = MemoryIndex(self.memory)
-            self._index.build()
+            if self._index is not None:
+                self._index.close()
+            # mmap-файл, якщо він відповідає стану пам'яті; інакше — перебудова із записом
+            self._index = MemoryIndex.open(self.memory, self.index_file, self._state_fp())
+            self._index.profile = self.search_profile
             self._dirty = False
+            self._index_pending = False
+
+    def _index_live(self) -> bool:
+        """Чи є актуальний індекс, який варто оновлювати інкрементально."""
+        return self._index is not None and not self._dirty
+
+    def _state_fp(self) -> bytes:
+        """Відбиток поточного стану пам'яті: stamp сховища + seq журналу (O(1), без обходу записів)."""
+        return state_fingerprint(self._stamp, self._seq)
+
+    def _after_index_change(self) -> None:
+        self._index_pending = True
+        assert self._index is not None
+        if self._index.needs_compaction():
+            # лише в RAM: посеред мутації файл індексу випередив би сховище
+            self._index.compact()
+
+    def _after_save(self) -> None:
+        """Сховище перезаписано: новий stamp, а отже й новий відбиток файлу індексу."""
+        self._stamp = self._storage.stamp or file_stamp(self.config_file)
+        if self._index_live():
+            self._index_pending = True
+
+    def flush_index(self) -> None:
+        """Компакція tombstones і запис інкрементально оновленого індексу на диск."""
+        if self._index_live() and self._index_pending:
+            self._index.save(self.index_file, self._state_fp())
+            self._index_pending = False
+
+    def _at_exit(self) -> None:
+        if self._journal is not None and self._journal.ops:
+            self.checkpoint()
+        elif self._stamp != self._snap_stamp and (self._generation != self._load_gen or self._used):
+            # JSON змінено без checkpoint — наступний старт знову буде швидким; екземпляр,
+            # що лише створений (допоміжний, довідка CLI), нічого не пише
+            self.write_snapshot()
+        self.flush_index()
+        try:
+            self.search_profile.flush(self.stats_file)
+        except OSError:
+            pass  # статистика не варта помилки при виході
+        self._storage.close()
+
+    def close(self) -> None:
+        """Зберегти те, що зберігається при виході (індекс, журнал, знімок), і закрити сховище."""
+        _LIVE.discard(self)
+        self._at_exit()
+        if self._index is not None:
+            self._index.close()
+        if self._shared is not None:
+            self._shared.close()
+
+    def _bump(self) -> None:
+        self._generation += 1
+
+    def _cache_gen(self) -> Tuple[int, int]:
+        """
+        Покоління для кешу запитів: власні мутації + зміни сховища іншими процесами
+        (SQLite: PRAGMA data_version; JSON у спільному режимі доганяється через refresh()).
+        """
+        return self._generation, self._storage.data_version()
+
+    # --- Спільний режим ---
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        if self._shared is None or self._shared.held:
+            yield
+            return
+        with self._shared.lock():
+            self._sync()
+            yield
+
+    def refresh(self) -> int:
+        """
+        Спільний режим: застосувати операції інших процесів, яких ще немає в пам'яті.
+        Без змін — одне читання stamp, без lock. Повертає кількість застосованих
+        операцій (-1 — пам'ять перечитано повністю).
+        """
+        if self._shared is None or self._shared.held or self._batch is not None:
+            return 0
+        stamp = self._shared.read()
+        if stamp is not None and stamp.generation == self._seq and stamp.epoch == self._epoch:
+            return 0
+        with self._shared.lock():
+            return self._sync()
+
+    def _sync(self) -> int:
+        """Під lock: дочитати хвіст журналу від _jpos (або перечитати все, якщо відстали)."""
+        assert self._shared is not None and self._journal is not None
+        stamp = self._shared.read()
+        if stamp is not None and stamp.epoch != self._epoch:
+            if self._seq < stamp.checkpoint_seq:
+                # операції між нашим seq і checkpoint уже не в журналі, а лише у JSON
+                self.load_memory()
+                return -1
+            self._epoch, self._jpos = stamp.epoch, 0
+        n = 0
+        for entry in self._journal.replay(after_seq=self._seq, offset=self._jpos):
+            if int(entry["seq"]) != self._seq + 1:
+                self.load_memory()  # пропуск у seq — зсув застарів
+                return -1
+            self._apply(entry)
+            self._seq += 1
+            n += 1
+        self._jpos = self._journal.end_offset
+        if stamp is None or stamp.generation != self._seq:
+            self._publish()
+        return n
+
+    def _publish(self, checkpoint: bool = False) -> None:
+        """Під lock, після власного запису в журнал (або checkpoint): оновити stamp."""
+        if self._shared is None:
+            return
+        old = self._shared.read()
+        ckpt = old.checkpoint_seq if old is not None else 0
+        if checkpoint:
+            self._epoch = max(self._epoch, old.epoch if old is not None else 0) + 1
+            self._jpos = 0
+            ckpt = self._seq
+        else:
+            self._jpos = self._journal.size() if self._journal is not None else 0
+        self._shared.write(Stamp(self._seq, self._epoch, ckpt))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Статистика кешу запитів (hits/misses/stale/hit_rate) і поточне покоління."""
+        return {**self._query_cache.stats(), "generation": self._generation}
+
+    def search_stats(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Гістограми часу й лічильники стадій пошуку: збережені попередніми процесами
+        (stats_file) + накопичені цим. reset=True — обнулити після читання.
+        """
+        total = SearchProfile()
+        total.merge(SearchProfile.read(self.stats_file))
+        total.merge(self.search_profile.as_dict())
+        if reset:
+            self.search_profile.reset()
+            try:
+                self.stats_file.unlink()
+            except FileNotFoundError:
+                pass
+        return total.as_dict()
+
+    def last_search_stats(self) -> Optional[Dict[str, Any]]:
+        """Стадії останнього пошуку в індексі (без попадань у кеш і SQLite-пошуку) або None."""
+        if self._index is None or self._index.last_stats is None:
+            return None
+        return self._index.last_stats.as_dict()
 
     def _augment_query(self, q: str) -> str:
         toks = tokenize(normalize(q))
         stems = [normalize_key(t) for t in toks if normalize_key(t) and normalize_key(t) != t]
         return (q or "").strip() + (" " + " ".join(stems) if stems else "")
 
+    # --- Похідні індекси (ліниво) ---
+    def _key_index(self) -> KeyIndex:
+        # SQLite: коміти інших з'єднань змінюють ключі повз нас — перебудова за data_version
+        version = self._storage.data_version()
+        if self._keys is None or version != self._keys_version:
+            self._keys = KeyIndex(self.memory.keys())
+            self._keys_version = version
+        return self._keys
+
+    def _tag_index(self) -> Optional[TagIndex]:
+        if self._tags is None and not self._storage.native_search:
+            self._tags = TagIndex(self.memory)
+        return self._tags
+
+    def _triple_index(self) -> Optional[TripleIndex]:
+        if self._triples is None and not self._storage.native_search:
+            self._triples = TripleIndex(self.memory)
+        return self._triples
+
+    def _time_index(self) -> Optional[TimeIndex]:
+        if self._times is None and not self._storage.native_search:
+            self._times = TimeIndex(self.memory)
+        return self._times
+
+    def _dup_index(self) -> Optional[NearDupIndex]:
+        if self._dups is None and NEAR_DUP_THRESHOLD > 0 and not self._storage.native_search:
+            self._dups = NearDupIndex(self.memory, NEAR_DUP_THRESHOLD, self._band_seed)
+            self._band_seed = None
+        return self._dups
+
     # --- IO ---
+    def _read_snapshot(self, stamp: FileStamp) -> Optional[Snapshot]:
+        """Знімок, актуальний для JSON-файлу сховища зі stamp; None — читати JSON."""
+        if self._storage.name != "json" or not any(stamp):
+            return None
+        try:
+            snap = read_snapshot(self.snapshot_file, stamp)
+        except SnapshotError:
+            return None  # пошкоджений знімок: JSON лишається джерелом правди
+        if snap is not None:
+            self._snap_stamp = stamp
+            restore_index(snap, self.index_file)
+        return snap
+
     def load_memory(self) -> None:
-        raw = _read_json(CONFIG_FILE) or {}
-        self.triggers = raw.get("triggers", {}) or {}
-        self.memory = {k: v for k, v in raw.items() if k != "triggers" and isinstance(v, list)}
+        if self._shared is not None and not self._shared.held:
+            with self._shared.lock():  # не читати JSON і журнал посеред чужого checkpoint
+                return self.load_memory()
+        # stamp — до читання: якщо файл замінять посеред читання, стан вважатиметься застарілим
+        stamp = file_stamp(self.config_file)
+        snap = self._read_snapshot(stamp)
+        if snap is not None:
+            self.memory, self.triggers, meta = snap.memory, snap.triggers, snap.meta
+        else:
+            self.memory, self.triggers, meta = self._storage.load()
+        self._stamp = stamp if any(stamp) else file_stamp(self.config_file)  # load() міг створити файл
+        self._seq = int(meta.get("journal_seq", 0) or 0)
+        self._keys = self._tags = self._triples = self._times = self._dups = None
+        self._band_seed = snap.bands if snap is not None else None
         self._dirty = True
+        self._bump()
+        self._load_gen = self._generation
+        if self._storage.transactional:
+            return
+        replayed = self._replay_journal()
+        if replayed and self._journal is None:
+            # журнал лишився від журнального режиму — згорнути його у знімок
+            self.checkpoint()
+        if self._shared is not None:
+            stamp = self._shared.read()
+            self._epoch = stamp.epoch if stamp is not None else 0
+            if stamp is None or stamp.generation != self._seq:
+                self._publish()
+
+    def _replay_journal(self) -> int:
+        """Відновлення після збою: застосувати операції журналу новіші за знімок."""
+        journal = self._journal or Journal(self.journal_file)
+        n = 0
+        for entry in journal.replay(after_seq=self._seq):
+            self._apply(entry)
+            self._seq = int(entry["seq"])
+            n += 1
+        self._jpos = journal.end_offset
+        return n
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        if op == "add":
+            self._apply_add(entry["key"], as_record(entry["rec"]))
+        elif op == "del":
+            self._apply_delete(entry["key"])
+        elif op == "clear":
+            self._apply_clear()
+
+    def _meta(self) -> Dict[str, Any]:
+        return {"journal_seq": self._seq} if self._seq else {}
 
     def _dump(self) -> dict:
-        data = dict(self.memory)
+        data = dict(self.memory.items())
         if self.triggers:
             data["triggers"] = self.triggers
+        if self._seq:
+            data["_meta"] = self._meta()
         return data
 
     def save_memory(self) -> None:
-        _safe_write(CONFIG_FILE, self._dump())
+        if self._journal is not None:
+            self.checkpoint()
+        else:
+            self._storage.save(self.memory, self.triggers, self._meta())
+            self._after_save()
+
+    @_exclusive
+    def checkpoint(self) -> None:
+        """Записати повний знімок і очистити журнал (seq у знімку робить це безпечним)."""
+        self._storage.save(self.memory, self.triggers, self._meta())
+        self._after_save()
+        if not self._storage.transactional:
+            (self._journal or Journal(self.journal_file)).truncate()
+            self._publish(checkpoint=True)
+            self.write_snapshot()
+
+    def write_snapshot(self, path: Optional[Path] = None) -> Optional[Path]:
+        """
+        Бінарний знімок поточної пам'яті для швидкого старту (лише JSON-сховище).
+        Прив'язаний до stamp JSON-файлу, з якого пам'ять завантажено або в який востаннє
+        збережено: якщо файл відтоді змінив інший процес, пам'ять у RAM застаріла
+        і знімок не пишеться (інакше він "перекрив" би чужі записи).
+        None — знімок не записано (інше сховище, відкритий пакет, чужа зміна, помилка запису).
+        """
+        if self._storage.name != "json" or self._batch is not None:
+            return None
+        if not any(self._stamp) or file_stamp(self.config_file) != self._stamp:
+            return None
+        path = Path(path or self.snapshot_file)
+        self.flush_index()
+        fp = self._state_fp()
+        if self._dups is not None:
+            bands = self._dups.export()
+        elif self._band_seed is not None:
+            bands = self._band_seed.export(self.memory)
+        else:
+            bands = None  # MinHash не рахуємо заради знімка — доберуться при першому add_thought
+        stamp = self._stamp
+        try:
+            write_snapshot(
+                path, self.memory, self.triggers, self._meta(),
+                stamp=stamp, fingerprint=fp, bands=bands, index_blob=index_blob(self.index_file, fp),
+            )
+        except (OSError, SnapshotError):
+            return None
+        if path == self.snapshot_file:
+            self._snap_stamp = stamp
+        return path
+
+    def verify_snapshot(self, path: Optional[Path] = None) -> Dict[str, Any]:
+        """Перевірка знімка (заголовок, crc, записи) і його актуальності для JSON-файлу."""
+        return verify_snapshot(Path(path or self.snapshot_file), self.config_file)
+
+    def _persist(self, entry: Dict[str, Any]) -> None:
+        """Зберегти мутацію: рядок у журнал (O(зміни)) або повний перезапис знімка."""
+        if self._batch is not None:
+            self._batch.entries.append(entry)
+            return
+        if self._storage.transactional:
+            return  # сховище вже зафіксувало зміну
+        if self._journal is None:
+            self.save_memory()
+            return
+        self._seq += 1
+        self._journal.append({"seq": self._seq, **entry})
+        self._publish()
+        if self._journal.ops >= CHECKPOINT_OPS or self._journal.size() >= CHECKPOINT_BYTES:
+            self.checkpoint()
+
+    # --- Застосування мутацій (спільне для API та replay) ---
+    def _apply_add(self, key_norm: str, rec: MemoryRecord) -> None:
+        batch = self._batch
+        created = key_norm not in self.memory
+        bucket = self.memory.setdefault(key_norm, [])
+        bucket.append(rec)
+        if self._keys is not None:
+            self._keys.add(key_norm)
+        if self._tags is not None:
+            self._tags.add(key_norm, len(bucket) - 1, rec)
+        if self._triples is not None:
+            self._triples.add(key_norm, len(bucket) - 1, rec)
+        if self._times is not None:
+            self._times.add(key_norm, len(bucket) - 1, rec)
+        if self._dups is not None:
+            self._dups.add(key_norm, len(bucket) - 1, rec)
+        self._bump()
+        if batch is not None:
+            if not self._storage.transactional:
+                batch.undo.append(("add", key_norm, created))
+            batch.pending.append((key_norm, len(bucket) - 1))
+        elif self._index_live():
+            self._index.add_record(key_norm, len(bucket) - 1)
+            self._after_index_change()
+
+    def _apply_delete(self, k: str) -> None:
+        if k not in self.memory:
+            return
+        batch = self._batch
+        live = self._index_live()
+        if batch is not None:
+            if live:
+                # індекс має знати про всі записи ключа, перш ніж їх поховати
+                for key, i in batch.pending:
+                    if key == k:
+                        self._index.add_record(key, i)
+            if not self._storage.transactional:
+                batch.undo.append(("del", k, self.memory[k]))
+            batch.pending = [p for p in batch.pending if p[0] != k]
+            batch.sigs.pop(k, None)
+        if live:
+            self._index.remove_key(k)
+        if self._tags is not None:
+            self._tags.discard_key(k)
+        if self._triples is not None:
+            self._triples.discard_key(k)
+        if self._times is not None:
+            self._times.discard_key(k)
+        if self._dups is not None:
+            self._dups.discard_key(k)
+        del self.memory[k]
+        if self._keys is not None:
+            self._keys.discard(k)
+        self._bump()
+        if live:
+            self._after_index_change()
+
+    def _apply_clear(self) -> None:
+        batch = self._batch
+        if batch is not None:
+            if not self._storage.transactional:
+                batch.undo.append(("clear", dict(self.memory)))
+            batch.pending = []
+            batch.sigs = {}
+        # очищаємо на місці: індекс тримає посилання на цей самий dict
+        self.memory.clear()
+        if self._keys is not None:
+            self._keys.clear()
+        if self._tags is not None:
+            self._tags.clear()
+        if self._triples is not None:
+            self._triples.clear()
+        if self._times is not None:
+            self._times.clear()
+        if self._dups is not None:
+            self._dups.clear()
+        self._bump()
+        if self._index_live():
+            self._index.clear()
+            self._after_index_change()
+
+    # --- Пакети / транзакції ---
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["MemoryManager"]:
+        """
+        Транзакція: усередині мутації лише змінюють пам'ять, а індексування
+        і збереження (один запис журналу / знімка) відбуваються на виході.
+        Виняток усередині — відкат змін, на диск нічого не пишеться.
+        Для транзакційного сховища пакет — це одна транзакція БД.
+        """
+        outer = self._batch is None
+        # спільний режим: увесь пакет — під одним lock сховища
+        with self._locked() if outer else contextlib.nullcontext():
+            if outer:
+                self._storage.begin()
+                self._batch = _Batch()
+            batch = self._batch
+            batch.depth += 1
+            try:
+                yield self
+            except BaseException:
+                batch.depth -= 1
+                if outer:
+                    self._batch = None
+                    self._rollback(batch)
+                raise
+            batch.depth -= 1
+            if outer:
+                self._batch = None
+                self._commit(batch)
+
+    def _commit(self, batch: _Batch) -> None:
+        self._storage.commit()
+        if not batch.entries:
+            return
+        if self._index_live():
+            if len(batch.pending) >= BATCH_REBUILD_MIN:
+                self._dirty = True  # дешевше перебудувати при наступному пошуку
+            else:
+                for key, i in batch.pending:
+                    self._index.add_record(key, i)
+                self._after_index_change()
+        if self._storage.transactional:
+            return
+        if self._journal is None:
+            self.save_memory()
+            return
+        entries = []
+        for entry in batch.entries:
+            self._seq += 1
+            entries.append({"seq": self._seq, **entry})
+        self._journal.append_many(entries)
+        self._publish()
+        if self._journal.ops >= CHECKPOINT_OPS or self._journal.size() >= CHECKPOINT_BYTES:
+            self.checkpoint()
+
+    def _rollback(self, batch: _Batch) -> None:
+        self._bump()
+        if self._storage.transactional:
+            self._storage.rollback()
+            self._keys = None
+            self._dirty = True
+            return
+        for item in reversed(batch.undo):
+            op = item[0]
+            if op == "add":
+                _, key, created = item
+                self.memory[key].pop()
+                if created:
+                    del self.memory[key]
+                    if self._keys is not None:
+                        self._keys.discard(key)
+            elif op == "del":
+                _, key, bucket = item
+                self.memory[key] = bucket
+                if self._keys is not None:
+                    self._keys.add(key)
+            elif op == "clear":
+                self.memory.update(item[1])
+                if self._keys is not None:
+                    self._keys.update(item[1])
+        if batch.undo and self._tags is not None:
+            self._tags.rebuild()
+        if batch.undo and self._triples is not None:
+            self._triples.rebuild()
+        if batch.undo and self._times is not None:
+            self._times.rebuild()
+        if batch.undo and self._dups is not None:
+            self._dups.rebuild()
+        if batch.undo and self._index is not None:
+            # видалення/очищення вже торкнулися індексу — простіше перебудувати
+            self._dirty = True
 
     # --- CRUD ---
+    @_exclusive
     def add_thought(
         self,
         key: str,
@@ -119,51 +741,93 @@ class MemoryManager:
         *,
         triple: Optional[Tuple[Any, Any, Any]] = None,
         rel: Optional[str] = None,
-    ) -> None:
+    ) -> bool:
+        """
+        Додати думку; False — порожній ключ або дублікат: той самий текст+тон у межах
+        ключа, а з LASTIVKA_NEAR_DUP > 0 — ще й майже той самий текст (перефразування)
+        з тим самим тоном у межах ключа.
+        """
         key_raw = (key or "").strip()
         if not key_raw:
-            return
+            return False
         key_norm = normalize_key(key_raw)
 
-        self.memory.setdefault(key_norm, [])
         t_norm = (thought or "").strip().lower()
 
-        for e in self.memory[key_norm]:
-            if e.get("text", "").strip().lower() == t_norm and e.get("tone") == tone:
-                return
-
-        rec = {
-            "key_raw": key_raw,
-            "key_norm": key_norm,
-            "text": (thought or "").strip(),
-            "tone": tone,
-            "timestamp": datetime.now().isoformat(),
-            "tags": [str(t).strip().lower() for t in (tags or []) if str(t).strip()],
-            "rel": rel,
-            "triple": triple if triple else (key_norm, rel or "is", (thought or "").strip()),
-        }
-        self.memory[key_norm].append(rec)
-        self._dirty = True
-        self.save_memory()
+        if self._batch is not None:
+            # у пакеті — O(1) через множину сигнатур ключа
+            sigs = self._batch.sigs_for(key_norm, self.memory.get(key_norm, []))
+            if (t_norm, tone) in sigs:
+                return False
+            sigs.add((t_norm, tone))
+        else:
+            for e in self.memory.get(key_norm, []):
+                if (e.text or "").strip().lower() == t_norm and e.tone == tone:
+                    return False
+
+        text = (thought or "").strip()
+        dups = self._dup_index()
+        if dups is not None and dups.find(key_norm, text, tone) is not None:
+            return False
+        rec = MemoryRecord(
+            key_raw=key_raw,
+            key_norm=key_norm,
+            text=text,
+            tone=tone,
+            ts=datetime.now().timestamp(),
+            tags=tuple(str(t).strip().lower() for t in (tags or []) if str(t).strip()),
+            rel=rel,
+            triple=triple if triple else (key_norm, rel or "is", text),
+        )
+        self._apply_add(key_norm, rec)
+        self._persist({"op": "add", "key": key_norm, "rec": rec})
+        return True
 
+    def add_thoughts(self, items: Iterable[Any]) -> int:
+        """
+        Пакетне додавання: елементи — (key, thought[, tone[, tags]]) або dict
+        з полями key, thought/text/value, tone, tags, triple, rel.
+        Усе або нічого: помилка на будь-якому елементі відкочує весь пакет.
+        Повертає кількість доданих (без дублікатів).
+        """
+        added = 0
+        with self.batch():
+            for item in items:
+                if isinstance(item, dict):
+                    text = item.get("thought", item.get("text", item.get("value", "")))
+                    ok = self.add_thought(
+                        item.get("key", ""), text,
+                        tone=item.get("tone") or "нейтральний",
+                        tags=item.get("tags"),
+                        triple=item.get("triple"),
+                        rel=item.get("rel"),
+                    )
+                else:
+                    ok = self.add_thought(*item)
+                added += bool(ok)
+        return added
+
+    @_synced
     def get_thoughts_by_key(self, k: str) -> List[Dict[str, Any]]:
-        return list(self.memory.get(normalize_key(k), []))
+        return [as_dict(r) for r in self.memory.get(normalize_key(k), [])]
 
+    @_synced
     def get_all_memory(self) -> Dict[str, List[Dict[str, Any]]]:
-        return dict(self.memory)
+        return {k: [as_dict(r) for r in arr] for k, arr in self.memory.items()}
 
+    @_exclusive
     def delete_thoughts_by_key(self, k: str) -> None:
         k = normalize_key(k)
         if k in self.memory:
-            del self.memory[k]
-            self._dirty = True
-            self.save_memory()
+            self._apply_delete(k)
+            self._persist({"op": "del", "key": k})
 
+    @_exclusive
     def clear_memory(self) -> None:
-        self.memory = {}
-        self._dirty = True
-        self.save_memory()
+        self._apply_clear()
+        self._persist({"op": "clear"})
 
+    @_synced
     def export_memory(self, path: str | Path) -> None:
         out = Path(path)
         out.parent.mkdir(parents=True, exist_ok=True)
@@ -174,38 +838,146 @@ class MemoryManager:
         return self.get_all_memory()
 
     # --- Додаткові ---
+    @_synced
     def get_all_keys(self) -> List[str]:
         return sorted(self.memory.keys())
 
+    @_synced
     def search_by_tag(self, tag: str) -> List[Dict[str, Any]]:
+        if self._storage.native_search:
+            return [as_dict(r) for r in self._storage.by_tag(tag)]
         t = (tag or "").strip().lower()
+        tags = self._tag_index()
+        if not t or tags is None:
+            return []
+        return [as_dict(r) for r in tags.records(t)]
+
+    # --- Трійки ---
+    def _match_refs(self, subject: Any = None, rel: Any = None, obj: Any = None) -> List[Tuple[str, int]]:
+        triples = self._triple_index()
+        if triples is not None:
+            return triples.match(subject, rel, obj)
+        # без індексу (SQLite) — обхід пам'яті з тими самими правилами збігу
+        s, p, o = pattern_terms(subject, rel, obj)
+        out: List[Tuple[str, int]] = []
+        for key, arr in self.memory.items():
+            for i, rec in enumerate(arr):
+                terms = record_terms(key, rec)
+                if terms is not None and matches(terms, s, p, o):
+                    out.append((key, i))
+        return out
+
+    @_synced
+    def match(self, subject: Any = None, rel: Any = None, obj: Any = None) -> List[Dict[str, Any]]:
+        """
+        Записи, чия трійка (subject, rel, object) відповідає шаблону; None — будь-що.
+        match(rel="is", obj="зелений") -> усе, що "є зеленим".
+        """
+        return [as_dict(self.memory[k][i]) for k, i in self._match_refs(subject, rel, obj)]
+
+    @_synced
+    def join(
+        self,
+        first: Dict[str, Any],
+        second: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Один перехід по трійках: об'єкт кожного запису за шаблоном first стає
+        subject для шаблону second (rel/obj). Напр. join({"subject": "кава"}, {"rel": "has"})
+        -> [(кава is капучино, капучино has піна), ...].
+        """
+        second = {k: v for k, v in (second or {}).items() if k in ("rel", "obj")}
+        out: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for key, i in self._match_refs(**first):
+            rec = self.memory[key][i]
+            tri = rec.get("triple")
+            for key2, j in self._match_refs(subject=tri[2], **second):
+                if (key2, j) != (key, i):
+                    out.append((as_dict(rec), as_dict(self.memory[key2][j])))
+        return out
+
+    # --- Час ---
+    def _time_refs(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        newest_first: bool = True,
+    ) -> Iterator[Tuple[str, int]]:
+        times = self._time_index()
+        if times is not None:
+            for _, key, i in times.between(start, end, newest_first):
+                yield key, i
+            return
+        # без індексу (SQLite) — обхід пам'яті
+        hits = []
+        for n, (key, arr) in enumerate(self.memory.items()):
+            for i, rec in enumerate(arr):
+                ts = rec.ts
+                if ts is not None and (start is None or ts >= start) and (end is None or ts < end):
+                    hits.append((ts, n, i, key))
+        hits.sort(key=lambda h: h[:3])
+        for _, _, i, key in (reversed(hits) if newest_first else hits):
+            yield key, i
+
+    @_synced
+    def between(
+        self,
+        start: Any = None,
+        end: Any = None,
+        limit: Optional[int] = None,
+        newest_first: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Записи з часом start <= timestamp < end (datetime / date / ISO-рядок / epoch;
+        None — без межі), найновіші першими. between(date.today()) -> усе за сьогодні.
+        """
         out: List[Dict[str, Any]] = []
-        for arr in self.memory.values():
-            for rec in arr:
-                if t in [str(x).lower() for x in (rec.get("tags") or [])]:
-                    out.append(rec)
+        for key, i in self._time_refs(as_ts(start), as_ts(end), newest_first):
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(as_dict(self.memory[key][i]))
         return out
 
+    def _ask_in_range(self, start: float, end: float, rest: str) -> Optional[Dict[str, Any]]:
+        """
+        Відповідь на питання з часовим виразом: найсвіжіший запис діапазону, а якщо
+        лишились змістовні слова — запис із найбільшим збігом стемів (ключ, текст, об'єкт).
+        """
+        words = {t for t in tokenize(rest) if t not in _TIME_Q_FILLER}
+        refs = self._time_refs(start, end)
+        if not words:
+            key, i = next(refs, (None, None))
+            return None if key is None else self._result_item(key, self.memory[key][i], 50.0)
+        q_stems = object_terms(" ".join(words))
+        best, best_score = None, 0
+        for key, i in refs:
+            rec = self.memory[key][i]
+            tri = rec.get("triple")
+            stems = object_terms(" ".join((rec.get("key_raw") or key, rec.get("text") or "", str(tri[2]) if tri else "")))
+            score = len(q_stems & stems)
+            if score > best_score:  # refs ідуть від найновіших: при рівності лишається свіжіший
+                best, best_score = (key, i), score
+        if best is None:
+            return None
+        return self._result_item(best[0], self.memory[best[0]][best[1]], 50.0)
+
     # --- Пошук ---
+    @_synced
     def find_thoughts(self, qtext: str) -> List[Dict[str, Any]]:
         q = normalize_key(qtext)
-        out: List[Dict[str, Any]] = []
+        out: List[Any] = []
         out.extend(self.memory.get(q, []))
-        if out:
-            return out
-
-        for k, arr in self.memory.items():
-            if k.startswith(q):
-                out.extend(arr)
-        if out:
-            return out
-
-        qlen = len(q)
-        for k in (k for k in self.memory.keys() if abs(len(k) - qlen) <= 2):
-            if lev1(k, q):
-                out.extend(self.memory.get(k, []))
-        return out
+        if not out:
+            for k in self._key_index().prefix(q):
+                out.extend(self.memory[k])
+        if not out:
+            # lev1: fuzzy > 0.8 серед ключів із різницею довжин <= 2 (кандидати — з триграм)
+            for k, r in self._key_index().fuzzy(q, 0.8, max_len_diff=2):
+                if r > 0.8:
+                    out.extend(self.memory.get(k, []))
+        return [as_dict(r) for r in out]
 
+    @_synced
     def smart_search(
         self,
         query: str,
@@ -213,40 +985,86 @@ class MemoryManager:
         weights: Optional[Dict[str, float]] = None,
         debug: bool = False,
     ) -> List[Dict[str, Any]]:
-        self._maybe_build()
-        assert self._index is not None
+        ck = ("smart", " ".join(normalize(query).split()), weights_key(weights), int(limit))
+        if not debug:
+            hit = self._query_cache.get(ck, self._cache_gen())
+            if hit is not MISS:
+                return [dict(x) for x in hit]
         aug_query = self._augment_query(query)
-        ranked = self._index.search(aug_query, weights=weights, limit=limit, debug=debug)
-        out: List[Dict[str, Any]] = []
-        for key_norm, rec, score in ranked:
-            # ВАЖЛИВО: назовні повертаємо ОРИГІНАЛЬНИЙ ключ (key_raw),
-            # аби тести не бачили стем "кав" замість "кава".
-            item = {
-                "key": rec.get("key_raw", key_norm),
-                "score": round(float(score), 4),
-            }
-            item.update(rec)  # додаємо key_raw, key_norm, text, tone, ...
-            out.append(item)
+        if self._storage.native_search:
+            ranked = self._storage.search(aug_query, limit=limit, weights=weights)
+        else:
+            self._maybe_build()
+            assert self._index is not None
+            ranked = self._index.search(aug_query, weights=weights, limit=limit, debug=debug)
+        out = [self._result_item(key_norm, rec, score) for key_norm, rec, score in ranked]
+        self._query_cache.put(ck, self._cache_gen(), [dict(x) for x in out])
         return out
 
+    @staticmethod
+    def _result_item(key_norm: str, rec: MemoryRecord, score: float) -> Dict[str, Any]:
+        # ВАЖЛИВО: назовні повертаємо ОРИГІНАЛЬНИЙ ключ (key_raw),
+        # аби тести не бачили стем "кав" замість "кава".
+        item = {
+            "key": rec.get("key_raw", key_norm),
+            "score": round(float(score), 4),
+        }
+        item.update(rec)  # додаємо key_raw, key_norm, text, tone, ...
+        return item
+
+    @_synced
+    def iter_search(
+        self,
+        query: str,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Ті самі результати, що й smart_search, але ліниво й без limit (пагінація)."""
+        aug_query = self._augment_query(query)
+        if self._storage.native_search:
+            ranked = self._storage.iter_search(aug_query, weights=weights)
+        else:
+            self._maybe_build()
+            assert self._index is not None
+            ranked = self._index.iter_search(aug_query, weights=weights)
+        for key_norm, rec, score in ranked:
+            yield self._result_item(key_norm, rec, score)
+
+    @_synced
     def ask(self, query: str) -> Optional[Dict[str, Any]]:
+        # дата в ключі: "вчора" завтра означатиме інший день
+        ck = ("ask", " ".join(normalize(query).split()), datetime.now().date().toordinal())
+        gen = self._cache_gen()
+        hit = self._query_cache.get(ck, gen)
+        if hit is not MISS:
+            return dict(hit) if hit else None
+        ans = self._ask(query)
+        self._query_cache.put(ck, gen, dict(ans) if ans else None)
+        return ans
+
+    def _ask(self, query: str) -> Optional[Dict[str, Any]]:
+        qn = normalize(query)
+        m = _RELATIONAL_Q.match(qn)
+        if m:
+            # "що в мене зелене?" -> найсвіжіший запис з об'єктом "зелене" (індекс трійок)
+            refs = self._match_refs(obj=m.group(1))
+            if refs:
+                key, i = max(refs, key=lambda r: _ts_or_min(self.memory[r[0]][r[1]]))
+                return self._result_item(key, self.memory[key][i], 50.0)
+
+        tr = parse_time_range(qn)
+        if tr:
+            # "що я казав вчора?", "що було минулого тижня про каву?" -> індекс часу
+            ans = self._ask_in_range(*tr)
+            if ans is not None:
+                return ans
+
         top = (self.smart_search(query, limit=1) or [])
         if top:
             return top[0]
 
-        qn = normalize(query)
         if re.search(r"\b(куп\w*|придб\w*|візьми|додай до списку)\b", qn):
-            tag_priority = {"покупка": 3, "покупки": 3, "товар": 3, "магазин": 3, "напій": 2, "їжа": 1}
-            best, best_score, best_key_norm = None, (-1, ""), None
-            for k, arr in self.memory.items():
-                for rec in arr:
-                    tags = [str(t).lower() for t in (rec.get("tags") or [])]
-                    pr = max((tag_priority.get(t, 0) for t in tags), default=0)
-                    ts = rec.get("timestamp") or ""
-                    score = (pr, ts)
-                    if score > best_score:
-                        best_score, best, best_key_norm = score, rec, k
-            if best:
+            best, best_key_norm = self._latest_by_tag_priority(_PURCHASE_TAG_PRIORITY)
+            if best is not None:
                 return {
                     # теж повертаємо оригінал:
                     "key": best.get("key_raw", best_key_norm),
@@ -262,12 +1080,44 @@ class MemoryManager:
                 }
         return None
 
+    def _latest_by_tag_priority(self, priority: Dict[str, int]) -> Tuple[Optional[MemoryRecord], Optional[str]]:
+        """
+        Запис із найвищим (пріоритет тегу, час); без пріоритетних тегів — найсвіжіший узагалі.
+        З індексом тегів — O(кількості тегів), інакше повний обхід пам'яті.
+        """
+        tags = self._tag_index()
+        if tags is not None:
+            best = None
+            for tag, pr in priority.items():
+                hit = tags.latest(tag)
+                if hit is not None and (best is None or (pr, hit[0]) > best[0]):
+                    best = ((pr, hit[0]), hit[1], hit[2])
+            if best is None:
+                hit = tags.latest(ALL_TAGS)
+                if hit is None:
+                    return None, None
+                best = ((0, hit[0]), hit[1], hit[2])
+            _, key, i = best
+            return self.memory[key][i], key
+        best_rec, best_score, best_key_norm = None, (-1, float("-inf")), None
+        for k, arr in self.memory.items():
+            for rec in arr:
+                tags = [str(t).lower() for t in (rec.get("tags") or [])]
+                pr = max((priority.get(t, 0) for t in tags), default=0)
+                score = (pr, _ts_or_min(rec))
+                if score > best_score:
+                    best_score, best_rec, best_key_norm = score, rec, k
+        return best_rec, best_key_norm
+
 # === Глобальний екземпляр ===
-MEMORY = MemoryManager()
+# Створюється при першому зверненні (MEMORY.add_thought(...)), а не під час імпорту
+MEMORY = LazyProxy(MemoryManager)
 memory = MEMORY
 
 # === CLI (для зручності локального виклику) ===
 if __name__ == "__main__":
+    import argparse
+
     p = argparse.ArgumentParser(description="Управління пам’яттю Ластівки")
     p.add_argument('--search', type=str)
     p.add_argument('--key', type=str)
@@ -277,6 +1127,7 @@ if __name__ == "__main__":
     p.add_argument('--smart', type=str)
     p.add_argument('--ask', type=str)
     p.add_argument('--weights', type=str)
+    p.add_argument('--ranking', choices=('classic', 'bm25'), default=None)
     p.add_argument('--debug', action='store_true')
     p.add_argument('--test', action='store_true')
     p.add_argument('--add', nargs=2, metavar=('KEY', 'TEXT'))
@@ -285,7 +1136,7 @@ if __name__ == "__main__":
     p.add_argument('--rel', type=str, default=None)
     p.add_argument('--clear', action='store_true')
     p.add_argument('--keys', action='store_true')
-    p.add_argument('--stats', action='store_true')
+    p.add_argument('--stats', action='store_true')  # з --search/--smart — стадії цього запиту
 
     args = p.parse_args()
 
@@ -295,7 +1146,10 @@ if __name__ == "__main__":
         MEMORY.add_thought(key, text, tone=args.tone, tags=tags, rel=args.rel)
         print(f"[+] Додано: {key!r} → {text!r}")
     elif args.search:
-        print(json.dumps(MEMORY.smart_search(args.search, debug=args.debug), ensure_ascii=False, indent=2))
+        weights = {"ranking": args.ranking} if args.ranking else None
+        print(json.dumps(MEMORY.smart_search(args.search, weights=weights, debug=args.debug), ensure_ascii=False, indent=2))
+        if args.stats:
+            print(json.dumps(MEMORY.last_search_stats(), ensure_ascii=False, indent=2))
     elif args.key:
         print(json.dumps(MEMORY.get_thoughts_by_key(args.key), ensure_ascii=False, indent=2))
     elif args.delete:
@@ -313,7 +1167,11 @@ if __name__ == "__main__":
                 weights = json.loads(args.weights)
             except Exception:
                 pass
+        if args.ranking:
+            weights = {**(weights or {}), "ranking": args.ranking}
         print(json.dumps(MEMORY.smart_search(args.smart, weights=weights, debug=args.debug), ensure_ascii=False, indent=2))
+        if args.stats:
+            print(json.dumps(MEMORY.last_search_stats(), ensure_ascii=False, indent=2))
     elif args.ask:
         ans = MEMORY.ask(args.ask)
         print(json.dumps({"answer": None} if not ans else {
@@ -333,7 +1191,10 @@ if __name__ == "__main__":
             "keys": len(MEMORY.memory),
             "records": total_records,
             "triggers": len(MEMORY.triggers or {}),
-            "config_file": str(CONFIG_FILE),
+            "backend": MEMORY._storage.name,
+            "config_file": str(MEMORY._storage.path),
+            "query_cache": MEMORY.cache_stats(),
+            "search": MEMORY.search_stats(),
         }, ensure_ascii=False, indent=2))
     elif args.test:
         MEMORY.clear_memory()
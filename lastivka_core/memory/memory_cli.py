@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 
@@ -87,6 +88,34 @@ def list_memories(archive: bool = False):
         return _MM.get_all_memory()
     return _lt_list_memories(archive=archive) if _LT_OK else {}
 
+def import_memories(path: str) -> int:
+    """
+    Імпорт JSON-файлу пам'яті (формат manager або long_memory) одним пакетом.
+    Повертає кількість доданих записів.
+    """
+    import json
+    from lastivka_core.memory.index import _normalize_memory_dict
+    raw = json.loads(Path(path).read_text(encoding="utf-8-sig"))
+    data = _normalize_memory_dict(raw)
+    if _MM is not None:
+        return _MM.add_thoughts(
+            {
+                "key": rec.get("key_raw") or key,
+                "text": _val_text(rec),
+                "tone": rec.get("tone"),
+                "tags": rec.get("tags"),
+            }
+            for key, items in data.items() if key != "triggers"
+            for rec in items if _val_text(rec)
+        )
+    n = 0
+    for key, items in data.items():
+        for rec in items:
+            if _val_text(rec):
+                _lt_remember(key, _val_text(rec), tone=rec.get("tone"))
+                n += 1
+    return n
+
 def recall_from_question(question: str):
     """
     Спроба семантичної відповіді:
@@ -186,6 +215,8 @@ def _ensure_index():
             from lastivka_core.memory.index import _LAST_INDEX as _IDX  # type: ignore
             _LAST_INDEX = _IDX
         except Exception: _LAST_INDEX = None
+        if _LAST_INDEX is not None and _MM is not None:
+            _LAST_INDEX.profile = _MM.search_profile  # пошуки CLI теж потрапляють у гістограми
     return _LAST_INDEX
 
 # ---------------- Парсинг прапорців (ручний) ----------------
@@ -196,6 +227,54 @@ def _get_after(argv, flag, cast=str, default=None):
         except Exception: return default
     return default
 
+# ---------------- Бінарний знімок ----------------
+def snapshot_command(args, mm=None) -> bool:
+    """snapshot create|verify [--path P]: записати / перевірити знімок пам'яті (manager.MEMORY)."""
+    mm = mm if mm is not None else _MM
+    action = args[0].lower() if args else ""
+    path = _get_after(args, "--path", str, None)
+    if mm is None or action not in ("create", "verify"):
+        print("Використання: snapshot create|verify [--path P]"); return False
+    if action == "create":
+        out = mm.write_snapshot(path)
+        if out is None:
+            print(f"❌ Знімок не записано (сховище: {mm._storage.name})."); return False
+        print(f"✅ Знімок: {out} ({os.path.getsize(out)} байт)"); return True
+    report = mm.verify_snapshot(path)
+    if not report["ok"]:
+        print(f"❌ Знімок {report['path']}: {report['error']}"); return False
+    fresh = "актуальний" if report.get("fresh") else "застарів (буде прочитано JSON)"
+    print(f"✅ Знімок {report['path']}: v{report['version']}, keys={report['keys']}, "
+          f"records={report['records']}, index={report['index_bytes']} байт, {fresh}")
+    return True
+
+# ---------------- Статистика пошуку ----------------
+def _print_stage_stats(stats: dict):
+    """Стадії одного пошуку (SearchStats.as_dict())."""
+    print(f"⏱ {stats['total_ms']:.3f} мс, результатів: {stats['results']} ({stats['ranking']})")
+    for name, st in stats["stages"].items():
+        print(f"  {name:<9} {st['ms']:>9.3f} мс | кандидатів {st['candidates']:>6} | "
+              f"постингів {st['postings']:>7} | SequenceMatcher {st['seq_calls']:>5}")
+
+def stats_command(args, mm=None) -> bool:
+    """stats [--json] [--reset]: накопичені гістограми стадій пошуку (manager.MEMORY)."""
+    mm = mm if mm is not None else _MM
+    if mm is None:
+        print("⚠️ manager.MEMORY недоступний."); return False
+    data = mm.search_stats(reset=_has(args, "--reset"))
+    if _has(args, "--json"):
+        import json
+        print(json.dumps(data, ensure_ascii=False, indent=2)); return True
+    if not data["searches"]:
+        print("ℹ️ Статистики пошуку ще немає."); return True
+    print(f"📊 Пошуків: {data['searches']}")
+    fmt = lambda v: f"{v:g}" if v is not None else f">{data['buckets_ms'][-1]:g}"
+    for name, row in data["stages"].items():
+        print(f"  {name:<9} runs {row['runs']:>6} | avg {row['ms_avg']:>9.3f} мс | max {row['ms_max']:>9.3f} мс | "
+              f"p50≤{fmt(row['p50_ms'])} p95≤{fmt(row['p95_ms'])} p99≤{fmt(row['p99_ms'])} | "
+              f"кандидатів {row['candidates']} | постингів {row['postings']} | SequenceMatcher {row['seq_calls']}")
+    return True
+
 # ---------------- CLI аргументи ----------------
 def run_cli_args(argv):
     if len(argv) < 2: return False
@@ -204,6 +283,8 @@ def run_cli_args(argv):
     if cmd == "rebuild": rebuild(); return True
     if cmd == "verify": verify(); return True
     if cmd == "compact": compact(); return True
+    if cmd == "snapshot": snapshot_command(argv[2:]); return True
+    if cmd == "stats": stats_command(argv[2:]); return True
 
     if cmd == "list":
         data = list_memories()
@@ -233,6 +314,14 @@ def run_cli_args(argv):
             print(f"  {key} | 🕒 {ts} | 🎭 {tone} | 💬 {text}")
         return True
 
+    if cmd == "import":
+        # import <file.json>
+        try: path = argv[2]
+        except Exception: print("Використання: import <file.json>"); return True
+        try: n = import_memories(path)
+        except Exception as e: print(f"❌ Імпорт не вдався (нічого не збережено): {e}"); return True
+        print(f"✅ Імпортовано записів: {n}"); return True
+
     if cmd == "recall":
         try: key = argv[argv.index("--key")+1]
         except Exception: print("Використання: recall --key <KEY>"); return True
@@ -266,10 +355,11 @@ def run_cli_args(argv):
         print(f"✅ Додано до {key!r}: {text!r}"); return True
 
     if cmd == "search":
-        # search "запит" [--limit N] [--debug] [--best] [--no-fresh] [--fresh-w 15]
+        # search "запит" [--limit N] [--page P] [--debug] [--stats] [--best] [--no-fresh] [--fresh-w 15]
         try: query = argv[2]
-        except Exception: print('Використання: search "запит" [--limit N] [--debug] [--best] [--no-fresh] [--fresh-w 15]'); return True
+        except Exception: print('Використання: search "запит" [--limit N] [--page P] [--debug] [--stats] [--best] [--no-fresh] [--fresh-w 15]'); return True
         limit = _get_after(argv, "--limit", int, 10)
+        page = max(1, _get_after(argv, "--page", int, 1))
         debug = _has(argv, "--debug")
         best_only = _has(argv, "--best")
         fresh_on = not _has(argv, "--no-fresh")
@@ -277,8 +367,14 @@ def run_cli_args(argv):
 
         idx = _ensure_index()
         if not idx: print("⚠️ Індекс недоступний."); return True
-        results = idx.search(query, limit=max(limit, 1), debug=debug) or []
+        if page > 1:
+            # сторінка P: ліниво пропускаємо попередні (P-1)*limit результатів
+            start = (page - 1) * max(limit, 1)
+            results = list(islice(idx.iter_search(query, debug=debug), start, start + max(limit, 1)))
+        else:
+            results = idx.search(query, limit=max(limit, 1), debug=debug) or []
         if fresh_on: results = _rescore_with_freshness(results, fresh_w)
+        if _has(argv, "--stats") and idx.last_stats is not None: _print_stage_stats(idx.last_stats.as_dict())
 
         if not results: print("🙈 Нічого не знайдено."); return True
 
@@ -289,7 +385,7 @@ def run_cli_args(argv):
             print(f"  [{round(score,1):>4}] {key} | 🕒 {ts} | 🎭 {tone} | 💬 {text}")
             return True
 
-        print("🧠 Знайдено:")
+        print("🧠 Знайдено:" if page == 1 else f"🧠 Знайдено (сторінка {page}):")
         for key, rec, score in results[:limit]:
             ts, tone, text = rec.get("timestamp",""), rec.get("tone",""), _val_text(rec)
             print(f"  [{round(score,1):>4}] {key} | 🕒 {ts} | 🎭 {tone} | 💬 {text}")
@@ -357,10 +453,10 @@ def run_cli_args(argv):
             print(f"  {key_show} | 🕒 {ts} | 🎭 {tone} | 💬 {text}")
         return True
 
-    print("Команди: rebuild | verify | compact | list | tags <TAG> [--limit N] | recall --key K | "
+    print("Команди: rebuild | verify | compact | snapshot create|verify [--path P] | stats [--json] [--reset] | list | import <file.json> | tags <TAG> [--limit N] | recall --key K | "
           "remember --key K --value \"TEXT\" [--tone T] [--tags t1,t2] | forget --key K | "
           "insert \"TEXT\" [--key K] [--tone T] [--tags t1,t2] | "
-          "search \"TEXT\" [--limit N] [--debug] [--best] [--no-fresh] [--fresh-w 15] | "
+          "search \"TEXT\" [--limit N] [--page P] [--debug] [--stats] [--best] [--no-fresh] [--fresh-w 15] | "
           "ask \"TEXT\" [--limit N] [--best] [--no-fallback] [--no-fresh] [--fresh-w 15]")
     return True
 
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+near_dup.py — пошук майже-дублікатів записів пам'яті (MinHash + LSH).
+
+Текст запису -> множина шинглів (символьні 3-грами стемів слів, без порядку слів,
+тож "купити молоко і хліб" ~ "хліб і молоко купити") -> MinHash-сигнатура з
+NUM_PERM хешів -> BANDS смуг по ROWS хешів. Записи з однаковою смугою — кандидати;
+кандидат перевіряється точним Jaccard шинглів (текст береться з пам'яті), тож
+хибних спрацювань немає. Порівнюються лише записи того самого ключа: однаковий
+текст під різними ключами (темами) — різні записи, а не дублікати.
+
+Короткі тексти (менше MIN_SHINGLES шинглів: "чорна", "з молоком") не індексуються —
+для них лишається точний дедуп за текстом і тоном.
+Записи адресуються (key, idx), як у TagIndex.
+"""
+from __future__ import annotations
+
+import heapq
+import random
+import zlib
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .normalize import tokenize
+from .stemmer import stem_many
+
+Ref = Tuple[str, int]
+
+NUM_PERM = 32
+ROWS = 4
+BANDS = NUM_PERM // ROWS
+MIN_SHINGLES = 12
+# Скільки кандидатів LSH перевіряти точним Jaccard на один запит
+MAX_CANDIDATES = 32
+
+_M32 = (1 << 32) - 1
+_rnd = random.Random(0x5A7)  # фіксоване зерно: ті самі сигнатури між запусками (і у знімках)
+# h -> (a*h + b) mod 2^32, a непарне: дешева універсальна перестановка 32-бітних хешів
+_PERMS = tuple((_rnd.randrange(1, 1 << 32) | 1, _rnd.randrange(0, 1 << 32)) for _ in range(NUM_PERM))
+
+
+def record_text(rec: Any) -> str:
+    if not isinstance(rec, Mapping):
+        return ""
+    return str(rec.get("text") or rec.get("value") or "")
+
+
+def _tone(tone: Any) -> str:
+    return str(tone or "").strip().lower()
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    out = set()
+    for stem in stem_many(tokenize(text)):
+        w = f"#{stem}#"
+        out.update(w[n:n + 3] for n in range(len(w) - 2))
+    return frozenset(out)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(sh: FrozenSet[str]) -> List[int]:
+    """Хеші смуг MinHash-сигнатури (номер смуги входить у хеш; стабільні між запусками)."""
+    hs = [zlib.crc32(s.encode("utf-8")) for s in sh]
+    sig = [min([(a * h + b) & _M32 for h in hs]) for a, b in _PERMS]
+    return [hash((n,) + tuple(sig[n * ROWS:(n + 1) * ROWS])) for n in range(BANDS)]
+
+
+def band_keys_of(text: str) -> List[int]:
+    """Смуги тексту; [] — закороткий для індексу."""
+    sh = shingles(text)
+    return band_keys(sh) if len(sh) >= MIN_SHINGLES else []
+
+
+def text_crc(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8", "surrogatepass"))
+
+
+class BandCache:
+    """
+    Збережені смуги записів (зі знімка): key -> [(crc32 тексту, смуги або None), ...].
+    Смуги беруться, лише якщо crc збігається з поточним текстом запису (idx міг
+    означати інший запис, якщо ключ видалили й додали знову).
+    """
+
+    def __init__(
+        self,
+        entries: Optional[Dict[str, List[Tuple[Optional[int], Optional[Sequence[int]]]]]] = None,
+        loader: Optional[Callable[[], Dict[str, List[Tuple[Optional[int], Optional[Sequence[int]]]]]]] = None,
+    ) -> None:
+        # loader — розбір відкладається до першого get() (знімок читається на старті, смуги — при add_thought)
+        self._entries = entries
+        self._loader = loader
+
+    def get(self, key: str, i: int, text: str) -> Optional[Tuple[Optional[Sequence[int]]]]:
+        """(смуги,) для запису — (None,) для короткого тексту; None — невідомо."""
+        if self._entries is None:
+            self._entries = self._loader() if self._loader is not None else {}
+        arr = self._entries.get(key)
+        if arr is None or i >= len(arr):
+            return None
+        crc, bands = arr[i]
+        if crc != text_crc(text):
+            return None
+        return (bands,)
+
+    def export(self, memory: Mapping) -> Dict[str, List[Tuple[Optional[int], Optional[Sequence[int]]]]]:
+        """Те саме, що NearDupIndex.export(), для записів, чиї смуги відомі з кешу (решта — (None, None))."""
+        out: Dict[str, List[Tuple[Optional[int], Optional[Sequence[int]]]]] = {}
+        for key, arr in memory.items():
+            if isinstance(arr, list):
+                row = out[key] = []
+                for i, rec in enumerate(arr):
+                    text = record_text(rec)
+                    known = self.get(key, i, text)
+                    row.append((text_crc(text), known[0]) if known is not None else (None, None))
+        return out
+
+
+class NearDupIndex:
+    """
+    Майже-дублікати шукаються лише серед записів того самого ключа. Ключ
+    підписується ліниво — при першому find()/add() для нього (смуги беруться
+    з BandCache, якщо відомі), тож перший add_thought не рахує MinHash усього сховища.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[Mapping] = None,
+        threshold: float = 0.85,
+        cache: Optional[BandCache] = None,
+    ) -> None:
+        self.memory = memory if memory is not None else {}
+        self.threshold = threshold
+        self._cache = cache
+        self.clear()
+
+    def clear(self) -> None:
+        self._buckets: Dict[str, Dict[int, List[int]]] = {}  # key -> хеш смуги -> idx записів
+        self._bands: Dict[str, Dict[int, array]] = {}        # key -> {idx: смуги запису} (підписані ключі)
+        self._last: Tuple[str, FrozenSet[str], List[int]] = ("", frozenset(), [])
+
+    def rebuild(self, cache: Optional[BandCache] = None) -> None:
+        """Забути підписані ключі (підпишуться знову при зверненні); cache — нові смуги зі знімка."""
+        self.clear()
+        if cache is not None:
+            self._cache = cache
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._bands.values())
+
+    def export(self) -> Dict[str, List[Tuple[Optional[int], Optional[Sequence[int]]]]]:
+        """
+        Смуги записів пам'яті для знімка: key -> [(crc32 тексту, смуги або None)].
+        Непідписані ключі — зі збережених смуг ((None, None), якщо невідомо).
+        """
+        out = (self._cache or BandCache({})).export(
+            {k: v for k, v in self.memory.items() if k not in self._bands}
+        )
+        for key, known in self._bands.items():
+            arr = self.memory.get(key)
+            if isinstance(arr, list):
+                out[key] = [(text_crc(record_text(rec)), known.get(i)) for i, rec in enumerate(arr)]
+        return out
+
+    def _sketch(self, text: str) -> Tuple[FrozenSet[str], List[int]]:
+        # find() і add() того самого тексту йдуть поспіль — сигнатура рахується раз
+        if self._last[0] == text and text:
+            return self._last[1], self._last[2]
+        sh = shingles(text)
+        bands = band_keys(sh) if len(sh) >= MIN_SHINGLES else []
+        self._last = (text, sh, bands)
+        return sh, bands
+
+    # --- підтримка ---
+    def _sign(self, key: str) -> Dict[int, List[int]]:
+        buckets = self._buckets.get(key)
+        if buckets is not None:
+            return buckets
+        buckets = self._buckets[key] = {}
+        self._bands[key] = {}
+        arr = self.memory.get(key)
+        if isinstance(arr, list):
+            for i, rec in enumerate(arr):
+                text = record_text(rec)
+                known = self._cache.get(key, i, text) if self._cache is not None else None
+                bands = known[0] if known is not None else band_keys_of(text)
+                if bands:
+                    self._put(key, i, bands)
+        return buckets
+
+    def _put(self, key: str, i: int, bands: Sequence[int]) -> None:
+        buckets = self._buckets[key]
+        for b in bands:
+            buckets.setdefault(b, []).append(i)
+        self._bands[key][i] = array("q", bands)
+
+    def add(self, key: str, i: int, rec: Any) -> None:
+        if key not in self._buckets:
+            self._sign(key)  # запис уже в пам'яті — підпис ключа його охоплює
+            return
+        _, bands = self._sketch(record_text(rec))
+        if bands:
+            self._put(key, i, bands)
+
+    def discard_key(self, key: str) -> None:
+        self._buckets.pop(key, None)
+        self._bands.pop(key, None)
+
+    # --- запити ---
+    def find(self, key: str, text: str, tone: Any = None) -> Optional[Ref]:
+        """
+        (key, idx) запису ключа key з тим самим тоном і Jaccard шинглів >= threshold або None.
+        tone=None — тон не враховується.
+        """
+        buckets = self._sign(key)
+        sh, bands = self._sketch(text)
+        if not bands or not buckets:
+            return None
+        want_tone = None if tone is None else _tone(tone)
+        hits: Dict[int, int] = {}
+        for b in bands:
+            for i in buckets.get(b, ()):
+                hits[i] = hits.get(i, 0) + 1
+        arr = self.memory[key]
+        # більше спільних смуг — вища оцінка Jaccard; точно перевіряємо лише найкращих
+        for i in heapq.nlargest(MAX_CANDIDATES, hits, key=hits.__getitem__):
+            rec = arr[i]
+            if want_tone is not None and _tone(rec.get("tone")) != want_tone:
+                continue
+            if jaccard(sh, shingles(record_text(rec))) >= self.threshold:
+                return key, i
+        return None
@@ -4,20 +4,11 @@ import re
 from difflib import SequenceMatcher
 from typing import List
 
-_UA_ENDINGS = (
-    "ями","ами","ові","еві","ах","ях","ів","їв","ей","ій","ам","ям",
-    "ою","ею","ом","ем","у","ю","і","ї","я","а","о","е"
-)
+from .stemmer import UA_ENDINGS as _UA_ENDINGS, stem_many, ua_stem
+
 _UA_ALNUM = r"a-zA-Zа-щА-ЩЬьЮюЯяІіЇїЄєҐґ0-9"
 _CLEAN_RE = re.compile(fr"[^{_UA_ALNUM}\s']+", re.UNICODE)
 
-def ua_stem(w: str) -> str:
-    w = (w or "").lower().replace("’", "'").strip()
-    for suf in sorted(_UA_ENDINGS, key=len, reverse=True):
-        if w.endswith(suf) and len(w) > len(suf) + 1:
-            return w[:-len(suf)]
-    return w
-
 def normalize_key(s: str) -> str:
     s = (s or "").strip().lower().replace("’", "'")
     s = re.sub(r"\s+", " ", s)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+query_cache.py — LRU-кеш результатів пошуку з інвалідацією за поколінням сховища.
+
+Кожен запис пам'ятає generation, на якому його пораховано. MemoryManager збільшує
+generation при кожній мутації, тож застарілий результат просто не збігається
+і витісняється при наступному зверненні — явне очищення не потрібне.
+generation — будь-яке значення, що порівнюється на рівність (напр. пара
+"власні мутації, PRAGMA data_version" для SQLite, яку змінюють інші процеси).
+"""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+MISS = object()  # маркер промаху (закешований результат може бути None)
+
+
+def weights_key(weights: Optional[dict]) -> Optional[str]:
+    """Стабільне представлення ваг для ключа кешу."""
+    if not weights:
+        return None
+    try:
+        return json.dumps(weights, sort_keys=True, ensure_ascii=False, default=str)
+    except Exception:
+        return repr(sorted(weights.items(), key=lambda kv: str(kv[0])))
+
+
+class QueryCache:
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = max(0, int(maxsize))
+        self._data: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # промахи через зміну generation
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, generation: Hashable, default: Any = MISS) -> Any:
+        item = self._data.get(key)
+        if item is not None:
+            if item[0] == generation:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            del self._data[key]
+            self.stale += 1
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, generation: Hashable, value: Any) -> None:
+        if not self.maxsize:
+            return
+        self._data[key] = (generation, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
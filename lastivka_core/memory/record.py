@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+record.py — компактний запис пам'яті (MemoryRecord).
+
+Замість dict із восьми рядкових ключів на кожен запис — об'єкт зі __slots__:
+    - tone, tags, rel, key_norm інтерновані (однакові значення — один рядок у RAM);
+    - tags і triple — кортежі;
+    - timestamp зберігається числом (epoch, float) і порівнюється як число.
+
+Усередині пакета memory записи читаються як dict (rec["text"], rec.get("tags")),
+тож індекс і сховища працюють без змін. Назовні (API MemoryManager, JSON на диску)
+записи віддаються звичайними dict через to_dict() / json_default.
+"""
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Поля запису у порядку серіалізації (як у add_thought)
+FIELDS = ("key_raw", "key_norm", "text", "tone", "timestamp", "tags", "rel", "triple")
+_BIT = {name: 1 << n for n, name in enumerate(FIELDS)}
+
+
+def _intern(s: Any) -> Any:
+    return sys.intern(s) if type(s) is str else s
+
+
+def iso_to_ts(s: Any) -> Optional[float]:
+    """ISO-рядок -> epoch (float); None, якщо не розбирається."""
+    if isinstance(s, (int, float)) and not isinstance(s, bool):
+        return float(s)
+    if not isinstance(s, str) or not s:
+        return None
+    try:
+        return datetime.fromisoformat(s).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def ts_to_iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+class MemoryRecord(Mapping):
+    """
+    Запис пам'яті. Поля FIELDS — у слотах; відсутні у вихідному dict поля
+    позначаються бітами _absent (щоб to_dict() повертав рівно те, що було).
+    Нестандартні поля — у extra. timestamp, який не відтворюється з числа
+    без втрат (часовий пояс, інший формат), зберігається в extra як є.
+    """
+
+    __slots__ = ("key_raw", "key_norm", "text", "tone", "ts", "tags", "rel", "triple", "extra", "_absent")
+
+    def __init__(
+        self,
+        key_raw: str = "",
+        key_norm: str = "",
+        text: str = "",
+        tone: Optional[str] = None,
+        ts: Optional[float] = None,
+        tags: Tuple[str, ...] = (),
+        rel: Optional[str] = None,
+        triple: Optional[tuple] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        absent: int = 0,
+    ) -> None:
+        self.key_raw = key_raw
+        self.key_norm = _intern(key_norm)
+        self.text = text
+        self.tone = _intern(tone)
+        self.ts = ts
+        self.tags = tuple(_intern(t) for t in tags)
+        self.rel = _intern(rel)
+        self.triple = tuple(triple) if isinstance(triple, (list, tuple)) else triple
+        self.extra = extra or None
+        self._absent = absent
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "MemoryRecord":
+        if isinstance(d, MemoryRecord):
+            return d
+        absent = 0
+        for name in FIELDS:
+            if name not in d:
+                absent |= _BIT[name]
+        extra = {k: v for k, v in d.items() if k not in _BIT}
+        raw_ts = d.get("timestamp")
+        ts = iso_to_ts(raw_ts)
+        if raw_ts is not None and (ts is None or ts_to_iso(ts) != raw_ts):
+            extra["timestamp"] = raw_ts
+        tags = d.get("tags")
+        if isinstance(tags, (list, tuple)):
+            tags = tuple(tags)
+        elif tags is not None:
+            extra["tags"] = tags  # нестандартне значення — як є
+            tags = ()
+        return cls(
+            key_raw=d.get("key_raw", ""),
+            key_norm=d.get("key_norm", ""),
+            text=d.get("text", ""),
+            tone=d.get("tone"),
+            ts=ts,
+            tags=tags or (),
+            rel=d.get("rel"),
+            triple=d.get("triple"),
+            extra=extra,
+            absent=absent,
+        )
+
+    # --- dict-подібне читання ---
+    def _field(self, name: str) -> Any:
+        extra = self.extra
+        if extra is not None and name in extra:
+            return extra[name]
+        if name == "timestamp":
+            return ts_to_iso(self.ts)
+        if name == "tags":
+            return list(self.tags)
+        if name == "triple":
+            tri = self.triple
+            return list(tri) if isinstance(tri, tuple) else tri
+        return getattr(self, name)
+
+    def __getitem__(self, name: str) -> Any:
+        bit = _BIT.get(name)
+        if bit is not None:
+            if self._absent & bit:
+                raise KeyError(name)
+            return self._field(name)
+        if self.extra is not None and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: object) -> bool:
+        bit = _BIT.get(name)  # type: ignore[arg-type]
+        if bit is not None:
+            return not self._absent & bit
+        return self.extra is not None and name in self.extra
+
+    def __iter__(self) -> Iterator[str]:
+        for name in FIELDS:
+            if not self._absent & _BIT[name]:
+                yield name
+        if self.extra:
+            for name in self.extra:
+                if name not in _BIT:
+                    yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self[name] for name in self}
+
+    def __repr__(self) -> str:
+        return f"MemoryRecord({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (MemoryRecord.from_dict, (self.to_dict(),))
+
+
+def as_record(obj: Any) -> Any:
+    """dict -> MemoryRecord; інші значення (сміття в старих файлах) — без змін."""
+    if isinstance(obj, MemoryRecord):
+        return obj
+    if isinstance(obj, dict):
+        return MemoryRecord.from_dict(obj)
+    return obj
+
+
+def as_dict(obj: Any) -> Any:
+    return obj.to_dict() if isinstance(obj, MemoryRecord) else obj
+
+
+def json_default(obj: Any) -> Any:
+    """default= для json.dump: MemoryRecord пишеться як звичайний dict."""
+    if isinstance(obj, MemoryRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+search_stats.py — інструментування стадій MemoryIndex.search.
+
+SearchStats   — один пошук: для кожної стадії час (мс), кандидатів, переглянутих
+                постингів і викликів SequenceMatcher.ratio(); повертається з
+                search(..., with_stats=True) і лишається в MemoryIndex.last_stats.
+SearchProfile — накопичені гістограми часу й суми лічильників по стадіях
+                (manager.search_stats(), memory_cli stats, manager.py --stats);
+                зберігається у JSON поруч зі сховищем і зливається між процесами.
+
+Стадії (у порядку виконання):
+    vector     TF-IDF символьних n-грам (лише з вагою text_vector)
+    key_token  збіг токенів/стемів ключа з токенами запиту
+    key_fuzzy  exact / prefix / fuzzy по ключах
+    lexical    постинги токенів і стемів + скоринг (classic або bm25)
+    fallback   частковий збіг ключів, якщо нічого не знайдено
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STAGES = ("vector", "key_token", "key_fuzzy", "lexical", "fallback")
+
+# Верхні межі кошиків гістограми часу, мс; останній кошик — усе, що довше
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0)
+
+_COUNTERS = ("candidates", "postings", "seq_calls")
+
+
+class StageStats:
+    """Лічильники однієї стадії одного пошуку."""
+
+    __slots__ = ("ms", "candidates", "postings", "seq_calls")
+
+    def __init__(self) -> None:
+        self.ms = 0.0
+        self.candidates = 0   # записів, яким стадія дала оцінку
+        self.postings = 0     # переглянутих record id (постинги токенів / записи ключів)
+        self.seq_calls = 0    # викликів SequenceMatcher.ratio()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ms": round(self.ms, 4),
+            "candidates": self.candidates,
+            "postings": self.postings,
+            "seq_calls": self.seq_calls,
+        }
+
+
+class SearchStats:
+    """Стадії одного виклику search(); стадії, що не виконувались, відсутні."""
+
+    def __init__(self, query: str = "", ranking: str = "classic") -> None:
+        self.query = query
+        self.ranking = ranking
+        self.stages: Dict[str, StageStats] = {}
+        self.total_ms = 0.0
+        self.results = 0
+
+    def stage(self, name: str) -> StageStats:
+        st = self.stages.get(name)
+        if st is None:
+            st = self.stages[name] = StageStats()
+        return st
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "query": self.query,
+            "ranking": self.ranking,
+            "total_ms": round(self.total_ms, 4),
+            "results": self.results,
+            "stages": {name: self.stages[name].as_dict() for name in STAGES if name in self.stages},
+        }
+
+
+def _empty_row() -> Dict[str, Any]:
+    return {"runs": 0, "ms_sum": 0.0, "ms_max": 0.0, "hist": [0] * (len(BUCKETS_MS) + 1),
+            **{c: 0 for c in _COUNTERS}}
+
+
+def _percentile(hist: List[int], runs: int, q: float) -> Optional[float]:
+    """Верхня межа кошика, у який потрапляє q-й перцентиль (None — понад останню межу)."""
+    need = q * runs
+    acc = 0
+    for i, n in enumerate(hist):
+        acc += n
+        if acc >= need and n:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+    return None
+
+
+class SearchProfile:
+    """Накопичені по стадіях гістограми часу й суми лічильників."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.searches = 0
+        self._rows: Dict[str, Dict[str, Any]] = {}
+
+    def __bool__(self) -> bool:
+        return self.searches > 0
+
+    def _row(self, name: str) -> Dict[str, Any]:
+        row = self._rows.get(name)
+        if row is None:
+            row = self._rows[name] = _empty_row()
+        return row
+
+    def _add(self, name: str, ms: float, counts: Optional[StageStats] = None) -> None:
+        row = self._row(name)
+        row["runs"] += 1
+        row["ms_sum"] += ms
+        row["ms_max"] = max(row["ms_max"], ms)
+        row["hist"][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        if counts is not None:
+            for c in _COUNTERS:
+                row[c] += getattr(counts, c)
+
+    def record(self, stats: SearchStats) -> None:
+        self.searches += 1
+        total = StageStats()
+        for name, st in stats.stages.items():
+            self._add(name, st.ms, st)
+            for c in _COUNTERS:
+                setattr(total, c, getattr(total, c) + getattr(st, c))
+        self._add("total", stats.total_ms, total)
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """Додати збережений раніше as_dict() (з іншого процесу чи файлу)."""
+        self.searches += int(other.get("searches", 0))
+        for name, src in (other.get("stages") or {}).items():
+            row = self._row(name)
+            row["runs"] += int(src.get("runs", 0))
+            row["ms_sum"] += float(src.get("ms_sum", 0.0))
+            row["ms_max"] = max(row["ms_max"], float(src.get("ms_max", 0.0)))
+            hist = src.get("hist") or ()
+            if len(hist) == len(row["hist"]):
+                row["hist"] = [a + int(b) for a, b in zip(row["hist"], hist)]
+            for c in _COUNTERS:
+                row[c] += int(src.get(c, 0))
+
+    def as_dict(self) -> Dict[str, Any]:
+        stages: Dict[str, Any] = {}
+        for name in ("total",) + STAGES:
+            row = self._rows.get(name)
+            if row is None:
+                continue
+            runs = row["runs"]
+            stages[name] = {
+                **row,
+                "ms_sum": round(row["ms_sum"], 4),
+                "ms_max": round(row["ms_max"], 4),
+                "ms_avg": round(row["ms_sum"] / runs, 4) if runs else 0.0,
+                "p50_ms": _percentile(row["hist"], runs, 0.50),
+                "p95_ms": _percentile(row["hist"], runs, 0.95),
+                "p99_ms": _percentile(row["hist"], runs, 0.99),
+            }
+        return {"searches": self.searches, "buckets_ms": list(BUCKETS_MS), "stages": stages}
+
+    # --- файл ---
+    @staticmethod
+    def read(path: Path) -> Dict[str, Any]:
+        """Збережений профіль; {} — файлу немає або він пошкоджений."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def flush(self, path: Path) -> None:
+        """Злити накопичене з файлом і скинути лічильники в RAM (атомарний replace)."""
+        if not self:
+            return
+        path = Path(path)
+        merged = SearchProfile()
+        merged.merge(self.read(path))
+        merged.merge(self.as_dict())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged.as_dict(), f, ensure_ascii=False)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.reset()
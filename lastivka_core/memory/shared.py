@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+shared.py — спільне сховище для кількох процесів (демон, memory_cli, manager.py --add ...).
+
+Кожен процес тримає свою копію пам'яті в RAM; синхронізація — через журнал:
+    memory_store.lock  advisory lock (fcntl.flock / msvcrt.locking): під ним пишуть
+                       журнал, checkpoint і stamp; читачі lock не беруть
+    memory_store.gen   stamp (generation, epoch, checkpoint_seq) + crc32:
+                       generation — seq останньої операції журналу (монотонний),
+                       epoch — лічильник checkpoint (журнал щойно обрізано),
+                       checkpoint_seq — seq, до якого включно все вже в JSON
+
+Читач порівнює stamp зі своїм seq: збігся — нічого не робить (одне читання 28 байт);
+той самий epoch — дочитує хвіст журналу від свого зсуву; новий epoch — читає журнал
+з початку, а якщо відстав далі за checkpoint_seq — перечитує сховище повністю.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+_STAMP = struct.Struct("<QQQ")
+_CRC = struct.Struct("<I")
+
+
+class Stamp(NamedTuple):
+    generation: int
+    epoch: int
+    checkpoint_seq: int
+
+
+class SharedStore:
+    """Lock і stamp спільного сховища; шляхи — поруч із файлом сховища."""
+
+    def __init__(self, base: Path) -> None:
+        base = Path(base)
+        self.lock_path = base.with_suffix(".lock")
+        self.stamp_path = base.with_suffix(".gen")
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._owner: Optional[int] = None
+        self._fh = None
+
+    # --- lock ---
+    @property
+    def held(self) -> bool:
+        """Чи тримає lock поточний потік."""
+        return self._depth > 0 and self._owner == threading.get_ident()
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Ексклюзивний lock між процесами (і потоками); повторний вхід у тому самому потоці — без блокування."""
+        with self._mutex:
+            if self._depth == 0:
+                self._acquire()
+                self._owner = threading.get_ident()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    self._release()
+
+    def _acquire(self) -> None:
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.lock_path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            else:  # pragma: no cover - Windows
+                fh.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK здається після ~10 с — чекаємо далі
+        except BaseException:
+            fh.close()
+            raise
+        self._fh = fh
+
+    def _release(self) -> None:
+        fh, self._fh = self._fh, None
+        if fh is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            fh.close()
+
+    # --- stamp ---
+    def read(self) -> Optional[Stamp]:
+        """Поточний stamp; None — файлу ще немає або він пошкоджений."""
+        try:
+            with open(self.stamp_path, "rb") as f:
+                raw = f.read(_STAMP.size + _CRC.size)
+        except OSError:
+            return None
+        if len(raw) != _STAMP.size + _CRC.size:
+            return None
+        body = raw[:_STAMP.size]
+        if _CRC.unpack_from(raw, _STAMP.size)[0] != zlib.crc32(body):
+            return None
+        return Stamp(*_STAMP.unpack(body))
+
+    def write(self, stamp: Stamp) -> None:
+        """Записати stamp (лише під lock): один write фіксованої довжини на місці."""
+        assert self.held, "stamp пишеться лише під lock"
+        body = _STAMP.pack(*stamp)
+        fd = os.open(self.stamp_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, body + _CRC.pack(zlib.crc32(body)))
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        self._release()
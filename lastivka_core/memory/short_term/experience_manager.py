@@ -1,29 +1,49 @@
-import json
-import os
-from datetime import datetime
+"""
+experience_manager — досвід поверх короткочасної пам'яті (short_term).
 
-LOG_FILE = os.path.join(
-    os.path.dirname(__file__), "experience_log.json"
-)
+Відмінності від колишнього experience_log.json:
+- журнал спільний із ShortTermMemory, тож load_experiences/filter_by_type бачать
+  лише останні DEFAULT_LIMIT (50) записів кільцевого буфера, а не всю історію;
+- timestamp — локальний час без зони (як у решті записів short_term), а не UTC.
+"""
+import atexit
+import threading
+
+from .short_term import DEFAULT_STORAGE, ShortTermMemory, _stm_singleton
+
+# Той самий журнал JSONL, що й у short_term: один файл і один записувач у процесі
+# (ShortTermMemory), тож кільцевий буфер і досвід не розходяться.
+LOG_FILE = DEFAULT_STORAGE
+
+_logs: dict[str, ShortTermMemory] = {}
+_logs_lock = threading.Lock()
+
+
+def _log() -> ShortTermMemory:
+    """ShortTermMemory для поточного LOG_FILE (для файлу singleton-а — сам singleton)."""
+    path = str(LOG_FILE)
+    with _logs_lock:
+        # LOG_FILE змінили (тест, конфіг): журнали старих шляхів закриваються й забуваються
+        for old in [p for p in _logs if p != path]:
+            log = _logs.pop(old)
+            log.close()
+            atexit.unregister(log.close)
+    if path == _stm_singleton.storage_path:
+        return _stm_singleton
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = ShortTermMemory(path)
+        return log
 
 def load_experiences() -> list[dict]:
-    """Завантажує всі записи короткочасного досвіду."""
-    if not os.path.exists(LOG_FILE):
-        return []
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Записи короткочасного досвіду — останні limit (кільцевий буфер short_term)."""
+    log = _log()
+    return log.get_entries(log.limit)
 
 def add_experience(last_action: str, thought: str, entry_type: str = "internal") -> None:
-    """Додає новий запис у досвід."""
-    log = load_experiences()
-    log.append({
-        "timestamp": datetime.utcnow().isoformat(),
-        "last_action": last_action,
-        "thought": thought,
-        "entry_type": entry_type
-    })
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(log, f, ensure_ascii=False, indent=2)
+    """Додає новий запис у досвід (один рядок у журнал)."""
+    _log().add_entry(last_action, thought, entry_type)
 
 def filter_by_type(entry_type: str) -> list[dict]:
     """Фільтрує записи за типом (dialogue_based, internal, reflection)."""
@@ -1,23 +1,40 @@
 # C:\Lastivka\lastivka_core\memory\short_term\short_term.py
 """
 short_term – короткочасна пам'ять:
-- зберігає останні дії/думки/події у локальному JSON,
-- безпечне читання/запис (fallback при пошкодженні),
+- останні дії/думки/події у кільцевому буфері (deque з maxlen = limit),
+- журнал JSONL лише дописується (один рядок на запис); коли в ньому стає
+  COMPACT_FACTOR × limit рядків, він переписується до останніх limit записів —
+  add_entry лишається O(1) і за CPU, і за I/O,
+- безпечне читання (обірваний останній рядок після збою пропускається,
+  пошкоджений файл — у бекап); старий experience_log.json підхоплюється один раз,
+- той самий журнал пише experience_manager (через цей клас), тож файл один,
+- дескриптор дописування закривається close() (і при виході процесу),
 - модульні обгортки add_entry/get_entries/clear_entries для тестів.
 """
 
 from __future__ import annotations
 
+import atexit
 import json
 import os
+import tempfile
 import threading
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any
+from itertools import islice
+from typing import Deque, List, Dict, Any, Optional, TextIO
+
+try:
+    from lastivka_core.memory.lazy import LazyProxy
+except ModuleNotFoundError:  # запуск без пакетного префікса
+    from memory.lazy import LazyProxy  # type: ignore
 
 # Файл зберігання поруч із модулем
 MODULE_DIR = os.path.dirname(__file__)
-DEFAULT_STORAGE = os.path.join(MODULE_DIR, "experience_log.json")
+DEFAULT_STORAGE = os.path.join(MODULE_DIR, "experience_log.jsonl")
 DEFAULT_LIMIT = 50
+# журнал стискається, коли рядків стає COMPACT_FACTOR × limit
+COMPACT_FACTOR = 2
 
 _lock = threading.RLock()
 
@@ -25,43 +42,123 @@ _lock = threading.RLock()
 class ShortTermMemory:
     """
     Короткочасна пам'ять для збереження останніх діалогів, думок і дій.
-    Дані зберігаються у файлі JSON для відновлення після перезапуску.
+    Дані дописуються у журнал JSONL для відновлення після перезапуску.
     """
 
     def __init__(self, storage_path: str = DEFAULT_STORAGE, limit: int = DEFAULT_LIMIT):
         self.storage_path = storage_path
         self.limit = max(1, int(limit))
-        self.entries: List[Dict[str, Any]] = self._load()
+        self._fh: Optional[TextIO] = None
+        self._lines = 0  # рядків у журналі (для рішення про стиснення)
+        self.entries: Deque[Dict[str, Any]] = self._load()
+        atexit.register(self.close)
 
     # ---------------- internal I/O ----------------
 
-    def _load(self) -> List[Dict[str, Any]]:
-        """Завантаження попередніх записів із JSON, якщо файл існує."""
+    def _load(self) -> Deque[Dict[str, Any]]:
+        """Завантаження попередніх записів (JSONL або старий JSON-список), якщо файл існує."""
+        entries: Deque[Dict[str, Any]] = deque(maxlen=self.limit)
+        self._lines = 0
         if not self.storage_path:
-            return []
+            return entries
         # гарантуємо існування каталогу
-        os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-
-        if os.path.exists(self.storage_path):
+        os.makedirs(os.path.dirname(self.storage_path) or ".", exist_ok=True)
+
+        path = self.storage_path
+        if not os.path.exists(path):
+            legacy = os.path.splitext(path)[0] + ".json"
+            if path.endswith(".jsonl") and os.path.exists(legacy):
+                # міграція зі старого формату: JSON-файл лишається як є (резервна копія)
+                entries.extend(self._read_legacy(legacy))
+                self._compact(entries)
+            return entries
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return entries
+        if text.lstrip().startswith("["):
+            entries.extend(self._read_legacy(path))
+            self._compact(entries)
+            return entries
+
+        bad = 0
+        for line in text.splitlines():
+            if not line.strip():
+                continue
             try:
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    return data[-self.limit :]
-            except Exception:
-                # якщо файл пошкоджений — робимо бекап і стартуємо з порожнього
-                try:
-                    bad_name = self.storage_path + ".corrupt_" + datetime.now().strftime("%Y%m%d_%H%M%S")
-                    os.replace(self.storage_path, bad_name)
-                except Exception:
-                    pass
+                entry = json.loads(line)
+            except ValueError:
+                bad += 1
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+                self._lines += 1
+        if bad and not entries:
+            # якщо файл пошкоджений — робимо бекап і стартуємо з порожнього
+            self._backup(path)
+            self._lines = 0
+        elif bad or (text and not text.endswith("\n")):
+            # обірваний рядок після збою: переписати, щоб наступний запис не приклеївся до нього
+            self._compact(entries)
+        return entries
+
+    def _read_legacy(self, path: str) -> List[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                return [e for e in data[-self.limit :] if isinstance(e, dict)]
+        except Exception:
+            if path == self.storage_path:
+                self._backup(path)
         return []
 
-    def _save(self) -> None:
-        """Збереження поточного стану пам’яті у JSON."""
-        with _lock:
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(self.entries[-self.limit :], f, ensure_ascii=False, indent=2)
+    @staticmethod
+    def _backup(path: str) -> None:
+        try:
+            bad_name = path + ".corrupt_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+            os.replace(path, bad_name)
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Закрити дескриптор журналу (наступний запис відкриє його знову)."""
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """Дописати один рядок у журнал; зрідка — стиснути до останніх limit записів."""
+        if not self.storage_path:
+            return
+        if self._lines >= COMPACT_FACTOR * self.limit:
+            self._compact(self.entries)
+            return  # запис уже в entries, тож і в стиснутому файлі
+        if self._fh is None:
+            self._fh = open(self.storage_path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self._lines += 1
+
+    def _compact(self, entries) -> None:
+        """Переписати журнал поточними записами (атомарно, через тимчасовий файл)."""
+        if not self.storage_path:
+            return
+        self.close()
+        d = os.path.dirname(self.storage_path) or "."
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.storage_path) + ".", suffix=".tmp", dir=d)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for e in entries:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.storage_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._lines = len(entries)
 
     # ---------------- public API (OO) ----------------
 
@@ -74,44 +171,46 @@ class ShortTermMemory:
             "entry_type": str(entry_type),
         }
         with _lock:
+            # deque(maxlen=limit) сам витісняє найстаріший запис
             self.entries.append(entry)
-            # обмеження довжини пам’яті
-            if len(self.entries) > self.limit:
-                self.entries = self.entries[-self.limit :]
-            self._save()
+            self._append(entry)
 
     def get_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Повертає останні записи (за замовчуванням 10)."""
         k = max(1, int(limit))
         with _lock:
-            return list(self.entries[-k:])
+            last = list(islice(reversed(self.entries), k))
+        last.reverse()
+        return last
 
     def clear(self) -> None:
         """Очищує короткочасну пам’ять."""
         with _lock:
-            self.entries = []
-            self._save()
+            self.entries.clear()
+            self._compact(self.entries)
 
     def set_limit(self, new_limit: int) -> None:
         """Оновити ліміт записів у пам’яті (мінімум 1)."""
         with _lock:
             self.limit = max(1, int(new_limit))
-            # урізаємо список, якщо потрібно
-            if len(self.entries) > self.limit:
-                self.entries = self.entries[-self.limit :]
-            self._save()
+            # урізаємо буфер, якщо потрібно
+            self.entries = deque(self.entries, maxlen=self.limit)
+            self._compact(self.entries)
 
     def set_storage_path(self, new_path: str) -> None:
         """Змінити шлях зберігання (для тестів/конфігів)."""
         with _lock:
+            self.close()
             self.storage_path = new_path
+            # _load сам переписує журнал, якщо треба (міграція, обірваний рядок);
+            # інакше новий файл лише читається
             self.entries = self._load()
-            self._save()
 
 
 # ---------------- module-level convenience wrappers ----------------
 
-_stm_singleton = ShortTermMemory()
+# файл читається при першому виклику обгортки, а не під час імпорту
+_stm_singleton = LazyProxy(ShortTermMemory)
 
 
 def add_entry(last_action: str, thought: str, entry_type: str = "dialogue_based") -> None:
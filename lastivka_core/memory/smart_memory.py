@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import re
 
+from .stemmer import UA_ENDINGS as _UA_ENDINGS, UA_STEMMER
+
 _UA_STOP = {
     "я", "ти", "він", "вона", "воно", "ми", "ви", "вони",
     "про", "і", "й", "та", "але", "або", "чи", "не", "ні", "ж", "же", "то",
@@ -9,22 +11,13 @@ _UA_STOP = {
     "що", "як", "коли", "де", "тут", "там", "тому", "тоді", "бо"
 }
 
-_UA_ENDINGS = (
-    "ями", "ами", "ові", "еві", "ах", "ях", "ів", "їв", "ей", "ій",
-    "ам", "ям", "ою", "ею", "ом", "ем", "у", "ю", "і", "ї", "я", "а", "о", "е"
-)
-
 _token_re = re.compile(r"[A-Za-zА-Яа-яЇїІіЄєҐґ0-9'’]+")
 
 def ua_stem(word: str) -> str:
     """Stem Ukrainian words, preserving proper nouns."""
-    w = word.lower()
     if word and word[0].isupper():
-        return w  # Return unchanged for proper nouns like "Ластівка"
-    for suf in sorted(_UA_ENDINGS, key=len, reverse=True):
-        if w.endswith(suf) and len(w) > len(suf) + 1:
-            return w[:-len(suf)]
-    return w
+        return word.lower()  # Return unchanged for proper nouns like "Ластівка"
+    return UA_STEMMER.stem(word)
 
 def extract_tokens(text: str):
     return [t for t in _token_re.findall((text or "").lower()) if t not in _UA_STOP]
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+snapshot.py — бінарний знімок пам'яті для швидкого старту.
+
+JSON-сховище на старті розбирається і перетворюється на MemoryRecord запис за
+записом; знімок зберігає вже готові колонки записів (marshal), тож старт — це
+читання файлу, перевірка crc і збирання об'єктів зі слотів.
+
+Структура файлу (little-endian):
+    HEADER   magic, version, flags, magic-число Python (формат marshal), n_keys, n_records,
+             розмір, mtime_ns і inode JSON-файлу, з якого зроблено знімок,
+             journal_seq, crc32(тіла), fingerprint пам'яті (як у index_file),
+             зсуви й довжини секцій, розмір файлу
+    RECORDS  marshal: (meta, triggers, ключі, кількість записів ключа,
+             колонки слотів MemoryRecord, {позиція: нестандартний запис})
+    BANDS    смуги MinHash записів (near_dup): u8[n] прапорець
+             (0 — короткий текст, 1 — є смуги, 2 — невідомо), u32[n] crc32 тексту,
+             i64[BANDS × записів із прапорцем 1]
+    INDEX    байти файлу інвертованого індексу (index_file), якщо на момент
+             знімка він відповідав пам'яті; інакше порожньо
+
+Знімок вважається актуальним, лише якщо розмір, mtime і inode JSON-файлу збігаються
+із записаними в заголовку; інакше MemoryManager читає JSON як раніше. Формат marshal
+залежить від версії Python: знімок іншого інтерпретатора відкидається (SnapshotError),
+і джерелом лишається JSON.
+Операції журналу після journal_seq знімка доганяються звичайним replay.
+
+Межа: старт зі знімка лінійний за кількістю записів (збирання MemoryRecord),
+тож ціль <100 мс досяжна лише для невеликих сховищ. Заміри (bench.synthetic_memory,
+MemoryManager() без журналу, JSON -> знімок): 1k записів — 16 -> 3 мс,
+10k — 176 -> 36 мс, 50k (16 МБ) — 1.3 с -> 0.35 с, 100k (32 МБ) — 2.7 с -> 0.46 с.
+"""
+from __future__ import annotations
+
+import importlib.util
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .index_file import _from_le, _le, read_header as read_index_header, IndexFileError
+from .near_dup import BANDS, BandCache
+from .record import MemoryRecord
+from .storage import Stamp, file_stamp
+
+MAGIC = b"LVMSNAP\x00"
+VERSION = 2
+PY_MAGIC = importlib.util.MAGIC_NUMBER  # marshal між версіями Python не сумісний
+
+_HEADER = struct.Struct("<8sHH4sIIQQQQI16sQQQQQQQ")
+_SLOTS = ("key_raw", "key_norm", "text", "tone", "ts", "tags", "rel", "triple", "extra", "_absent")
+_MARSHAL_VERSION = 4
+
+_SHORT, _BANDS, _UNKNOWN = 0, 1, 2
+
+
+class SnapshotError(ValueError):
+    """Знімок відсутній, пошкоджений або іншої версії."""
+
+
+class Snapshot(NamedTuple):
+    memory: Dict[str, List[Any]]
+    triggers: dict
+    meta: dict
+    fingerprint: bytes
+    bands: Optional[BandCache]
+    index_blob: bytes
+
+
+# === Запис ===
+def _columns(memory: Dict[str, List[Any]]) -> Tuple[List[str], array, List[list], Dict[int, Any]]:
+    keys: List[str] = []
+    counts = array("I")
+    cols: List[list] = [[] for _ in _SLOTS]
+    odd: Dict[int, Any] = {}
+    pos = 0
+    for key, arr in memory.items():
+        if not isinstance(arr, list):
+            continue
+        keys.append(key)
+        counts.append(len(arr))
+        for rec in arr:
+            if type(rec) is MemoryRecord:
+                for col, name in zip(cols, _SLOTS):
+                    col.append(getattr(rec, name))
+            else:
+                odd[pos] = rec
+                for col in cols:
+                    col.append(None)
+            pos += 1
+    return keys, counts, cols, odd
+
+
+def _bands_blob(keys: List[str], counts: array, bands: Optional[Dict[str, list]]) -> bytes:
+    flags = array("B")
+    crcs = array("I")
+    flat = array("q")
+    for key, n in zip(keys, counts):
+        known = (bands or {}).get(key) or []
+        for i in range(n):
+            crc, b = known[i] if i < len(known) else (None, None)
+            if crc is None:
+                flags.append(_UNKNOWN)
+                crcs.append(0)
+            elif b:
+                flags.append(_BANDS)
+                crcs.append(crc)
+                flat.extend(b)
+            else:
+                flags.append(_SHORT)
+                crcs.append(crc)
+    return flags.tobytes() + _le(crcs) + _le(flat)
+
+
+def write_snapshot(
+    path: Path,
+    memory: Dict[str, List[Any]],
+    triggers: dict,
+    meta: dict,
+    *,
+    stamp: Stamp,
+    fingerprint: bytes,
+    bands: Optional[Dict[str, list]] = None,
+    index_blob: bytes = b"",
+) -> int:
+    """
+    Атомарно записати знімок; повертає розмір файлу.
+    stamp — file_stamp() JSON-файлу, з якого походить memory (не обов'язково поточний),
+    bands — NearDupIndex.export() (або None).
+    """
+    path = Path(path)
+    keys, counts, cols, odd = _columns(memory)
+    try:
+        records = marshal.dumps((meta, triggers, keys, counts.tolist(), cols, odd), _MARSHAL_VERSION)
+    except ValueError as e:  # значення, яких немає в JSON (набір, об'єкт) — знімок неможливий
+        raise SnapshotError(f"unsupported value in memory: {e}") from e
+    bands_blob = _bands_blob(keys, counts, bands)
+    off_records = _HEADER.size
+    off_bands = off_records + len(records)
+    off_index = off_bands + len(bands_blob)
+    end = off_index + len(index_blob)
+    crc = zlib.crc32(index_blob, zlib.crc32(bands_blob, zlib.crc32(records)))
+    header = _HEADER.pack(
+        MAGIC, VERSION, 0, PY_MAGIC, len(keys), sum(counts), stamp[0], stamp[1], stamp[2],
+        int(meta.get("journal_seq", 0) or 0), crc, fingerprint,
+        off_records, len(records), off_bands, len(bands_blob), off_index, len(index_blob), end,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(records)
+            f.write(bands_blob)
+            f.write(index_blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return end
+
+
+# === Читання ===
+def _parse(raw: bytes) -> dict:
+    if len(raw) < _HEADER.size:
+        raise SnapshotError("truncated header")
+    if raw[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("bad magic")
+    version = struct.unpack_from("<H", raw, len(MAGIC))[0]
+    if version != VERSION:
+        raise SnapshotError(f"unsupported version {version}")
+    (_, _, _flags, py_magic, n_keys, n_records, src_size, src_mtime, src_ino, journal_seq, crc, fingerprint,
+     off_records, len_records, off_bands, len_bands, off_index, len_index, end) = _HEADER.unpack_from(raw, 0)
+    if py_magic != PY_MAGIC:
+        raise SnapshotError("marshal format of another Python version")
+    if end != len(raw) or off_bands != off_records + len_records or off_index != off_bands + len_bands:
+        raise SnapshotError("size mismatch")
+    return {
+        "version": version,
+        "keys": n_keys,
+        "records": n_records,
+        "stamp": (src_size, src_mtime, src_ino),
+        "journal_seq": journal_seq,
+        "crc32": crc,
+        "fingerprint": fingerprint,
+        "records_section": (off_records, len_records),
+        "bands_section": (off_bands, len_bands),
+        "index_section": (off_index, len_index),
+        "bytes": end,
+    }
+
+
+def _check_crc(raw: bytes, head: dict) -> None:
+    if zlib.crc32(memoryview(raw)[_HEADER.size:]) != head["crc32"]:
+        raise SnapshotError("crc mismatch")
+
+
+def _records(raw: bytes, head: dict) -> Tuple[Dict[str, List[Any]], dict, dict, List[str], List[int]]:
+    off, ln = head["records_section"]
+    meta, triggers, keys, counts, cols, odd = marshal.loads(memoryview(raw)[off:off + ln])
+    if len(cols) != len(_SLOTS) or len(keys) != len(counts):
+        raise SnapshotError("corrupt records section")
+    new = object.__new__
+    recs: List[Any] = []
+    append = recs.append
+    for key_raw, key_norm, text, tone, ts, tags, rel, triple, extra, absent in zip(*cols):
+        r = new(MemoryRecord)
+        r.key_raw = key_raw
+        r.key_norm = key_norm
+        r.text = text
+        r.tone = tone
+        r.ts = ts
+        r.tags = tags
+        r.rel = rel
+        r.triple = triple
+        r.extra = extra
+        r._absent = absent
+        append(r)
+    for pos, rec in odd.items():
+        recs[pos] = rec
+    memory: Dict[str, List[Any]] = {}
+    pos = 0
+    for key, n in zip(keys, counts):
+        memory[key] = recs[pos:pos + n]
+        pos += n
+    if pos != len(recs):
+        raise SnapshotError("corrupt records section")
+    return memory, triggers, meta, keys, counts
+
+
+def _band_entries(raw: bytes, off: int, ln: int, keys: List[str], counts: List[int]) -> Dict[str, list]:
+    n = sum(counts)
+    flags = raw[off:off + n]
+    crcs = _from_le(raw[off + n:off + 5 * n], "I")
+    flat = _from_le(raw[off + 5 * n:off + ln], "q")
+    entries: Dict[str, List[Tuple[Optional[int], Optional[array]]]] = {}
+    pos = fpos = 0
+    for key, cnt in zip(keys, counts):
+        row = entries[key] = []
+        for p in range(pos, pos + cnt):
+            flag = flags[p]
+            if flag == _BANDS:
+                row.append((crcs[p], flat[fpos:fpos + BANDS]))
+                fpos += BANDS
+            elif flag == _SHORT:
+                row.append((crcs[p], None))
+            else:
+                row.append((None, None))
+        pos += cnt
+    return entries
+
+
+def _band_cache(raw: bytes, head: dict, keys: List[str], counts: List[int]) -> Optional[BandCache]:
+    """Перевірка розмірів секції BANDS; самі смуги розбираються ліниво (при першому add_thought)."""
+    off, ln = head["bands_section"]
+    n = sum(counts)
+    if ln < 5 * n:
+        raise SnapshotError("corrupt bands section")
+    flags = raw[off:off + n]
+    if (ln - 5 * n) != 8 * BANDS * flags.count(_BANDS):
+        raise SnapshotError("corrupt bands section")
+    if flags.count(_UNKNOWN) == n:
+        return None
+    return BandCache(loader=lambda: _band_entries(raw, off, ln, keys, counts))
+
+
+def read_snapshot(path: Path, stamp: Optional[Stamp] = None) -> Optional[Snapshot]:
+    """
+    Прочитати знімок. None — файлу немає або stamp (file_stamp JSON-файлу) не збігається:
+    знімок застарів. Пошкоджений файл — SnapshotError.
+    """
+    try:
+        raw = Path(path).read_bytes()
+    except OSError:
+        return None
+    head = _parse(raw)
+    if stamp is not None and head["stamp"] != tuple(stamp):
+        return None
+    _check_crc(raw, head)
+    try:
+        memory, triggers, meta, keys, counts = _records(raw, head)
+    except (EOFError, TypeError, ValueError) as e:
+        raise SnapshotError(f"corrupt records section: {e}") from e
+    off, ln = head["index_section"]
+    return Snapshot(
+        memory, triggers, meta, head["fingerprint"],
+        _band_cache(raw, head, keys, counts), raw[off:off + ln],
+    )
+
+
+def read_header(path: Path) -> dict:
+    """Заголовок знімка (без перевірки crc і розбору записів)."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return _parse(raw)
+
+
+def index_blob(path: Path, fingerprint: bytes) -> bytes:
+    """Байти файлу індексу, якщо він побудований саме для цієї пам'яті; інакше b""."""
+    try:
+        if bytes.fromhex(read_index_header(path)["fingerprint"]) != fingerprint:
+            return b""
+        return Path(path).read_bytes()
+    except (OSError, IndexFileError):
+        return b""
+
+
+def restore_index(snap: Snapshot, path: Path) -> bool:
+    """Відновити файл індексу зі знімка, якщо його немає або він від іншої пам'яті."""
+    if not snap.index_blob:
+        return False
+    try:
+        if bytes.fromhex(read_index_header(path)["fingerprint"]) == snap.fingerprint:
+            return False
+    except (OSError, IndexFileError):
+        pass
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(snap.index_blob)
+        os.replace(tmp, path)
+    except OSError:
+        return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True
+
+
+def verify_snapshot(path: Path, source: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Перевірка знімка: заголовок, версія, crc, розбір записів; source — JSON-файл,
+    відносно якого перевіряється актуальність. {"ok": bool, "error"/"fresh"/...}.
+    """
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+    except OSError as e:
+        return {"ok": False, "path": str(path), "error": str(e)}
+    try:
+        head = _parse(raw)
+        _check_crc(raw, head)
+        memory, _, _, keys, counts = _records(raw, head)
+        _band_cache(raw, head, keys, counts)
+        if sum(len(v) for v in memory.values()) != head["records"] or len(keys) != head["keys"]:
+            raise SnapshotError("header counts mismatch")
+    except (SnapshotError, EOFError, TypeError, ValueError) as e:
+        return {"ok": False, "path": str(path), "error": str(e)}
+    out: Dict[str, Any] = {
+        "ok": True,
+        "path": str(path),
+        "version": head["version"],
+        "keys": head["keys"],
+        "records": head["records"],
+        "journal_seq": head["journal_seq"],
+        "index_bytes": head["index_section"][1],
+        "bytes": head["bytes"],
+        "fingerprint": head["fingerprint"].hex(),
+    }
+    if source is not None:
+        out["fresh"] = file_stamp(source) == head["stamp"]
+    return out
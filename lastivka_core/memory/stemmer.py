@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+stemmer.py — спільний стемер української мови (відсікання закінчень).
+
+Закінчення компілюються один раз у trie обернених суфіксів: стем — це один
+прохід від кінця слова (не більше довжини найдовшого закінчення) замість
+перебору всіх суфіксів. Результати кешуються (LRU) та інтернуються, тож
+гарячі токени коштують один dict-lookup, а однакові стеми — один рядок у пам'яті.
+
+Бенчмарк:  python -m lastivka_core.memory.stemmer [--corpus FILE] [--tokens N]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence
+
+UA_ENDINGS = (
+    "ями", "ами", "ові", "еві", "ах", "ях", "ів", "їв", "ей", "ій", "ам", "ям",
+    "ою", "ею", "ом", "ем", "у", "ю", "і", "ї", "я", "а", "о", "е"
+)
+
+_END = ""  # ключ термінального вузла (символи trie — непорожні)
+
+
+def _compile(endings: Iterable[str]) -> Dict[str, dict]:
+    root: Dict[str, dict] = {}
+    for suf in endings:
+        if not suf:
+            continue
+        node = root
+        for ch in reversed(suf):
+            node = node.setdefault(ch, {})
+        node[_END] = len(suf)
+    return root
+
+
+class SuffixStemmer:
+    """
+    Стемер за списком закінчень: знімає найдовше закінчення, після якого
+    лишається щонайменше min_stem символів. Вхід нормалізується
+    (lower, ’ -> ', strip), як у normalize_key.
+    """
+
+    def __init__(self, endings: Sequence[str] = UA_ENDINGS, min_stem: int = 2, cache_size: int = 1 << 16) -> None:
+        self.endings = tuple(endings)
+        self.min_stem = min_stem
+        self._trie = _compile(self.endings)
+        self.stem = lru_cache(maxsize=cache_size)(self._stem)
+
+    def _stem(self, w: str) -> str:
+        w = (w or "").lower().replace("’", "'").strip()
+        node = self._trie
+        n = len(w)
+        cut = 0
+        i = n - 1
+        while i >= 0:
+            node = node.get(w[i])
+            if node is None:
+                break
+            d = n - i
+            if _END in node and n - d >= self.min_stem:
+                cut = d
+            i -= 1
+        return sys.intern(w[:-cut] if cut else w)
+
+    def __call__(self, w: str) -> str:
+        return self.stem(w)
+
+    def stem_many(self, words: Iterable[str]) -> List[str]:
+        stem = self.stem
+        return [stem(w) for w in words]
+
+    def cache_info(self):
+        return self.stem.cache_info()
+
+    def cache_clear(self) -> None:
+        self.stem.cache_clear()
+
+
+UA_STEMMER = SuffixStemmer(UA_ENDINGS)
+
+
+def ua_stem(w: str) -> str:
+    return UA_STEMMER.stem(w or "")
+
+
+def stem_many(words: Iterable[str]) -> List[str]:
+    return UA_STEMMER.stem_many(words)
+
+
+# ===== Бенчмарк =====
+def _legacy_stem(w: str, endings: Sequence[str] = UA_ENDINGS) -> str:
+    """Попередня реалізація (сортування закінчень на кожен виклик) — для порівняння."""
+    w = (w or "").lower().replace("’", "'").strip()
+    for suf in sorted(endings, key=len, reverse=True):
+        if w.endswith(suf) and len(w) > len(suf) + 1:
+            return w[:-len(suf)]
+    return w
+
+
+def _synthetic_corpus(n: int, seed: int = 13) -> List[str]:
+    """Псевдоукраїнські словоформи: основа + закінчення, із частотами за Ципфом."""
+    rnd = random.Random(seed)
+    cons, vows = "бвгджзклмнпрстфхцчшщ", "аеиіоуяюєї"
+    stems = [
+        "".join(rnd.choice(cons) + rnd.choice(vows) for _ in range(rnd.randint(1, 4)))
+        for _ in range(5000)
+    ]
+    weights = [1.0 / (r + 1) for r in range(len(stems))]
+    endings = list(UA_ENDINGS) + ["", "ий", "ого", "ому", "ими"]
+    picks = rnd.choices(stems, weights=weights, k=n)
+    return [s + rnd.choice(endings) for s in picks]
+
+
+def _rate(fn, tokens: Sequence[str]) -> float:
+    t0 = time.perf_counter()
+    fn(tokens)
+    return len(tokens) / max(time.perf_counter() - t0, 1e-9)
+
+
+def benchmark(tokens: Sequence[str]) -> Dict[str, float]:
+    """Токенів/с: стара реалізація, trie без кешу, trie з теплим кешем (stem_many)."""
+    cold = SuffixStemmer(UA_ENDINGS, cache_size=0)
+    warm = SuffixStemmer(UA_ENDINGS)
+    warm.stem_many(tokens)
+    return {
+        "tokens": len(tokens),
+        "legacy": _rate(lambda ts: [_legacy_stem(t) for t in ts], tokens),
+        "trie": _rate(cold.stem_many, tokens),
+        "trie_cached": _rate(warm.stem_many, tokens),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Бенчмарк українського стемера")
+    p.add_argument("--corpus", type=str, help="UTF-8 текст; за замовчуванням — синтетичний корпус")
+    p.add_argument("--tokens", type=int, default=500_000)
+    args = p.parse_args()
+    if args.corpus:
+        from .index import tokenize
+        with open(args.corpus, encoding="utf-8") as f:
+            toks = tokenize(f.read())[: args.tokens]
+    else:
+        toks = _synthetic_corpus(args.tokens)
+    res = benchmark(toks)
+    print(f"tokens: {res['tokens']}")
+    for name in ("legacy", "trie", "trie_cached"):
+        print(f"{name:>12}: {res[name]:>12,.0f} tok/s  (x{res[name] / res['legacy']:.1f})")
@@ -0,0 +1,546 @@
+# -*- coding: utf-8 -*-
+"""
+storage.py — сховища записів для MemoryManager.
+
+Спільний інтерфейс (MemoryStorage):
+    load()  -> (memory, triggers, meta); memory — dict-подібне key -> [записи]
+    save(memory, triggers, meta)        — зафіксувати повний стан
+    begin() / commit() / rollback()     — межі пакета (лише для transactional)
+    search(query, limit, weights)       — власний пошук (лише для native_search)
+    iter_search(query, weights)         — те саме, ліниво і без limit
+    by_tag(tag)                         — записи з тегом (лише для native_search)
+    close()
+
+JsonStorage   — уся пам'ять у RAM, знімок у JSON (журнал веде MemoryManager).
+SqliteStorage — записи в SQLite (WAL) + FTS5 по key/text/об'єкту triple/tags;
+                у RAM лише те, що запитали: записи читаються на вимогу.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .index import (
+    _key_match_terms, normalize, normalize_key, stem_token, tokenize,
+)
+from .record import MemoryRecord, as_record, json_default
+
+DEFAULT_STORE_SKELETON: Dict[str, Any] = {"triggers": {}}
+
+# Файли з такими розширеннями відкриваються як SQLite
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+class StorageError(RuntimeError):
+    """Сховище неможливо відкрити (напр. SQLite зібрано без FTS5)."""
+
+
+# === Допоміжні IO-функції (JSON) ===
+Stamp = Tuple[int, int, int]
+
+
+def _stamp_of(st: os.stat_result) -> Stamp:
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def file_stamp(path: Path) -> Stamp:
+    """(розмір, mtime_ns, inode) файлу; (0, 0, 0), якщо файлу немає."""
+    try:
+        return _stamp_of(os.stat(path))
+    except OSError:
+        return 0, 0, 0
+
+
+def _safe_write(path: Path, data: dict) -> Stamp:
+    """Атомарний запис JSON; повертає stamp нового файлу (os.replace зберігає inode і mtime)."""
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
+            f.flush()
+            os.fsync(f.fileno())
+            stamp = _stamp_of(os.fstat(f.fileno()))
+        os.replace(tmp_path, path)
+        return stamp
+    finally:
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        if not path.exists():
+            return {}
+        txt = path.read_text(encoding="utf-8-sig")
+        if not txt.strip():
+            return {}
+        data = json.loads(txt)
+        if isinstance(data, dict):
+            return data
+    except Exception:
+        pass
+    return {}
+
+def _ensure_json(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        path.write_text(
+            json.dumps(DEFAULT_STORE_SKELETON, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+
+def _split_raw(raw: Dict[str, Any]) -> Tuple[Dict[str, List[MemoryRecord]], dict, dict]:
+    meta = raw.get("_meta") if isinstance(raw.get("_meta"), dict) else {}
+    triggers = raw.get("triggers", {}) or {}
+    memory = {
+        k: [as_record(r) for r in v]
+        for k, v in raw.items() if k != "triggers" and isinstance(v, list)
+    }
+    return memory, triggers, meta
+
+
+def _loads_record(raw: str) -> MemoryRecord:
+    return MemoryRecord.from_dict(json.loads(raw))
+
+
+# === Інтерфейс ===
+class MemoryStorage:
+    name = "base"
+    transactional = False  # мутації пишуться одразу; пакет = транзакція сховища
+    native_search = False  # search()/by_tag() замість MemoryIndex і сканування
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        # stamp файлу сховища після останнього save() цього процесу (None — не знаємо)
+        self.stamp: Optional[Stamp] = None
+
+    def load(self) -> Tuple[MutableMapping, dict, dict]:
+        raise NotImplementedError
+
+    def save(self, memory, triggers: dict, meta: dict) -> None:
+        raise NotImplementedError
+
+    def begin(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def search(self, query: str, limit: int = 10, weights: Optional[dict] = None) -> List[Tuple[str, dict, float]]:
+        raise NotImplementedError
+
+    def iter_search(self, query: str, weights: Optional[dict] = None) -> Iterator[Tuple[str, dict, float]]:
+        raise NotImplementedError
+
+    def by_tag(self, tag: str) -> List[dict]:
+        raise NotImplementedError
+
+    def data_version(self) -> int:
+        """Лічильник змін, закомічених іншими з'єднаннями (процесами); 0 — не відстежується."""
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStorage(MemoryStorage):
+    """Класичне сховище: один JSON-файл, повний перезапис на save()."""
+    name = "json"
+
+    def load(self) -> Tuple[Dict[str, List[MemoryRecord]], dict, dict]:
+        _ensure_json(self.path)
+        return _split_raw(_read_json(self.path) or {})
+
+    def save(self, memory, triggers: dict, meta: dict) -> None:
+        data = dict(memory)
+        if triggers:
+            data["triggers"] = triggers
+        if meta:
+            data["_meta"] = meta
+        self.stamp = _safe_write(self.path, data)
+
+
+# === SQLite ===
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records(
+    id  INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    rec TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS records_key_pos ON records(key, pos);
+CREATE TABLE IF NOT EXISTS meta(
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+# rowid у records_fts = records.id; діакритику не знімаємо (й ≠ и, ї ≠ і)
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+    "key, text, obj, tags, tokenize='unicode61 remove_diacritics 0')"
+)
+
+# Ваги FTS-ранжування: bm25 по колонках × масштаб + бонус за точний ключ
+_FTS_WEIGHTS = {
+    "exact": 100.0,
+    "bm25_key": 2.0,
+    "bm25_text": 1.0,
+    "bm25_obj": 0.5,
+    "bm25_tags": 0.5,
+    "bm25_scale": 20.0,
+}
+
+
+def _terms_doc(tokens: List[str]) -> str:
+    """Токени + їхні стеми (відмінні від токена) одним рядком для FTS."""
+    stems = [stem_token(t) for t in tokens]
+    return " ".join(tokens + [s for s, t in zip(stems, tokens) if s and s != t])
+
+
+def _fts_row(key: str, rec: dict) -> Tuple[str, str, str, str]:
+    k_tokens, k_stems = _key_match_terms(key)
+    key_doc = " ".join(sorted(k_tokens | k_stems))
+    text_doc = _terms_doc(tokenize(rec.get("text", "") or rec.get("value", "") or ""))
+    tri = rec.get("triple")
+    obj = tri[2] if tri and isinstance(tri, (list, tuple)) and len(tri) == 3 else ""
+    obj_doc = _terms_doc(tokenize(obj or ""))
+    tags_doc = " ".join(str(t).strip().lower() for t in (rec.get("tags") or []) if str(t).strip())
+    return key_doc, text_doc, obj_doc, tags_doc
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+class _Bucket(list):
+    """Записи одного ключа; append() одразу пише в SQLite."""
+
+    def __init__(self, store: "SqliteStorage", key: str, items=()) -> None:
+        super().__init__(items)
+        self._store = store
+        self._key = key
+
+    def append(self, rec: dict) -> None:
+        rec = as_record(rec)
+        self._store._insert(self._key, rec)
+        super().append(rec)
+
+
+class SqliteMemory(MutableMapping):
+    """
+    dict-подібне відображення key -> [записи] поверх таблиці records.
+    Кожне звернення — запит до БД; нічого не кешується.
+    """
+
+    def __init__(self, store: "SqliteStorage") -> None:
+        self._store = store
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        return self._store._open()
+
+    def __getitem__(self, key: str) -> _Bucket:
+        rows = self._db.execute(
+            "SELECT rec FROM records WHERE key = ? ORDER BY pos", (key,)
+        ).fetchall()
+        if not rows:
+            raise KeyError(key)
+        return _Bucket(self._store, key, (_loads_record(r[0]) for r in rows))
+
+    def __contains__(self, key: object) -> bool:
+        return self._db.execute(
+            "SELECT 1 FROM records WHERE key = ? LIMIT 1", (key,)
+        ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        keys = self._db.execute("SELECT DISTINCT key FROM records ORDER BY key").fetchall()
+        return iter([k for (k,) in keys])
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(DISTINCT key) FROM records").fetchone()[0]
+
+    def __setitem__(self, key: str, bucket: List[dict]) -> None:
+        with self._store._tx():
+            self._store._delete(key)
+            for rec in bucket:
+                self._store._insert(key, rec)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        with self._store._tx():
+            self._store._delete(key)
+
+    def setdefault(self, key: str, default=None) -> _Bucket:
+        # порожніх ключів у БД не буває: ключ з'являється з першим записом
+        try:
+            return self[key]
+        except KeyError:
+            return _Bucket(self._store, key)
+
+    def clear(self) -> None:
+        with self._store._tx():
+            self._db.execute("DELETE FROM records")
+            self._db.execute("DELETE FROM records_fts")
+
+    def items(self) -> Iterator[Tuple[str, _Bucket]]:  # type: ignore[override]
+        """Один прохід по таблиці замість запиту на кожен ключ."""
+        rows = self._db.execute("SELECT key, rec FROM records ORDER BY key, pos")
+        for key, grp in itertools.groupby(rows, key=lambda r: r[0]):
+            yield key, _Bucket(self._store, key, (_loads_record(r[1]) for r in grp))
+
+    def values(self) -> Iterator[_Bucket]:  # type: ignore[override]
+        for _, bucket in self.items():
+            yield bucket
+
+
+class SqliteStorage(MemoryStorage):
+    """
+    SQLite у режимі WAL. Кожна мутація — окрема транзакція (або частина
+    пакета між begin/commit), тож вартість запису O(зміни), а не O(пам'яті).
+    legacy_json — JSON-сховище, яке одноразово імпортується в порожню БД.
+
+    Пошук — FTS5 (bm25), а не MemoryIndex: набір збігів за токенами/стемами той самий,
+    але без нечітких стадій (описки в тексті не знаходяться), а оцінки й порядок
+    рівних за змістом записів можуть відрізнятися від JSON-сховища.
+    """
+    name = "sqlite"
+    transactional = True
+    native_search = True
+
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None) -> None:
+        super().__init__(path)
+        self.legacy_json = Path(legacy_json) if legacy_json else None
+        self.db: Optional[sqlite3.Connection] = None
+
+    # --- з'єднання / схема ---
+    def _open(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.executescript(_SCHEMA)
+                try:
+                    db.execute(_FTS_SCHEMA)
+                except sqlite3.OperationalError as e:
+                    raise StorageError(f"SQLite without FTS5: {e}") from e
+            except Exception:
+                db.close()
+                raise
+            self.db = db
+        return self.db
+
+    class _TxGuard:
+        def __init__(self, db: sqlite3.Connection) -> None:
+            self.db = db
+            self.own = not db.in_transaction
+
+        def __enter__(self):
+            if self.own:
+                self.db.execute("BEGIN")
+            return self.db
+
+        def __exit__(self, exc_type, exc, tb):
+            if self.own:
+                self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+    def _tx(self) -> "SqliteStorage._TxGuard":
+        """Атомарність складених операцій; всередині пакета — без власної транзакції."""
+        return self._TxGuard(self._open())
+
+    def _insert(self, key: str, rec: dict) -> None:
+        with self._tx() as db:
+            cur = db.execute(
+                "INSERT INTO records(key, pos, rec) VALUES "
+                "(?, (SELECT COALESCE(MAX(pos) + 1, 0) FROM records WHERE key = ?), ?)",
+                (key, key, json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=json_default)),
+            )
+            db.execute(
+                "INSERT INTO records_fts(rowid, key, text, obj, tags) VALUES (?, ?, ?, ?, ?)",
+                (cur.lastrowid, *_fts_row(key, rec)),
+            )
+
+    def _delete(self, key: str) -> None:
+        db = self._open()
+        db.execute(
+            "DELETE FROM records_fts WHERE rowid IN (SELECT id FROM records WHERE key = ?)", (key,)
+        )
+        db.execute("DELETE FROM records WHERE key = ?", (key,))
+
+    def _meta_get(self, name: str) -> Any:
+        row = self._open().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _meta_set(self, name: str, value: Any) -> None:
+        self._open().execute(
+            "INSERT OR REPLACE INTO meta(name, value) VALUES (?, ?)",
+            (name, json.dumps(value, ensure_ascii=False)),
+        )
+
+    # --- MemoryStorage ---
+    def load(self) -> Tuple[SqliteMemory, dict, dict]:
+        self._open()
+        memory = SqliteMemory(self)
+        if (
+            self.legacy_json is not None
+            and self._meta_get("imported_json") is None
+            and self.legacy_json.exists()
+        ):
+            legacy, triggers, _ = _split_raw(_read_json(self.legacy_json) or {})
+            with self._tx():
+                if not len(memory):
+                    for key, bucket in legacy.items():
+                        for rec in bucket:
+                            if isinstance(rec, MemoryRecord):
+                                self._insert(key, rec)
+                    if triggers and self._meta_get("triggers") is None:
+                        self._meta_set("triggers", triggers)
+                self._meta_set("imported_json", str(self.legacy_json))
+        return memory, self._meta_get("triggers") or {}, self._meta_get("meta") or {}
+
+    def save(self, memory, triggers: dict, meta: dict) -> None:
+        with self._tx():
+            if not isinstance(memory, SqliteMemory):
+                # повна заміна вмісту (напр. відновлення з експорту)
+                SqliteMemory(self).clear()
+                for key, bucket in memory.items():
+                    for rec in bucket:
+                        self._insert(key, rec)
+            self._meta_set("triggers", triggers or {})
+            self._meta_set("meta", meta or {})
+
+    def begin(self) -> None:
+        self._open().execute("BEGIN")
+
+    def commit(self) -> None:
+        if self.db is not None and self.db.in_transaction:
+            self.db.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.db is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+
+    def search(self, query: str, limit: int = 10, weights: Optional[dict] = None) -> List[Tuple[str, dict, float]]:
+        return list(self._search_rows(query, int(limit), weights))
+
+    def iter_search(self, query: str, weights: Optional[dict] = None) -> Iterator[Tuple[str, dict, float]]:
+        return self._search_rows(query, -1, weights)  # LIMIT -1 у SQLite — без обмеження
+
+    def _search_rows(self, query: str, limit: int, weights: Optional[dict]) -> Iterator[Tuple[str, dict, float]]:
+        """
+        FTS5: збіг будь-якого токена/стема запиту, ранжування bm25 по колонках
+        key/text/obj/tags (+ бонус за точний ключ). Без збігів — частковий
+        збіг ключів (як стадія 3 MemoryIndex.search).
+        """
+        q_text = normalize(query)
+        q_key = normalize_key(q_text)
+        q_tokens = set(tokenize(q_text)) | set(tokenize(q_key))
+        if not q_tokens:
+            return
+        terms = q_tokens | {stem_token(t) for t in q_tokens}
+        W = dict(_FTS_WEIGHTS)
+        if isinstance(weights, dict):
+            W.update({k: v for k, v in weights.items() if k in W})
+        db = self._open()
+        found = False
+        for key, rec, score in db.execute(
+            "SELECT r.key, r.rec, "
+            "(CASE WHEN r.key = ? THEN ? ELSE 0 END) - ? * bm25(records_fts, ?, ?, ?, ?) AS score "
+            "FROM records_fts JOIN records AS r ON r.id = records_fts.rowid "
+            "WHERE records_fts MATCH ? ORDER BY score DESC LIMIT ?",
+            (
+                q_key, float(W["exact"]), float(W["bm25_scale"]),
+                float(W["bm25_key"]), float(W["bm25_text"]), float(W["bm25_obj"]), float(W["bm25_tags"]),
+                " OR ".join(_quote(t) for t in sorted(terms)), limit,
+            ),
+        ):
+            found = True
+            yield key, _loads_record(rec), float(score)
+        if not found:
+            # ключі, що починаються з терміна, або є його префіксом
+            keys: set[str] = set()
+            for t in terms:
+                keys.update(k for (k,) in db.execute(
+                    "SELECT DISTINCT key FROM records WHERE key >= ? AND key < ?", (t, t + "\U0010ffff")
+                ))
+                prefixes = [t[:n] for n in range(1, len(t) + 1)]
+                keys.update(k for (k,) in db.execute(
+                    f"SELECT DISTINCT key FROM records WHERE key IN ({','.join('?' * len(prefixes))})",
+                    prefixes,
+                ))
+            if keys:
+                for key, rec in db.execute(
+                    f"SELECT key, rec FROM records WHERE key IN ({','.join('?' * len(keys))}) "
+                    "ORDER BY key, pos LIMIT ?",
+                    (*sorted(keys), limit),
+                ):
+                    yield key, _loads_record(rec), 35.0
+
+    def data_version(self) -> int:
+        # PRAGMA data_version змінюється після комітів інших з'єднань; власні коміти — ні
+        return self._open().execute("PRAGMA data_version").fetchone()[0]
+
+    def by_tag(self, tag: str) -> List[MemoryRecord]:
+        t = (tag or "").strip().lower()
+        if not t:
+            return []
+        tokens = tokenize(t)
+        if tokens:
+            where, arg = "records_fts MATCH ?", "tags : " + _quote(" ".join(tokens))
+        else:
+            # тег без токенів (1 символ, пунктуація) — FTS його не знайде: підрядок у колонці tags
+            where = "records_fts.tags LIKE ? ESCAPE '\\'"
+            arg = "%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self._open().execute(
+            "SELECT r.rec FROM records_fts JOIN records AS r ON r.id = records_fts.rowid "
+            f"WHERE {where} ORDER BY r.key, r.pos",
+            (arg,),
+        )
+        out: List[MemoryRecord] = []
+        for (raw,) in rows:
+            rec = _loads_record(raw)
+            if t in [str(x).lower() for x in (rec.get("tags") or [])]:
+                out.append(rec)
+        return out
+
+    def close(self) -> None:
+        if self.db is not None:
+            try:
+                self.rollback()
+                self.db.close()
+            finally:
+                self.db = None
+
+
+def open_storage(name: str, config_file: Path) -> MemoryStorage:
+    """
+    Сховище за назвою ("json" | "sqlite"). Для sqlite зі звичайним JSON-конфігом
+    БД лежить поруч (memory_store.db), а наявний JSON імпортується при першому запуску.
+    """
+    config_file = Path(config_file)
+    if name == "sqlite":
+        if config_file.suffix.lower() in SQLITE_SUFFIXES:
+            return SqliteStorage(config_file)
+        return SqliteStorage(config_file.with_suffix(".db"), legacy_json=config_file)
+    if name in ("", "json"):
+        return JsonStorage(config_file)
+    raise StorageError(f"unknown memory backend: {name!r}")
+
+
+def backend_for(config_file: Path) -> str:
+    """Назва сховища за розширенням файлу конфігурації."""
+    return "sqlite" if Path(config_file).suffix.lower() in SQLITE_SUFFIXES else "json"
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+tag_index.py — інвертований індекс тегів пам'яті.
+
+- tag -> {key: [idx записів]}: search_by_tag за O(записів із тегом);
+- для кожного тегу (і для всієї пам'яті) — вказівник на найсвіжіший запис,
+  тож "що я казав купити?" не сканує сховище.
+
+Записи адресуються парою (key, idx): у MemoryManager записи лише дописуються
+в кінець списку ключа або видаляються разом із ключем, тож idx стабільні.
+Порядок результатів — як при повному обході пам'яті (ключі у порядку появи,
+записи за idx); серед записів з однаковим часом "найсвіжіший" — перший у цьому порядку.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ALL = ""  # вказівник latest для всіх записів, незалежно від тегів
+
+# (ts, -seq ключа, -idx): більше — свіжіше, а при рівному ts — раніше у пам'яті
+_Rank = Tuple[float, int, int]
+
+
+def record_tags(rec: Any) -> List[str]:
+    """Унікальні теги запису в нижньому регістрі (порядок збережено)."""
+    tags = rec.get("tags") if isinstance(rec, Mapping) else None
+    out: List[str] = []
+    for t in tags or ():
+        t = str(t).lower()
+        if t not in out:
+            out.append(t)
+    return out
+
+
+def _ts(rec: Any) -> float:
+    ts = getattr(rec, "ts", None)
+    return float("-inf") if ts is None else ts
+
+
+class TagIndex:
+    def __init__(self, memory: Optional[Mapping] = None) -> None:
+        self.memory = memory if memory is not None else {}
+        self.rebuild()
+
+    def clear(self) -> None:
+        self._by_tag: Dict[str, Dict[str, List[int]]] = {}
+        self._key_tags: Dict[str, set] = {}           # key -> теги його записів
+        self._seq: Dict[str, int] = {}                # key -> порядковий номер появи
+        self._next_seq = 0
+        self._latest: Dict[str, Tuple[_Rank, str, int]] = {}  # tag -> (rank, key, idx)
+        self._stale: set = set()                      # вказівник видалено — перерахувати при запиті
+
+    def rebuild(self) -> None:
+        self.clear()
+        for key, arr in self.memory.items():
+            if isinstance(arr, list):
+                for i, rec in enumerate(arr):
+                    self.add(key, i, rec)
+
+    def __contains__(self, tag: object) -> bool:
+        return tag in self._by_tag
+
+    # --- підтримка ---
+    def _rank(self, key: str, i: int, rec: Any) -> _Rank:
+        return (_ts(rec), -self._seq[key], -i)
+
+    def _offer(self, tag: str, rank: _Rank, key: str, i: int) -> None:
+        if tag in self._stale:
+            return
+        cur = self._latest.get(tag)
+        if cur is None or rank > cur[0]:
+            self._latest[tag] = (rank, key, i)
+
+    def add(self, key: str, i: int, rec: Any) -> None:
+        if key not in self._seq:
+            self._seq[key] = self._next_seq
+            self._next_seq += 1
+        rank = self._rank(key, i, rec)
+        tags = record_tags(rec)
+        if tags:
+            kt = self._key_tags.setdefault(key, set())
+            for tag in tags:
+                self._by_tag.setdefault(tag, {}).setdefault(key, []).append(i)
+                kt.add(tag)
+                self._offer(tag, rank, key, i)
+        self._offer(ALL, rank, key, i)
+
+    def discard_key(self, key: str) -> None:
+        if self._seq.pop(key, None) is None:
+            return
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._by_tag[tag]
+                    self._stale.discard(tag)
+            self._drop_latest(tag, key)
+        self._drop_latest(ALL, key)
+
+    def _drop_latest(self, tag: str, key: str) -> None:
+        cur = self._latest.get(tag)
+        if cur is not None and cur[1] == key:
+            del self._latest[tag]
+            if tag in self._by_tag or (tag == ALL and self._seq):
+                self._stale.add(tag)
+
+    # --- запити ---
+    def refs(self, tag: str) -> Iterator[Tuple[str, int]]:
+        """(key, idx) записів із тегом у порядку обходу пам'яті."""
+        keys = self._by_tag.get(tag)
+        if not keys:
+            return
+        for key in sorted(keys, key=self._seq.__getitem__):
+            for i in keys[key]:
+                yield key, i
+
+    def records(self, tag: str) -> List[Any]:
+        return [self.memory[key][i] for key, i in self.refs(tag)]
+
+    def latest(self, tag: str = ALL) -> Optional[Tuple[_Rank, str, int]]:
+        """
+        (rank, key, idx) найсвіжішого запису з тегом (ALL — серед усіх записів) або None.
+        rank = (ts, -порядок ключа, -idx) — ранги різних тегів можна порівнювати між собою.
+        """
+        if tag in self._stale:
+            self._stale.discard(tag)
+            if tag == ALL:
+                refs = (
+                    (key, i) for key, arr in self.memory.items() if isinstance(arr, list)
+                    for i in range(len(arr))
+                )
+            else:
+                refs = self.refs(tag)
+            for key, i in refs:
+                self._offer(tag, self._rank(key, i, self.memory[key][i]), key, i)
+        return self._latest.get(tag)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+time_index.py — відсортований індекс часу записів пам'яті.
+
+Записи лежать у двох паралельних списках (ts, (seq ключа, idx)), відсортованих за ts:
+діапазон [start, end) — це два bisect і зріз, без розбору timestamp кожного запису.
+Нові записи майже завжди найсвіжіші, тож вставка зазвичай — append.
+Видалення ключа лише "забуває" його seq; мертві позиції вичищаються, коли їх
+стає більше за живі.
+
+Також тут — розбір часових виразів у питаннях ("вчора", "минулого тижня").
+"""
+from __future__ import annotations
+
+import bisect
+import re
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .record import iso_to_ts
+
+
+def as_ts(value: Any) -> Optional[float]:
+    """datetime / date / ISO-рядок / epoch -> epoch (float); None — без межі."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    ts = iso_to_ts(value)
+    if ts is None:
+        raise ValueError(f"unsupported time value: {value!r}")
+    return ts
+
+
+def _record_ts(rec: Any) -> Optional[float]:
+    ts = getattr(rec, "ts", None)
+    if ts is None and isinstance(rec, Mapping):
+        ts = iso_to_ts(rec.get("timestamp"))
+    return ts
+
+
+class TimeIndex:
+    def __init__(self, memory: Optional[Mapping] = None) -> None:
+        self.memory = memory if memory is not None else {}
+        self.rebuild()
+
+    def clear(self) -> None:
+        self._ts: List[float] = []
+        self._refs: List[Tuple[int, int]] = []    # (seq ключа, idx) — паралельно до _ts
+        self._seq: Dict[str, int] = {}            # живі ключі -> seq
+        self._key_of: Dict[int, str] = {}         # seq -> ключ (лише живі)
+        self._count: Dict[int, int] = {}          # seq -> скільки позицій у списках
+        self._next_seq = 0
+        self._n_dead = 0
+
+    def rebuild(self) -> None:
+        # одне стабільне сортування замість вставки кожного запису (пам'ять не в порядку часу)
+        self.clear()
+        rows: List[Tuple[float, Tuple[int, int]]] = []
+        for key, arr in self.memory.items():
+            if not isinstance(arr, list):
+                continue
+            seq = self._seq[key] = self._next_seq
+            self._key_of[seq] = key
+            self._next_seq += 1
+            n = 0
+            for i, rec in enumerate(arr):
+                ts = _record_ts(rec)
+                if ts is not None:
+                    rows.append((ts, (seq, i)))
+                    n += 1
+            if n:
+                self._count[seq] = n
+        rows.sort(key=lambda r: r[0])
+        self._ts = [r[0] for r in rows]
+        self._refs = [r[1] for r in rows]
+
+    def __len__(self) -> int:
+        return len(self._ts) - self._n_dead
+
+    # --- підтримка ---
+    def add(self, key: str, i: int, rec: Any) -> None:
+        seq = self._seq.get(key)
+        if seq is None:
+            seq = self._seq[key] = self._next_seq
+            self._key_of[seq] = key
+            self._next_seq += 1
+        ts = _record_ts(rec)
+        if ts is None:
+            return
+        if not self._ts or ts >= self._ts[-1]:
+            self._ts.append(ts)
+            self._refs.append((seq, i))
+        else:
+            pos = bisect.bisect_right(self._ts, ts)
+            self._ts.insert(pos, ts)
+            self._refs.insert(pos, (seq, i))
+        self._count[seq] = self._count.get(seq, 0) + 1
+
+    def discard_key(self, key: str) -> None:
+        seq = self._seq.pop(key, None)
+        if seq is None:
+            return
+        self._key_of.pop(seq, None)
+        self._n_dead += self._count.pop(seq, 0)
+        if self._n_dead > len(self._ts) - self._n_dead:
+            self._compact()
+
+    def _compact(self) -> None:
+        live = self._key_of
+        keep = [n for n, (seq, _) in enumerate(self._refs) if seq in live]
+        self._ts = [self._ts[n] for n in keep]
+        self._refs = [self._refs[n] for n in keep]
+        self._n_dead = 0
+
+    # --- запити ---
+    def between(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        newest_first: bool = True,
+    ) -> Iterator[Tuple[float, str, int]]:
+        """(ts, key, idx) записів з start <= ts < end; None — без межі."""
+        lo = 0 if start is None else bisect.bisect_left(self._ts, start)
+        hi = len(self._ts) if end is None else bisect.bisect_left(self._ts, end)
+        order = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+        key_of = self._key_of
+        for n in order:
+            seq, i = self._refs[n]
+            key = key_of.get(seq)
+            if key is not None:
+                yield self._ts[n], key, i
+
+
+# ===== Часові вирази в питаннях =====
+def _day(d: date) -> float:
+    return datetime(d.year, d.month, d.day).timestamp()
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _prev_month_start(d: date) -> date:
+    first = _month_start(d)
+    return _month_start(first - timedelta(days=1))
+
+
+def _ranges(now: datetime) -> List[Tuple[re.Pattern, float, float]]:
+    today = now.date()
+    week = today - timedelta(days=today.weekday())
+    return [
+        (re.compile(r"\bсьогодні\b"), _day(today), _day(today + timedelta(days=1))),
+        (re.compile(r"\bвчора\b"), _day(today - timedelta(days=1)), _day(today)),
+        (re.compile(r"\bпозавчора\b"), _day(today - timedelta(days=2)), _day(today - timedelta(days=1))),
+        (re.compile(r"\b(цього тижня|на цьому тижні)\b"), _day(week), now.timestamp() + 1),
+        (re.compile(r"\b(минулого тижня|на минулому тижні)\b"), _day(week - timedelta(days=7)), _day(week)),
+        (re.compile(r"\bза (останній |цей )?тиждень\b"), (now - timedelta(days=7)).timestamp(), now.timestamp() + 1),
+        (re.compile(r"\b(цього місяця|[ув] цьому місяці)\b"), _day(_month_start(today)), now.timestamp() + 1),
+        (re.compile(r"\b(минулого місяця|[ув] минулому місяці)\b"),
+         _day(_prev_month_start(today)), _day(_month_start(today))),
+        (re.compile(r"\bза (останній |цей )?місяць\b"), (now - timedelta(days=30)).timestamp(), now.timestamp() + 1),
+    ]
+
+
+def parse_time_range(text: str, now: Optional[datetime] = None) -> Optional[Tuple[float, float, str]]:
+    """
+    Знайти часовий вираз у (нормалізованому) тексті.
+    Повертає (start, end, текст без виразу) або None.
+    """
+    now = now or datetime.now()
+    for rx, start, end in _ranges(now):
+        m = rx.search(text)
+        if m:
+            rest = (text[:m.start()] + " " + text[m.end():]).strip()
+            return start, end, " ".join(rest.split())
+    return None
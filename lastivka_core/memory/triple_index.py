@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+triple_index.py — індекс трійок (subject, rel, object) записів пам'яті.
+
+Три перестановки, кожна відповідає своєму шаблону запиту без сканування:
+    SPO  subject -> rel -> {записи}           (s, ?, ?) / (s, p, ?) / (s, p, o)
+    POS  rel -> токен об'єкта -> {записи}     (?, p, o) / (?, p, ?)
+    OSP  токен об'єкта -> subject -> {записи} (?, ?, o)
+
+Терміни нормалізуються: subject — normalize_key (як ключ пам'яті), rel — normalize,
+object — множина стемів його токенів (об'єкт збігається, якщо містить усі стеми
+запиту). Для об'єктів стемер знає ще й закінчення прикметників, тож "зелене"
+знаходить "зелений". Записи адресуються (key, idx), як у TagIndex; результати —
+у порядку обходу пам'яті.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .index import normalize, normalize_key, tokenize
+from .stemmer import UA_ENDINGS, SuffixStemmer
+
+Ref = Tuple[str, int]
+Terms = Tuple[str, str, FrozenSet[str]]
+
+# Закінчення прикметників (лише для термінів трійок — індекс у RAM, на диск не пишеться)
+_ADJ_ENDINGS = ("ий", "ій", "ого", "ому", "им", "ім", "их", "ими", "ої", "ою", "є", "ї")
+_OBJ_STEMMER = SuffixStemmer(UA_ENDINGS + _ADJ_ENDINGS)
+_NO_OBJ = ""  # об'єкт без токенів (щоб (?, p, ?) бачив і такі записи)
+
+
+def subject_term(s: Any) -> str:
+    return normalize_key(str(s or ""))
+
+
+def rel_term(p: Any) -> str:
+    return normalize(str(p or "")) or "is"
+
+
+def object_terms(o: Any) -> FrozenSet[str]:
+    return frozenset(_OBJ_STEMMER.stem_many(tokenize(str(o or ""))))
+
+
+def record_terms(key: str, rec: Any) -> Optional[Terms]:
+    """Нормалізовані терміни трійки запису; None — запис без трійки."""
+    if not isinstance(rec, Mapping):
+        return None
+    tri = rec.get("triple")
+    if not tri or not isinstance(tri, (list, tuple)) or len(tri) != 3:
+        return None
+    # типова трійка має subject = key_norm (уже нормалізований) — не стемимо вдруге
+    subj = key if not tri[0] or tri[0] == key else subject_term(tri[0])
+    return subj, rel_term(tri[1]), object_terms(tri[2])
+
+
+def pattern_terms(subject: Any = None, rel: Any = None, obj: Any = None) -> Tuple[Optional[str], Optional[str], Optional[FrozenSet[str]]]:
+    """Нормалізований шаблон запиту; None — будь-яке значення."""
+    s = subject_term(subject) if subject is not None else None
+    p = rel_term(rel) if rel is not None else None
+    o = object_terms(obj) if obj is not None else None
+    return s, p, (o or None)  # об'єкт без токенів — без обмеження
+
+
+def matches(terms: Terms, s: Optional[str], p: Optional[str], o: Optional[FrozenSet[str]]) -> bool:
+    return (s is None or terms[0] == s) and (p is None or terms[1] == p) and (o is None or o <= terms[2])
+
+
+class TripleIndex:
+    def __init__(self, memory: Optional[Mapping] = None) -> None:
+        self.memory = memory if memory is not None else {}
+        self.rebuild()
+
+    def clear(self) -> None:
+        self._spo: Dict[str, Dict[str, Set[Ref]]] = {}
+        self._pos: Dict[str, Dict[str, Set[Ref]]] = {}
+        self._osp: Dict[str, Dict[str, Set[Ref]]] = {}
+        self._terms: Dict[Ref, Terms] = {}
+        self._by_key: Dict[str, List[int]] = {}
+        self._seq: Dict[str, int] = {}   # key -> порядок появи (для порядку результатів)
+        self._next_seq = 0
+
+    def rebuild(self) -> None:
+        self.clear()
+        for key, arr in self.memory.items():
+            if isinstance(arr, list):
+                for i, rec in enumerate(arr):
+                    self.add(key, i, rec)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    # --- підтримка ---
+    @staticmethod
+    def _put(index: Dict[str, Dict[str, Set[Ref]]], a: str, b: str, ref: Ref) -> None:
+        index.setdefault(a, {}).setdefault(b, set()).add(ref)
+
+    @staticmethod
+    def _drop(index: Dict[str, Dict[str, Set[Ref]]], a: str, b: str, ref: Ref) -> None:
+        inner = index.get(a)
+        if inner is None:
+            return
+        refs = inner.get(b)
+        if refs is not None:
+            refs.discard(ref)
+            if not refs:
+                del inner[b]
+                if not inner:
+                    del index[a]
+
+    def add(self, key: str, i: int, rec: Any) -> None:
+        if key not in self._seq:
+            self._seq[key] = self._next_seq
+            self._next_seq += 1
+        terms = record_terms(key, rec)
+        if terms is None:
+            return
+        ref = (key, i)
+        s, p, objs = terms
+        self._terms[ref] = terms
+        self._by_key.setdefault(key, []).append(i)
+        self._put(self._spo, s, p, ref)
+        for o in objs or (_NO_OBJ,):
+            self._put(self._pos, p, o, ref)
+            self._put(self._osp, o, s, ref)
+
+    def discard_key(self, key: str) -> None:
+        self._seq.pop(key, None)
+        for i in self._by_key.pop(key, ()):
+            ref = (key, i)
+            s, p, objs = self._terms.pop(ref)
+            self._drop(self._spo, s, p, ref)
+            for o in objs or (_NO_OBJ,):
+                self._drop(self._pos, p, o, ref)
+                self._drop(self._osp, o, s, ref)
+
+    # --- запити ---
+    @staticmethod
+    def _union(groups: Iterable[Set[Ref]]) -> Set[Ref]:
+        out: Set[Ref] = set()
+        for g in groups:
+            out |= g
+        return out
+
+    def _order(self, refs: Iterable[Ref]) -> List[Ref]:
+        return sorted(refs, key=lambda r: (self._seq[r[0]], r[1]))
+
+    def match(self, subject: Any = None, rel: Any = None, obj: Any = None) -> List[Ref]:
+        """(key, idx) записів, чия трійка відповідає шаблону; None — будь-яке значення."""
+        s, p, o = pattern_terms(subject, rel, obj)
+        if s is not None:
+            by_rel = self._spo.get(s, {})
+            cand = set(by_rel.get(p, ())) if p is not None else self._union(by_rel.values())
+            if o is not None:
+                cand = {r for r in cand if o <= self._terms[r][2]}
+        elif o is not None:
+            # перетин по токенах об'єкта, починаючи з найрідшого
+            groups = []
+            for tok in o:
+                if p is not None:
+                    g = self._pos.get(p, {}).get(tok, set())
+                else:
+                    g = self._union(self._osp.get(tok, {}).values())
+                if not g:
+                    return []
+                groups.append(g)
+            groups.sort(key=len)
+            cand = set(groups[0])
+            for g in groups[1:]:
+                cand &= g
+        elif p is not None:
+            cand = self._union(self._pos.get(p, {}).values())
+        else:
+            cand = set(self._terms)
+        return self._order(cand)
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+vector_index.py — TF-IDF по символьних n-грамах (3–5) і косинусний top-k.
+
+Для "схожих думок" замість SequenceMatcher з кожним записом: текст -> n-грами слів
+(з пробілами по краях, як char_wb) -> вага (1 + log tf) * idf -> L2-нормований
+розріджений вектор. Матриця зберігається по стовпцях (CSC: n-грама -> документи):
+    _col     n-грама -> номер стовпця
+    _indptr  межі стовпців у _indices/_data
+    _indices id документів, _data ваги (float32)
+(з NumPy — масиви numpy, будуються векторно; без NumPy — array.array).
+Запит — сума стовпців n-грам запиту. З NumPy — np.bincount над зрізами
+(мілісекунди на 100k записів), без NumPy — той самий обхід у чистому Python.
+
+Документи, додані після побудови, йдуть у дельту з idf на момент побудови;
+stale() підказує власнику, що час перебудувати (дельта завелика).
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:  # NumPy — необов'язковий прискорювач
+    import numpy as np
+except ImportError:  # pragma: no cover - залежить від оточення
+    np = None
+
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+# Перебудова, коли дельта більша за цю частку побудованих документів (але не менше REBUILD_MIN)
+REBUILD_RATIO = 0.2
+REBUILD_MIN = 1000
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def ngrams(text: str) -> Dict[str, int]:
+    """n-грама -> кількість у тексті (n-грами в межах слів, слово з пробілами по краях)."""
+    grams: List[str] = []
+    for word in _WORD_RE.findall((text or "").lower().replace("’", "'")):
+        w = f" {word} "
+        grams.extend([w[i:i + n] for n in range(NGRAM_MIN, NGRAM_MAX + 1) for i in range(len(w) - n + 1)])
+    return Counter(grams)
+
+
+class CharNgramVectors:
+    def __init__(self, docs: Iterable[Tuple[int, str]] = ()) -> None:
+        self.build(docs)
+
+    def build(self, docs: Iterable[Tuple[int, str]]) -> None:
+        """Побудова з (doc_id, text); doc_id — невеликі невід'ємні цілі (record id, номер)."""
+        # плоскі трійки (рядок, стовпець, tf) у порядку документів; стовпці — у порядку появи n-грам
+        col_of: Dict[str, int] = {}
+        doc_ids, row_ptr = array("i"), array("q", [0])
+        cols, tfs = array("i"), array("i")
+        for d, text in docs:
+            counts = ngrams(text)
+            cols.extend([col_of.setdefault(g, len(col_of)) for g in counts])
+            tfs.extend(counts.values())
+            doc_ids.append(int(d))
+            row_ptr.append(len(cols))
+        n = len(doc_ids)
+        self._col = col_of
+        self._n_docs = n
+        self._idf_new = math.log(1.0 + n) + 1.0  # idf n-грами, якої не було при побудові
+        if np is not None:
+            self._finish_numpy(doc_ids, row_ptr, cols, tfs)
+        else:
+            self._finish_python(doc_ids, row_ptr, cols, tfs)
+        self._delta: Dict[str, List[Tuple[int, float]]] = {}
+        self._n_delta = 0
+        self._dead: Set[int] = set()
+        self._size = max(doc_ids) + 1 if doc_ids else 0
+
+    def _finish_numpy(self, doc_ids: array, row_ptr: array, cols: array, tfs: array) -> None:
+        n_cols = len(self._col)
+        col = np.frombuffer(cols, dtype=np.int32) if cols else np.zeros(0, dtype=np.int32)
+        tf = np.frombuffer(tfs, dtype=np.int32) if tfs else np.zeros(0, dtype=np.int32)
+        rows = np.repeat(np.arange(len(doc_ids)), np.diff(np.frombuffer(row_ptr, dtype=np.int64)))
+        df = np.bincount(col, minlength=n_cols)
+        n = self._n_docs
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        w = (1.0 + np.log(tf)) * idf[col]
+        norms = np.sqrt(np.bincount(rows, weights=w * w, minlength=len(doc_ids)))
+        w /= np.where(norms > 0, norms, 1.0)[rows]
+        order = np.argsort(col, kind="stable")
+        self._idf = idf.tolist()
+        self._indptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        self._indices = np.asarray(doc_ids, dtype=np.int32)[rows[order]]
+        self._data = w[order].astype(np.float32)
+
+    def _finish_python(self, doc_ids: array, row_ptr: array, cols: array, tfs: array) -> None:
+        n_cols = len(self._col)
+        df = [0] * n_cols
+        for c in cols:
+            df[c] += 1
+        n = self._n_docs
+        idf = self._idf = [math.log((1.0 + n) / (1.0 + x)) + 1.0 for x in df]
+        log = math.log
+        w = [(1.0 + log(t)) * idf[c] for c, t in zip(cols, tfs)]
+        for r in range(len(doc_ids)):
+            lo, hi = row_ptr[r], row_ptr[r + 1]
+            norm = math.sqrt(sum(x * x for x in w[lo:hi])) or 1.0
+            w[lo:hi] = [x / norm for x in w[lo:hi]]
+        # CSC підрахунком: позиція кожного елемента — початок його стовпця + зсув
+        indptr = array("q", [0])
+        for x in df:
+            indptr.append(indptr[-1] + x)
+        pos = list(indptr[:-1])
+        indices = array("i", bytes(4 * len(cols)))
+        data = array("f", bytes(4 * len(cols)))
+        for r in range(len(doc_ids)):
+            d = doc_ids[r]
+            for j in range(row_ptr[r], row_ptr[r + 1]):
+                c = cols[j]
+                p = pos[c]
+                indices[p] = d
+                data[p] = w[j]
+                pos[c] = p + 1
+        self._indptr, self._indices, self._data = indptr, indices, data
+
+    def __len__(self) -> int:
+        return self._n_docs + self._n_delta - len(self._dead)
+
+    def _weigh(self, counts: Dict[str, int]) -> Dict[str, float]:
+        col, idf, idf_new = self._col, self._idf, self._idf_new
+        vec = {}
+        for g, c in counts.items():
+            j = col.get(g)
+            vec[g] = (1.0 + math.log(c)) * (idf[j] if j is not None else idf_new)
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {g: w / norm for g, w in vec.items()}
+
+    # --- підтримка ---
+    def add(self, doc: int, text: str) -> None:
+        """Додати документ у дельту (idf — з моменту побудови)."""
+        for g, w in self._weigh(ngrams(text)).items():
+            self._delta.setdefault(g, []).append((doc, w))
+        self._n_delta += 1
+        self._size = max(self._size, doc + 1)
+
+    def discard(self, doc: int) -> None:
+        self._dead.add(doc)
+
+    def stale(self) -> bool:
+        return self._n_delta > max(REBUILD_MIN, REBUILD_RATIO * self._n_docs)
+
+    # --- запити ---
+    def _query(self, text: str) -> List[Tuple[str, float]]:
+        counts = ngrams(text)
+        return [(g, w) for g, w in self._weigh(counts).items() if g in self._col or g in self._delta]
+
+    def scores(self, text: str) -> Dict[int, float]:
+        """doc_id -> косинус із запитом (лише документи зі спільними n-грамами)."""
+        q = self._query(text)
+        acc: Dict[int, float] = {}
+        if np is not None and q:
+            dense = self._dense(q)
+            for doc in np.flatnonzero(dense).tolist():
+                acc[doc] = float(dense[doc])
+            return acc
+        indptr, indices, data = self._indptr, self._indices, self._data
+        for g, qw in q:
+            c = self._col.get(g)
+            if c is not None:
+                for n in range(indptr[c], indptr[c + 1]):
+                    doc = indices[n]
+                    acc[doc] = acc.get(doc, 0.0) + qw * data[n]
+        for g, qw in q:
+            for doc, w in self._delta.get(g, ()):
+                acc[doc] = acc.get(doc, 0.0) + qw * w
+        for doc in self._dead:
+            acc.pop(doc, None)
+        return acc
+
+    def _dense(self, q: List[Tuple[str, float]]):
+        indptr, indices, data = self._indptr, self._indices, self._data
+        idx_parts, w_parts = [], []
+        for g, qw in q:
+            c = self._col.get(g)
+            if c is not None:
+                lo, hi = indptr[c], indptr[c + 1]
+                idx_parts.append(indices[lo:hi])
+                w_parts.append(data[lo:hi] * qw)
+        dense = np.zeros(self._size, dtype=np.float64)
+        if idx_parts:
+            dense += np.bincount(
+                np.concatenate(idx_parts), weights=np.concatenate(w_parts), minlength=self._size
+            )
+        for g, qw in q:
+            for doc, w in self._delta.get(g, ()):
+                dense[doc] += qw * w
+        if self._dead:
+            dense[list(self._dead)] = 0.0
+        return dense
+
+    def top_k(
+        self,
+        text: str,
+        k: Optional[int] = 10,
+        min_score: float = 0.0,
+        max_score: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        (doc_id, косинус) за спаданням; k=None — усі. min_score < косинус <= max_score.
+        """
+        if k is not None and k <= 0:
+            return []
+        if np is not None:
+            q = self._query(text)
+            if not q:
+                return []
+            dense = self._dense(q)
+            mask = dense > min_score
+            if max_score is not None:
+                mask &= dense <= max_score + 1e-9
+            docs = np.flatnonzero(mask)
+            if k is not None and len(docs) > k:
+                # усі з оцінкою не нижче k-ї: при рівних оцінках — менший id, як без NumPy
+                kth = -np.partition(-dense[docs], k - 1)[k - 1]
+                docs = docs[dense[docs] >= kth]
+            order = sorted(docs.tolist(), key=lambda d: (-dense[d], d))[:k]
+            return [(d, float(dense[d])) for d in order]
+        acc = self.scores(text)
+        items = (
+            (d, s) for d, s in acc.items()
+            if s > min_score and (max_score is None or s <= max_score + 1e-9)
+        )
+        if k is None:
+            return sorted(items, key=lambda kv: (-kv[1], kv[0]))
+        return heapq.nsmallest(k, items, key=lambda kv: (-kv[1], kv[0]))
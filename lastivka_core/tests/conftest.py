@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Спільні фікстури тестів: MemoryManager лише в tmp_path, ніколи не в робочому config/
+"""
+import pytest
+
+from lastivka_core.memory import manager as mgr
+
+
+@pytest.fixture
+def store_at(monkeypatch):
+    """
+    store_at(cfg): перенаправити файли MemoryManager (сховище, індекс, журнал, знімок) на cfg;
+    stats_file виводиться з CONFIG_FILE, тож теж опиняється поруч із cfg.
+    """
+    def use(cfg):
+        monkeypatch.setattr(mgr, "CONFIG_FILE", cfg)
+        monkeypatch.setattr(mgr, "INDEX_FILE", cfg.with_suffix(".idx"))
+        monkeypatch.setattr(mgr, "JOURNAL_FILE", cfg.with_suffix(".journal"))
+        monkeypatch.setattr(mgr, "SNAPSHOT_FILE", cfg.with_suffix(".snap"))
+        return cfg
+    return use
+
+
+@pytest.fixture
+def store(tmp_path, store_at):
+    """JSON-сховище у тимчасовому каталозі; повертає шлях до memory_store.json."""
+    return store_at(tmp_path / "memory_store.json")
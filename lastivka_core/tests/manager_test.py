@@ -4,7 +4,7 @@ from pathlib import Path
 from lastivka_core.memory.manager import MemoryManager   # ← правильний імпорт
 
 @pytest.fixture
-def mem():
+def mem(store):
     m = MemoryManager()
     m.clear_memory()
     return m
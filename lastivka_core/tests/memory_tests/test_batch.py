@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетний запис MemoryManager: один коміт, дедуп, відкат
+"""
+import json
+
+import pytest
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory import storage
+
+
+def test_add_thoughts_single_commit(store, monkeypatch):
+    m = mgr.MemoryManager(journal=False)
+    m.smart_search("будь-що")  # індекс живий
+    saves = []
+    monkeypatch.setattr(storage, "_safe_write", lambda path, data: saves.append(path))
+    n = m.add_thoughts([
+        ("кава", "чорна"),
+        ("кава", "чорна"),  # дублікат
+        {"key": "чай", "text": "зелений", "tags": ["напій"]},
+        ("сир", "твердий", "радість"),
+    ])
+    assert n == 3
+    assert saves == [store]
+    assert m.smart_search("зелений", limit=1)[0]["key"] == "чай"
+
+
+def test_batch_rollback(store):
+    m = mgr.MemoryManager(journal=True)
+    m.add_thought("хліб", "чорний")
+    m.smart_search("хліб")
+    journal_before = store.with_suffix(".journal").read_bytes()
+    with pytest.raises(RuntimeError):
+        with m.batch():
+            m.add_thought("молоко", "свіже")
+            m.delete_thoughts_by_key("хліб")
+            raise RuntimeError("boom")
+    assert m.get_all_keys() == ["хліб"]
+    assert store.with_suffix(".journal").read_bytes() == journal_before
+    assert m.smart_search("чорний", limit=1)[0]["key"] == "хліб"
+    assert not m.smart_search("свіже")
+
+
+def test_batch_journal_commit(store):
+    m = mgr.MemoryManager(journal=True)
+    with m.batch():
+        m.add_thought("борщ", "червоний")
+        m.add_thought("вареники", "з вишнями")
+        m.delete_thoughts_by_key("борщ")
+    lines = store.with_suffix(".journal").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["seq"] for x in lines] == [1, 2, 3]
+    assert mgr.MemoryManager(journal=True).get_all_keys() == ["вареники"]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк: відтворюване синтетичне сховище і JSON-результат на маленькому розмірі
+"""
+import json
+
+from lastivka_core.memory import bench
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.index import normalize_key
+
+
+def test_synthetic_memory_is_reproducible():
+    a = bench.synthetic_memory(400, seed=3)
+    assert a == bench.synthetic_memory(400, seed=3)
+    assert a != bench.synthetic_memory(400, seed=4)
+    assert sum(len(v) for v in a.values()) == 400
+    raws = {r["key_raw"] for v in a.values() for r in v}
+    # одна лема під різними словоформами ключа -> той самий key_norm
+    assert any(normalize_key(r) != r for r in raws)
+    assert any(len({r["key_raw"] for r in v}) > 1 for v in a.values())
+    rec = next(iter(a.values()))[0]
+    assert rec["key_norm"] == normalize_key(rec["key_raw"]) and len(rec["triple"]) == 3
+
+
+def test_queries_are_distinct():
+    qs = bench.synthetic_queries(30, seed=3)
+    for kind in ("smart", "ask", "find"):
+        assert len(qs[kind]) == len(set(qs[kind])) == 30
+
+
+def test_run_emits_comparable_json(tmp_path):
+    config = mgr.CONFIG_FILE
+    out = bench.run([300], seed=3, queries=10, adds=20, workdir=tmp_path)
+    assert mgr.CONFIG_FILE == config  # файли менеджера повернуто
+    res = json.loads(json.dumps(out))["results"][0]
+    assert res["records"] == 300 and res["index_build_s"] >= 0
+    for name in ("smart_search", "ask", "find_thoughts"):
+        assert res[name]["n"] >= 9 and res[name]["p50_ms"] <= res[name]["p99_ms"]
+    assert res["add_thought"]["accepted"] > 0 and res["add_thought"]["per_s"] > 0
+    assert list(tmp_path.iterdir()) == []  # тимчасове сховище прибране
+
+    rows = bench.compare(out, out)
+    assert rows and all(r["ratio"] == 1.0 for r in rows)
+    assert bench.parse_sizes("1k, 10k,1m,250") == [1000, 10000, 1000000, 250]
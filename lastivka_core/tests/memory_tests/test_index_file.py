@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Тести on-disk індексу пам'яті (index_file + MemoryIndex.open)
+"""
+import json
+from array import array
+
+from lastivka_core.memory import index
+from lastivka_core.memory.index import MemoryIndex
+from lastivka_core.memory.index_file import MappedPostings, OverlayPostings, decode_postings, encode_postings
+
+
+def _memory():
+    return {
+        "кав": [
+            {"key_raw": "кава", "text": "чорна", "tags": ["напій"], "triple": ["кав", "is", "чорна"]},
+            {"key_raw": "кава", "text": "з молоком", "triple": ["кав", "is", "з молоком"]},
+        ],
+        "чай": [{"key_raw": "чай", "text": "зелений", "triple": ["чай", "is", "зелений"]}],
+    }
+
+
+def test_roundtrip_mmap(tmp_path):
+    path = tmp_path / "memory.idx"
+    mem = _memory()
+    built = MemoryIndex(mem)
+    assert built.save(path)
+
+    loaded = MemoryIndex(mem, build=False)
+    assert loaded.load(path)
+    assert isinstance(loaded.inv, MappedPostings)
+    assert len(loaded.inv) == len(built.inv)
+    for tok, plist in built.inv.items():
+        assert loaded.inv[tok] == plist
+    assert loaded.search("зелений чай") == built.search("зелений чай")
+    loaded.close()
+
+
+def test_stale_file_rebuilt(tmp_path):
+    path = tmp_path / "memory.idx"
+    mem = _memory()
+    MemoryIndex(mem).save(path)
+
+    mem["сир"] = [{"key_raw": "сир", "text": "твердий", "triple": ["сир", "is", "твердий"]}]
+    stale = MemoryIndex(mem, build=False)
+    assert not stale.load(path)
+
+    idx = MemoryIndex.open(mem, path)
+    assert idx.search("твердий", limit=1)[0][0] == "сир"
+    idx.close()
+    reopened = MemoryIndex(mem, build=False)
+    assert reopened.load(path)
+    reopened.close()
+
+
+def test_corrupt_file_rejected(tmp_path):
+    path = tmp_path / "memory.idx"
+    path.write_text("index: placeholder\n", encoding="utf-8")
+    idx = MemoryIndex.open(_memory(), path)
+    assert idx.search("чорна", limit=1)
+    idx.close()
+    assert path.read_bytes().startswith(b"LVMIDX")
+
+
+def test_varint_postings_roundtrip():
+    ids = [0, 1, 127, 128, 300, 16384, 2 ** 32 - 2]
+    blob = encode_postings(ids)
+    assert decode_postings(blob) == array("I", ids)
+    assert len(encode_postings(range(1000))) == 1000  # дельта 1 — один байт
+
+
+def test_bounded_feature_cache_and_compacted_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(index, "FEATURE_CACHE", 2)
+    mem = _memory()
+    idx = MemoryIndex(mem)
+    mem["сир"] = [{"key_raw": "сир", "text": "твердий", "triple": ["сир", "is", "твердий"]}]
+    idx.add_record("сир", 0)
+    idx.remove_key("чай")
+    del mem["чай"]
+    assert idx.search("твердий", limit=1)[0][0] == "сир"
+    assert len(idx._feat) <= 2
+
+    path = tmp_path / "memory.idx"
+    assert idx.save(path)
+    assert not idx._dead and len(idx._rec_kid) == 3
+    loaded = MemoryIndex(mem, build=False)
+    assert loaded.load(path)
+    assert loaded.search("чорна твердий") == MemoryIndex(mem).search("чорна твердий")
+    loaded.close()
+
+
+def test_writes_after_load_go_to_delta_overlay(tmp_path, monkeypatch):
+    path = tmp_path / "memory.idx"
+    mem = _memory()
+    MemoryIndex(mem).save(path)
+    idx = MemoryIndex(mem, build=False)
+    assert idx.load(path)
+
+    decoded = []
+    real = MappedPostings._decode
+    monkeypatch.setattr(MappedPostings, "_decode", lambda self, *a: decoded.append(a) or real(self, *a))
+    mem["сир"] = [{"key_raw": "сир", "text": "твердий чорний", "triple": ["сир", "is", "твердий"]}]
+    idx.add_record("сир", 0)
+    assert isinstance(idx.inv, OverlayPostings) and not decoded  # файл не декодовано
+    assert set(idx.inv.delta) >= {"твердий", "чорний"}
+    assert idx.search("чорний твердий") == MemoryIndex(mem).search("чорний твердий")
+    assert "твердий" in idx.inv and len(idx.inv) == len(MemoryIndex(mem).inv)
+
+    # flush у той самий файл: дельта зливається з постингами файлу
+    assert idx.save(path) and isinstance(idx.inv, dict)
+    reloaded = MemoryIndex(mem, build=False)
+    assert reloaded.load(path)
+    assert reloaded.search("чорний твердий") == MemoryIndex(mem).search("чорний твердий")
+
+    # compact() поверх дельти
+    mem["хліб"] = [{"key_raw": "хліб", "text": "чорний", "triple": ["хліб", "is", "чорний"]}]
+    reloaded.add_record("хліб", 0)
+    reloaded.remove_key("кав")
+    del mem["кав"]
+    assert reloaded.compact() == 2 and isinstance(reloaded.inv, dict)
+    assert reloaded.inv == MemoryIndex(mem).inv
+    reloaded.close()
+
+
+def test_timestamp_change_makes_file_stale(tmp_path):
+    path = tmp_path / "memory.idx"
+    mem = _memory()
+    mem["чай"][0]["timestamp"] = "2025-01-01T10:00:00"
+    MemoryIndex(mem).save(path)
+    mem["чай"][0]["timestamp"] = "2025-06-01T10:00:00"  # лише час: recency з файлу був би хибний
+    assert not MemoryIndex(mem, build=False).load(path)
+
+
+def test_manager_opens_index_without_hashing_records(store, monkeypatch):
+    from lastivka_core.memory import manager as mgr
+
+    m = mgr.MemoryManager(journal=True)
+    m.add_thought("кава", "чорна")
+    m.smart_search("кава")
+    m.close()
+
+    def no_scan(memory):
+        raise AssertionError("memory_fingerprint() на старті менеджера")
+
+    monkeypatch.setattr(index, "memory_fingerprint", no_scan)
+    m2 = mgr.MemoryManager(journal=True)
+    assert m2.smart_search("кава", limit=1)[0]["text"] == "чорна"
+    assert isinstance(m2._index.inv, MappedPostings)  # файл підхоплено, не перебудовано
+
+    # зміна JSON в обхід менеджера (навіть лише часу запису) — інший stamp, індекс перебудовується
+    m2.close()
+    data = json.loads(store.read_text(encoding="utf-8"))
+    data["кав"][0]["timestamp"] = "2020-01-01T00:00:00"
+    store.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    m3 = mgr.MemoryManager(journal=True)
+    m3.smart_search("кава")
+    assert not isinstance(m3._index.inv, MappedPostings)
+    m3.close()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Інкрементальні зміни MemoryIndex мають давати той самий результат, що й повна перебудова
+"""
+from lastivka_core.memory.index import MemoryIndex
+
+
+def _rec(key, text):
+    return {"key_raw": key, "text": text, "triple": [key, "is", text]}
+
+
+def _same(a: MemoryIndex, b: MemoryIndex, queries):
+    for q in queries:
+        assert a.search(q) == b.search(q), q
+
+
+def test_add_delete_readd_matches_full_build():
+    mem = {"кав": [_rec("кав", "чорна")]}
+    idx = MemoryIndex(mem)
+
+    mem["чай"] = [_rec("чай", "зелений")]
+    idx.add_record("чай", 0)
+    mem["кав"].append(_rec("кав", "з молоком"))
+    idx.add_record("кав", 1)
+
+    idx.remove_key("кав")
+    del mem["кав"]
+    assert idx._dead
+    assert not any(r[0] == "кав" for r in idx.search("чорна молоком"))
+
+    # той самий ключ знову: (кав, 0) отримує новий record id
+    mem["кав"] = [_rec("кав", "лате")]
+    idx.add_record("кав", 0)
+
+    fresh = MemoryIndex(mem)
+    _same(idx, fresh, ["чорна", "лате", "зелений чай", "кава з молоком"])
+
+    assert idx.compact() == 2
+    assert not idx._dead
+    # після перенумерації id — ті самі постинги, що й у повної перебудови
+    assert idx.inv == fresh.inv
+    _same(idx, fresh, ["чорна", "лате", "зелений чай"])
+
+
+def test_clear_resets_postings():
+    mem = {"сир": [_rec("сир", "твердий")]}
+    idx = MemoryIndex(mem)
+    mem.clear()
+    idx.clear()
+    assert idx.search("твердий") == []
+    mem["хліб"] = [_rec("хліб", "чорний")]
+    idx.add_record("хліб", 0)
+    assert idx.search("чорний", limit=1)[0][0] == "хліб"
+
+
+def test_bm25_prefers_rare_terms_and_survives_reload(tmp_path):
+    mem = {
+        "кав": [_rec("кав", "чорна смачна"), _rec("кав", "смачна з молоком")],
+        "чай": [_rec("чай", "смачний зелений")],
+        "сир": [_rec("сир", "смачний твердий")],
+    }
+    bm25 = {"ranking": "bm25"}
+    idx = MemoryIndex(mem)
+    top = idx.search("смачна чорна", limit=1, weights=bm25)
+    assert top[0][1]["text"] == "чорна смачна"
+
+    path = tmp_path / "memory.idx"
+    idx.save(path)
+    loaded = MemoryIndex(mem, build=False)
+    assert loaded.load(path)
+    assert loaded._len_sum == idx._len_sum
+    assert loaded.search("смачна чорна", weights=bm25) == idx.search("смачна чорна", weights=bm25)
+    loaded.close()
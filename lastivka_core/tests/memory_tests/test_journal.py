@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Журнальний режим MemoryManager: дописування в JSONL, checkpoint, відновлення після збою
+"""
+import json
+
+from lastivka_core.memory import manager as mgr
+
+
+def test_mutations_go_to_journal_not_snapshot(store):
+    m = mgr.MemoryManager(journal=True)
+    snapshot = store.read_bytes()
+    m.add_thought("кава", "чорна", tags=["напій"])
+    m.add_thought("чай", "зелений")
+    m.delete_thoughts_by_key("чай")
+    assert store.read_bytes() == snapshot
+    lines = store.with_suffix(".journal").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["op"] for x in lines] == ["add", "add", "del"]
+
+    # "збій": новий процес відновлює стан із журналу
+    m2 = mgr.MemoryManager(journal=True)
+    assert [r["text"] for r in m2.get_thoughts_by_key("кава")] == ["чорна"]
+    assert not m2.get_thoughts_by_key("чай")
+
+
+def test_checkpoint_and_torn_tail(store):
+    m = mgr.MemoryManager(journal=True)
+    m.add_thought("сир", "твердий")
+    m.checkpoint()
+    assert store.with_suffix(".journal").read_bytes() == b""
+    assert json.loads(store.read_text(encoding="utf-8"))["_meta"]["journal_seq"] == 1
+
+    m.add_thought("хліб", "чорний")
+    with open(store.with_suffix(".journal"), "ab") as f:
+        f.write(b'{"seq": 3, "op": "add", "key": "')  # обірваний запис
+    m2 = mgr.MemoryManager(journal=True)
+    assert sorted(m2.get_all_keys()) == ["сир", "хліб"]
+    assert store.with_suffix(".journal").read_bytes().endswith(b"\n")
+
+
+def test_leftover_journal_folded_without_journal_mode(store):
+    mgr.MemoryManager(journal=True).add_thought("борщ", "червоний")
+    m = mgr.MemoryManager(journal=False)
+    assert m.get_thoughts_by_key("борщ")
+    assert "борщ" in json.loads(store.read_text(encoding="utf-8"))
+    assert store.with_suffix(".journal").read_bytes() == b""
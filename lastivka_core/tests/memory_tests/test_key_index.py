@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Тести KeyIndex: exact / prefix / fuzzy / token_match
+"""
+from difflib import SequenceMatcher
+
+from lastivka_core.memory.key_index import KeyIndex
+
+
+def test_exact_prefix_and_discard():
+    idx = KeyIndex(["кав", "кавун", "чай"])
+    assert idx.exact("кав") == {"кав"}
+    assert sorted(idx.prefix("ка")) == ["кав", "кавун"]
+    assert sorted(idx.prefixes_of("кавуни")) == ["кав", "кавун"]
+    idx.discard("кавун")
+    assert idx.prefix("кав") == ["кав"]
+    assert "кавун" not in idx
+
+
+def test_fuzzy_matches_sequence_matcher():
+    keys = ["молок", "молоко", "мол", "хліб", "ластівк"]
+    idx = KeyIndex(keys)
+    got = dict(idx.fuzzy("молак", 0.6))
+    want = {k: SequenceMatcher(None, k, "молак").ratio() for k in keys}
+    assert got == {k: r for k, r in want.items() if r >= 0.6}
+    assert "хліб" not in got
+
+
+def test_token_match():
+    idx = KeyIndex(["чорна кава", "чай"], tokens=lambda k: (k.split(), [w[:3] for w in k.split()]))
+    assert idx.token_match({"кава"}, set()) == {"чорна кава"}
+    assert idx.token_match(set(), {"чор"}) == {"чорна кава"}
+    assert idx.token_match({"чай"}, set()) == {"чай"}
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Імпорт пакета memory не читає сховище і не створює файлів; MEMORY/_stm_singleton — ліниві
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from lastivka_core.memory.lazy import LazyProxy, is_loaded
+
+ROOT = Path(__file__).resolve().parents[3]
+
+_PROBE = """
+import json, sys
+import lastivka_core.memory
+import lastivka_core.memory.memory_cli
+import lastivka_core.memory.index
+from lastivka_core.memory.manager import MEMORY
+from lastivka_core.memory.short_term import short_term
+from lastivka_core.memory.lazy import is_loaded
+print(json.dumps({
+    "memory": is_loaded(MEMORY),
+    "stm": is_loaded(short_term._stm_singleton),
+    "numpy": "numpy" in sys.modules,
+}))
+MEMORY.add_thought("кава", "чорна")
+print(json.dumps({"memory": is_loaded(MEMORY), "keys": MEMORY.get_all_keys()}))
+"""
+
+
+def test_import_does_not_load_memory(tmp_path):
+    cfg = tmp_path / "store" / "memory_store.json"
+    env = {**os.environ, "LASTIVKA_MEMORY_CONFIG": str(cfg), "PYTHONPATH": str(ROOT)}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], env=env, cwd=str(tmp_path),
+        capture_output=True, text=True, encoding="utf-8", timeout=120, check=True,
+    ).stdout.strip().splitlines()
+    before, after = json.loads(out[-2]), json.loads(out[-1])
+    assert before == {"memory": False, "stm": False, "numpy": False}
+    assert after == {"memory": True, "keys": ["кав"]}
+    assert cfg.exists()  # сховище створено лише першим зверненням
+
+
+def test_proxy_forwards_attributes():
+    made = []
+
+    class Thing:
+        def __init__(self):
+            made.append(self)
+            self.x = 1
+
+    proxy = LazyProxy(Thing)
+    assert not is_loaded(proxy) and "not loaded" in repr(proxy)
+    assert proxy.x == 1
+    proxy.x = 2
+    assert made[0].x == 2 and proxy.x == 2
+    assert is_loaded(proxy) and len(made) == 1
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+long_memory: кеш із перевіркою mtime, write-behind і індекс recall_from_question
+"""
+import json
+import os
+import random
+
+import pytest
+
+from lastivka_core.memory.long_term import long_memory as lm
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / "memory_store.json"
+    monkeypatch.setattr(lm, "MEMORY_FILE", path)
+    monkeypatch.setattr(lm, "FLUSH_DELAY", 3600.0)  # лише явний flush()
+    yield path
+    lm.flush()
+
+
+def _scan(question, memory):
+    """Стара реалізація recall_from_question (повний перебір)."""
+    question = question.lower()
+    for k, v in memory.items():
+        if question in k.lower():
+            return v
+    for k, v in memory.items():
+        if isinstance(v, list):
+            for item in v:
+                if isinstance(item, dict) and question in item.get("value", "").lower():
+                    return f"{k} → {item['value']}"
+    return None
+
+
+def test_write_behind_coalesces(store):
+    lm.remember("кава", "чорна")
+    lm.remember("чай", "зелений")
+    assert not store.exists()  # ще в кеші
+    assert [r["value"] for r in lm.recall("кава")] == ["чорна"]
+    lm.flush()
+    data = json.loads(store.read_text(encoding="utf-8"))
+    assert sorted(data) == ["кава", "чай"]
+    lm.forget("чай")
+    lm.flush()
+    assert sorted(json.loads(store.read_text(encoding="utf-8"))) == ["кава"]
+
+
+def test_zero_delay_writes_through(store, monkeypatch):
+    monkeypatch.setattr(lm, "FLUSH_DELAY", 0)
+    lm.remember("кава", "чорна", tags=["напій"])
+    assert json.loads(store.read_text(encoding="utf-8"))["кава"][0]["tags"] == ["напій"]
+
+
+
+@pytest.mark.skipif("LASTIVKA_LTM_FLUSH_DELAY" in os.environ, reason="затримку задано явно")
+def test_write_through_by_default():
+    assert lm.FLUSH_DELAY == 0  # write-behind перезаписав би зовнішні зміни — лише за бажанням
+
+def test_external_change_is_reloaded(store):
+    lm.remember("кава", "чорна")
+    lm.flush()
+    assert lm.recall_from_question("КАВ") == lm.recall("кава")
+    store.write_text(json.dumps({"мед": [{"value": "гречаний", "tone": None}]}, ensure_ascii=False),
+                     encoding="utf-8")
+    os.utime(store, ns=(1, 1))  # stamp точно інший, навіть на грубому таймері ФС
+    assert lm.recall("кава") is None
+    assert lm.recall_from_question("гречан") == "мед → гречаний"
+
+
+
+def test_generation_tracks_changes(store):
+    g0 = lm.generation()
+    assert lm.generation() == g0  # читання не рахується
+    lm.remember("кава", "чорна")
+    g1 = lm.generation()
+    assert g1 != g0
+    lm.flush()
+    lm.load_memory()
+    assert lm.generation() == g1  # власний запис — не зміна
+    store.write_text(json.dumps({"мед": []}, ensure_ascii=False), encoding="utf-8")
+    os.utime(store, ns=(1, 1))
+    assert lm.generation() != g1
+
+def test_question_index_matches_scan(store):
+    rnd = random.Random(5)
+    words = "кава чай мед хліб сир молоко зелений чорний свіжий ранок вечір купити".split()
+    for n in range(300):
+        key = f"{rnd.choice(words)}/{rnd.choice(words)}" if n % 4 else rnd.choice(words)
+        lm.remember(key, " ".join(rnd.sample(words, 3)) + f" {n}")
+        if n % 37 == 0:
+            lm.forget(rnd.choice(list(lm.load_memory())))
+        if n % 50 == 0:
+            lm.recall_from_question("кава")  # індекс будується й далі оновлюється інкрементально
+    memory = json.loads(json.dumps(lm.load_memory()))
+    for q in words + ["ка", "ай", "ч", "", "молоко 1", "свіжий ранок", "чай/мед", "немає такого", "7"]:
+        assert lm.recall_from_question(q) == _scan(q, memory), q
+
+
+def test_returned_memory_is_detached(store):
+    lm.remember("кава", "чорна")
+    snapshot = lm.load_memory()
+    snapshot["кава"].append({"value": "зіпсовано"})
+    snapshot["чай"] = []
+    lm.list_memories()["кава"][0]["value"] = "зіпсовано"
+    lm.recall("кава")[0]["tone"] = "зіпсовано"
+    assert list(lm.load_memory()) == ["кава"]
+    assert [(r["value"], r["tone"]) for r in lm.recall("кава")] == [("чорна", "радість")]
+    assert lm.recall_from_question("зіпсовано") is None
+    snapshot["кава"] = [{"value": "з молоком"}]
+    lm.save_memory(snapshot)  # зміни — лише через API
+    snapshot["кава"].clear()
+    assert lm.recall_from_question("молоком") == "кава → з молоком"
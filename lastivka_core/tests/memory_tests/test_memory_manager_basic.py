@@ -1,17 +1,22 @@
 # C:\Lastivka\lastivka_core\tests\memory_tests\test_memory_manager_basic.py
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 from lastivka_core.memory.memory_manager import MemoryManager as MM
+from lastivka_core.memory.short_term import experience_manager
 
 
 class TestMemoryManagerBasic(unittest.TestCase):
 
     def setUp(self):
-        # Почистимо короткострокові записи перед тестом
-        # (якщо у майбутньому з'явиться метод clear — можна буде використати його напряму)
-        self._initial = MM.load_experiences()
-        for _ in range(len(self._initial)):
-            MM.load_experiences().pop()
+        # Короткострокові записи — у тимчасовий журнал, а не в experience_log.jsonl модуля
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(experience_manager, "LOG_FILE", os.path.join(tmp.name, "experience_log.jsonl"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_add_and_load_experience(self):
         MM.add_experience("дія", "думка", "test_type")
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Майже-дублікати (MinHash/LSH): add_thought у межах ключа, лінивий підпис ключів
+"""
+import os
+
+import pytest
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory import near_dup
+from lastivka_core.memory.index import _merge_mem_dicts
+from lastivka_core.memory.near_dup import NearDupIndex, jaccard, shingles
+
+
+TEXT = "купити молоко, хліб і сир на вечерю завтра зранку"
+PARAPHRASE = "завтра зранку купити хліб, молоко і сир на вечерю!"
+
+
+@pytest.fixture
+def near_dups(monkeypatch):
+    monkeypatch.setattr(mgr, "NEAR_DUP_THRESHOLD", 0.85)
+
+
+def test_index_finds_paraphrase_only():
+    memory = {"покупк": [{"text": TEXT, "tone": "нейтральний"}, {"text": "чорна"}]}
+    dups = NearDupIndex(memory)
+    assert jaccard(shingles(TEXT), shingles(PARAPHRASE)) == 1.0
+    assert dups.find("покупк", PARAPHRASE, "нейтральний") == ("покупк", 0)
+    assert len(dups) == 1  # короткий текст не індексується
+    assert dups.find("покупк", PARAPHRASE, "радість") is None
+    assert dups.find("список", PARAPHRASE) is None  # інший ключ — не дублікат
+    assert dups.find("покупк", "подзвонити мамі ввечері після роботи про зустріч") is None
+    dups.discard_key("покупк")
+    del memory["покупк"]
+    assert dups.find("покупк", PARAPHRASE) is None
+
+
+def test_keys_signed_lazily(monkeypatch):
+    memory = {"k%d" % n: [{"text": "%s %d" % (TEXT, n)}] for n in range(50)}
+    signed = []
+    real = near_dup.band_keys_of
+    monkeypatch.setattr(near_dup, "band_keys_of", lambda text: signed.append(text) or real(text))
+    dups = NearDupIndex(memory)
+    assert dups.find("k7", PARAPHRASE) == ("k7", 0)
+    assert signed == [memory["k7"][0]["text"]]  # підписано лише ключ запиту
+    exported = dups.export()
+    assert exported["k7"][0][1] is not None and exported["k8"] == [(None, None)]
+
+
+def test_add_thought_rejects_near_duplicates_within_key(store, near_dups):
+    m = mgr.MemoryManager(journal=True)
+    assert m.add_thought("покупки", TEXT)
+    assert not m.add_thought("покупки", PARAPHRASE)
+    assert m.add_thought("покупки", PARAPHRASE, tone="радість")
+    assert m.add_thought("список", PARAPHRASE)  # той самий текст під іншим ключем — окремий запис
+    # короткі тексти — лише точний дедуп у межах ключа
+    assert m.add_thought("кава", "чорна") and m.add_thought("хліб", "чорна")
+
+    m.delete_thoughts_by_key("покупки")
+    assert m.add_thought("покупки", PARAPHRASE)
+
+    with pytest.raises(RuntimeError):
+        with m.batch():
+            m.add_thought("нотатки", "подзвонити мамі ввечері після роботи про зустріч")
+            raise RuntimeError
+    assert m.add_thought("нотатки", "ввечері після роботи подзвонити мамі про зустріч")
+
+
+@pytest.mark.skipif("LASTIVKA_NEAR_DUP" in os.environ, reason="поріг задано в оточенні")
+def test_near_dup_off_by_default(store):
+    assert mgr.NEAR_DUP_THRESHOLD == 0
+    m = mgr.MemoryManager(journal=True)
+    # лише точний дедуп, як до MinHash: перефразування додається, повтор тексту+тону — ні
+    assert m.add_thought("покупки", TEXT) and m.add_thought("покупки", PARAPHRASE)
+    assert not m.add_thought("покупки", TEXT.upper())
+    assert m.add_thought("покупки", TEXT, tone="радість")
+    assert m._dups is None and m._dup_index() is None
+    assert [r["text"] for r in m.get_thoughts_by_key("покупки")] == [TEXT, PARAPHRASE, TEXT]
+
+
+def test_merge_dedups_by_key_identity_only():
+    a = {"покупк": [{"text": TEXT, "tone": "нейтральний"}, {"text": "Чорна"}]}
+    b = {
+        "покупк": [{"text": "чорна"}, {"value": "хліб"}, {"text": PARAPHRASE, "tone": "нейтральний"}],
+        "список": [{"text": TEXT, "tone": "нейтральний"}, "сміття"],
+    }
+    merged = _merge_mem_dicts(a, b)
+    assert [r.get("text") or r.get("value") for r in merged["покупк"]] == [TEXT, "Чорна", "хліб", PARAPHRASE]
+    assert merged["список"] == [{"text": TEXT, "tone": "нейтральний"}]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Кеш запитів MemoryManager: повторний запит — з кешу, будь-яка мутація інвалідує
+"""
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.query_cache import QueryCache
+
+
+def test_lru_eviction_and_generation():
+    c = QueryCache(maxsize=2)
+    c.put("a", 1, "A")
+    c.put("b", 1, "B")
+    assert c.get("a", 1) == "A"
+    c.put("c", 1, "C")  # витісняє "b" (найдавніше використаний)
+    assert c.get("b", 1, None) is None
+    assert c.get("a", 2, None) is None  # інше покоління — застаріло
+    assert c.stats()["stale"] == 1 and len(c) == 1
+
+
+def test_smart_search_and_ask_cached_until_mutation(store):
+    m = mgr.MemoryManager(journal=False)
+    m.add_thought("кава", "чорна", tags=["покупка"])
+    first = m.smart_search("Кава!", limit=3)
+    again = m.smart_search("  кава ", limit=3)
+    assert again == first
+    assert m.cache_stats()["hits"] == 1
+
+    again[0]["text"] = "зіпсовано"  # зміни результату не потрапляють у кеш
+    assert m.smart_search("кава", limit=3)[0]["text"] == "чорна"
+    misses = m.cache_stats()["misses"]
+    m.smart_search("кава", limit=1)  # інший limit — інший ключ
+    assert m.cache_stats()["misses"] == misses + 1
+
+    assert m.ask("що я казав купити?")["text"] == "кава"
+    hits = m.cache_stats()["hits"]
+    assert m.ask("що я казав купити?")["text"] == "кава"
+    assert m.cache_stats()["hits"] == hits + 1
+
+    m.add_thought("кава", "з молоком")
+    assert len(m.smart_search("кава", limit=3)) == 2
+    m.delete_thoughts_by_key("кава")
+    assert m.smart_search("кава", limit=3) == []
+    assert m.cache_stats()["stale"] >= 2
+
+
+def test_sqlite_cache_sees_other_connection_writes(store):
+    m1 = mgr.MemoryManager(backend="sqlite", journal=False)
+    m1.add_thought("кава", "чорна")
+    assert len(m1.smart_search("кава", limit=3)) == 1
+
+    m2 = mgr.MemoryManager(backend="sqlite", journal=False)  # "інший процес"
+    m2.add_thought("кава", "з молоком")
+    m2.close()
+    texts = {r["text"] for r in m1.smart_search("кава", limit=3)}
+    assert texts == {"чорна", "з молоком"}  # PRAGMA data_version змінився — кеш застарів
+    m1.close()
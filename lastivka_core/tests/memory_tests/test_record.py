@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+MemoryRecord: компактне зберігання, dict на межі API, точне відтворення JSON
+"""
+import json
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.record import MemoryRecord
+
+
+def test_roundtrip_keeps_shape():
+    full = {
+        "key_raw": "Кава", "key_norm": "кав", "text": "чорна", "tone": "радість",
+        "timestamp": "2025-08-20T12:30:05.123456", "tags": ["напій"], "rel": None,
+        "triple": ["кав", "is", "чорна"],
+    }
+    legacy = {"key_raw": "чай", "value": "зелений", "timestamp": "2025-08-20T12:00:00+03:00"}
+    for d in (full, legacy):
+        rec = MemoryRecord.from_dict(d)
+        assert rec.to_dict() == d and rec == d
+        assert json.loads(json.dumps(rec.to_dict(), ensure_ascii=False)) == d
+    rec = MemoryRecord.from_dict(full)
+    assert isinstance(rec.ts, float) and rec.tags == ("напій",)
+    assert "rel" in rec and "value" not in MemoryRecord.from_dict(full)
+    assert MemoryRecord.from_dict(legacy).get("text") is None
+
+
+def test_manager_stores_records_returns_dicts(store):
+    m = mgr.MemoryManager(journal=True)
+    m.add_thought("кава", "чорна", tags=["Покупка"])
+    m.add_thought("чай", "зелений", tags=["покупка"])
+    assert all(isinstance(r, MemoryRecord) for arr in m.memory.values() for r in arr)
+    got = m.get_thoughts_by_key("кава")[0]
+    assert type(got) is dict and got["tags"] == ["покупка"]
+    assert type(m.search_by_tag("покупка")[0]) is dict
+    # найсвіжіший запис з тегом покупки — за числовим часом
+    assert m.ask("що купити?")["text"] == "чай"
+
+    m2 = mgr.MemoryManager(journal=True)  # replay журналу
+    assert m2.get_all_memory() == m.get_all_memory()
+    m2.checkpoint()
+    raw = json.loads(store.read_text(encoding="utf-8"))
+    assert raw["кав"][0]["text"] == "чорна" and isinstance(raw["кав"][0]["timestamp"], str)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Статистика стадій пошуку: SearchStats одного запиту і гістограми SearchProfile в менеджері
+"""
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.index import MemoryIndex
+from lastivka_core.memory.search_stats import SearchProfile, SearchStats
+
+
+def _index():
+    return MemoryIndex({
+        "кава": [{"key_raw": "кава", "text": "чорна кава зранку"}],
+        "чай": [{"key_raw": "чай", "text": "зелений чай з медом"}],
+        "мед": [{"key_raw": "мед", "text": "гречаний мед"}],
+    })
+
+
+def test_search_returns_stage_stats():
+    idx = _index()
+    out, stats = idx.search("чорна кава", limit=5, with_stats=True)
+    assert out and isinstance(stats, SearchStats) and idx.last_stats is stats
+    assert stats.results == len(out) and stats.total_ms > 0
+    assert list(stats.as_dict()["stages"]) == ["key_token", "key_fuzzy", "lexical"]
+    lex = stats.stages["lexical"]
+    assert lex.postings >= lex.candidates >= 1
+    assert lex.seq_calls == lex.candidates  # text_fuzzy для кожного кандидата (top-k не відсік)
+    assert stats.stages["key_fuzzy"].seq_calls >= 1  # ratio() для "кава"
+
+    assert idx.search("кава", limit=5, weights={"text_fuzzy": 0}) and idx.last_stats.stages["lexical"].seq_calls == 0
+    _, stats = idx.search("кава", limit=5, weights={"ranking": "bm25"}, with_stats=True)
+    assert stats.ranking == "bm25" and stats.stages["lexical"].candidates == 1
+
+
+def test_fallback_stage_only_when_nothing_found():
+    idx = _index()
+    _, stats = idx.search("кава", with_stats=True)
+    assert "fallback" not in stats.stages
+    _, stats = idx.search("кававарка", weights={"fuzzy": 0}, with_stats=True)
+    fb = stats.stages["fallback"]
+    assert fb.candidates == 1 and fb.postings == 1
+
+
+def test_profile_histograms_and_merge():
+    idx = _index()
+    idx.profile = prof = SearchProfile()
+    for q in ("кава", "чай", "мед"):
+        idx.search(q)
+    list(idx.iter_search("чай"))
+    data = prof.as_dict()
+    assert data["searches"] == 4
+    total = data["stages"]["total"]
+    assert total["runs"] == 4 and sum(total["hist"]) == 4
+    assert total["p50_ms"] is not None and total["ms_max"] >= total["ms_avg"]
+
+    other = SearchProfile()
+    other.merge(data)
+    other.merge(data)
+    assert other.as_dict()["stages"]["lexical"]["runs"] == 2 * data["stages"]["lexical"]["runs"]
+
+
+def test_manager_stats_survive_processes(store):
+    m = mgr.MemoryManager()
+    m.add_thought("кава", "чорна")
+    m.smart_search("кава")
+    assert m.last_search_stats()["results"] == 1
+    assert m.search_stats()["searches"] == 1
+    m._at_exit()
+    assert m.stats_file.exists() and not m.search_profile
+
+    m2 = mgr.MemoryManager()
+    m2.smart_search("чорна")
+    assert m2.search_stats()["searches"] == 2
+    assert m2.search_stats(reset=True)["searches"] == 2
+    assert m2.search_stats()["searches"] == 0 and not m2.stats_file.exists()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Top-k пошук з раннім відсіканням має збігатися з повним ранжуванням; iter_search — посторінково
+"""
+import itertools
+import random
+
+from lastivka_core.memory.index import MemoryIndex
+
+WORDS = "кава чай молоко хліб сир масло мед борщ чорна зелений свіжий твердий смачний гарячий ранок".split()
+
+
+def _memory(n=600, seed=7):
+    rnd = random.Random(seed)
+    mem = {}
+    for j in range(n):
+        key = rnd.choice(WORDS) + str(j % 90)
+        mem.setdefault(key, []).append({
+            "key_raw": key,
+            "text": " ".join(rnd.sample(WORDS, 4)),
+            "triple": [key, "is", rnd.choice(WORDS)],
+        })
+    return mem
+
+
+def _full_ranking(idx, q):
+    cand = idx._candidates(q, None, None, False)
+    ranked = sorted(cand.items(), key=lambda kv: kv[1], reverse=True)
+    return [(*idx._pair(rid), sc) for rid, sc in ranked]
+
+
+def test_topk_matches_full_sort():
+    mem = _memory()
+    idx = MemoryIndex(mem)
+    for q in ("кава чорна", "свіжий хліб", "мед", "сир1", "гарячий ранок чай"):
+        full = _full_ranking(idx, q)
+        for k in (1, 3, 10):
+            got = [(key, mem[key].index(rec), sc) for key, rec, sc in idx.search(q, limit=k)]
+            assert [sc for *_, sc in got] == [sc for *_, sc in full[:k]], (q, k)
+            assert got == full[:k], (q, k)
+
+
+def test_iter_search_pages():
+    idx = MemoryIndex(_memory())
+    q = "смачний мед"
+    everything = list(idx.iter_search(q))
+    assert [r[2] for r in everything] == sorted((r[2] for r in everything), reverse=True)
+    page2 = list(itertools.islice(idx.iter_search(q), 5, 10))
+    assert page2 == everything[5:10]
+    assert everything[:5] == idx.search(q, limit=5)
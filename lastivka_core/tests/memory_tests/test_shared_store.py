@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Спільне сховище: кілька менеджерів (процесів) над одним JSON без втрачених записів
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from lastivka_core.memory import manager as mgr
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_two_managers_see_each_other(store):
+    a = mgr.MemoryManager(shared=True)
+    b = mgr.MemoryManager(shared=True)
+    assert a.add_thought("кава", "чорна")
+    assert [r["text"] for r in b.get_thoughts_by_key("кава")] == ["чорна"]
+    assert b.refresh() == 0  # нічого нового — лише читання stamp
+
+    assert b.add_thought("чай", "зелений")
+    # дедуп бачить чужий запис: a підтягує зміни під lock перед власною мутацією
+    assert not a.add_thought("чай", "зелений")
+    assert a.smart_search("чай", limit=1)[0]["text"] == "зелений"
+
+    with a.batch():
+        a.add_thought("сік", "яблучний")
+        a.delete_thoughts_by_key("кава")
+    assert b.refresh() == 2
+    assert sorted(b.memory) == sorted(a.memory) == ["сік", "чай"]
+
+
+def test_reader_behind_checkpoint_reloads(store):
+    a = mgr.MemoryManager(shared=True)
+    b = mgr.MemoryManager(shared=True)
+    a.add_thought("кава", "чорна")
+    b.refresh()
+    # checkpoint після того, як b уже все бачив: журнал з нуля, без перечитування
+    a.checkpoint()
+    a.add_thought("чай", "зелений")
+    assert b.refresh() == 1 and "чай" in b.memory
+
+    # b відстав: операції до checkpoint є лише у JSON — повне перечитування
+    a.add_thought("сік", "яблучний")
+    a.checkpoint()
+    a.add_thought("мед", "гречаний")
+    assert b.refresh() == -1
+    assert sorted(b.memory) == sorted(a.memory)
+    b.add_thought("хліб", "житній")
+    assert a.get_thoughts_by_key("хліб")[0]["text"] == "житній"
+
+
+_WRITER = """
+import sys
+from lastivka_core.memory.manager import MemoryManager
+m = MemoryManager(shared=True)
+for n in range(int(sys.argv[1])):
+    m.add_thought(f"дочірній {n}", f"думка {n}")
+"""
+
+
+def test_concurrent_processes_lose_no_writes(store):
+    env = {
+        **os.environ, "PYTHONPATH": str(ROOT), "LASTIVKA_MEMORY_CONFIG": str(store),
+        "LASTIVKA_MEMORY_SNAPSHOT": str(store.with_suffix(".snap")),
+    }
+    m = mgr.MemoryManager(shared=True)
+    child = subprocess.Popen([sys.executable, "-c", _WRITER, "30"], env=env, cwd=str(store.parent))
+    for n in range(30):
+        m.add_thought(f"батьківський {n}", f"думка {n}")
+    assert child.wait(timeout=120) == 0
+    m.refresh()
+    assert len(m.memory) == 60
+    fresh = mgr.MemoryManager(shared=True)
+    assert sorted(fresh.memory) == sorted(m.memory)
@@ -2,10 +2,24 @@
 Тестування модуля short_term пам’яті
 """
 
+import json
+import os
+import tempfile
 import unittest
 from lastivka_core.memory.short_term import short_term
+from lastivka_core.memory.short_term.short_term import ShortTermMemory, COMPACT_FACTOR
 
 class TestShortTermMemory(unittest.TestCase):
+    def setUp(self):
+        # singleton пише у тимчасовий журнал, а не в experience_log.jsonl поруч із модулем
+        self.tmp = tempfile.TemporaryDirectory()
+        self._prev = short_term._stm_singleton.storage_path
+        short_term.set_storage_path(os.path.join(self.tmp.name, "experience_log.jsonl"))
+
+    def tearDown(self):
+        short_term.set_storage_path(self._prev)
+        self.tmp.cleanup()
+
     def test_add_and_get_entries(self):
         # Додаємо кілька записів
         short_term.add_entry("Test action 1", "Test thought 1")
@@ -22,5 +36,102 @@ class TestShortTermMemory(unittest.TestCase):
         entries = short_term.get_entries()
         self.assertEqual(entries, [])
 
+
+class TestShortTermRing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _lines(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_ring_and_occasional_compaction(self):
+        stm = ShortTermMemory(self.path, limit=5)
+        for n in range(5 * COMPACT_FACTOR):
+            stm.add_entry(f"дія {n}", f"думка {n}")
+        # лише дописування, поки журнал не досяг COMPACT_FACTOR × limit рядків
+        self.assertEqual(len(self._lines()), 5 * COMPACT_FACTOR)
+        stm.add_entry("дія X", "думка X")
+        self.assertEqual([e["thought"] for e in self._lines()], [e["thought"] for e in stm.get_entries(5)])
+        self.assertEqual(len(stm.entries), 5)
+        self.assertEqual(stm.get_entries(2)[-1]["last_action"], "дія X")
+
+        again = ShortTermMemory(self.path, limit=5)
+        self.assertEqual(again.get_entries(10), stm.get_entries(10))
+
+    def test_set_limit_and_clear_persist(self):
+        stm = ShortTermMemory(self.path, limit=10)
+        for n in range(8):
+            stm.add_entry(str(n), str(n))
+        stm.set_limit(3)
+        self.assertEqual([e["thought"] for e in ShortTermMemory(self.path, limit=10).get_entries(10)], ["5", "6", "7"])
+        stm.clear()
+        self.assertEqual(stm.get_entries(), [])
+        self.assertEqual(ShortTermMemory(self.path).get_entries(), [])
+
+    def test_torn_tail_and_legacy_json(self):
+        legacy = os.path.join(self.tmp.name, "log.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([{"thought": "старий"}], f)
+        stm = ShortTermMemory(self.path)  # .jsonl ще немає — підхоплюємо .json
+        self.assertEqual(stm.get_entries()[0]["thought"], "старий")
+        stm.add_entry("дія", "новий")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"thought": "обірв')  # збій посеред запису
+        stm = ShortTermMemory(self.path)
+        stm.add_entry("дія", "після збою")
+        self.assertEqual([e["thought"] for e in self._lines()], ["старий", "новий", "після збою"])
+
+    def test_close_and_reopen(self):
+        stm = ShortTermMemory(self.path)
+        stm.add_entry("дія", "1")
+        self.assertIsNotNone(stm._fh)
+        stm.close()
+        self.assertIsNone(stm._fh)
+        stm.add_entry("дія", "2")  # дескриптор відкривається знову
+        stm.close()
+        self.assertEqual([e["thought"] for e in self._lines()], ["1", "2"])
+
+
+class TestExperienceLog(unittest.TestCase):
+    def test_experience_manager_shares_the_short_term_log(self):
+        from unittest import mock
+        from lastivka_core.memory.short_term import experience_manager
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "experience_log.jsonl")
+            stm = ShortTermMemory(path)
+            with mock.patch.object(experience_manager, "LOG_FILE", path), \
+                    mock.patch.object(short_term, "_stm_singleton", stm), \
+                    mock.patch.object(experience_manager, "_stm_singleton", stm):
+                experience_manager.add_experience("дія", "досвід", "internal")
+                stm.add_entry("дія", "думка")
+                self.assertEqual([e["thought"] for e in experience_manager.load_experiences()], ["досвід", "думка"])
+            stm.close()
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+    def test_experience_manager_drops_logs_of_old_paths(self):
+        from unittest import mock
+        from lastivka_core.memory.short_term import experience_manager
+
+        with tempfile.TemporaryDirectory() as d:
+            first, second = os.path.join(d, "a.jsonl"), os.path.join(d, "b.jsonl")
+            with mock.patch.object(experience_manager, "LOG_FILE", first):
+                experience_manager.add_experience("дія", "1")
+                old = experience_manager._logs[first]
+                self.assertIsNotNone(old._fh)
+            with mock.patch.object(experience_manager, "LOG_FILE", second):
+                experience_manager.add_experience("дія", "2")
+                self.assertEqual(list(experience_manager._logs), [second])
+                self.assertIsNone(old._fh)  # дескриптор старого журналу закрито
+            with mock.patch.object(experience_manager, "LOG_FILE", first):
+                self.assertEqual([e["thought"] for e in experience_manager.load_experiences()], ["1"])
+            experience_manager._logs.pop(first).close()
+
 if __name__ == "__main__":
     unittest.main()
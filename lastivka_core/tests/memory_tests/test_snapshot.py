@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Бінарний знімок пам'яті: той самий стан, що з JSON, відкат на JSON, перевірка, смуги MinHash
+"""
+import gc
+import os
+import weakref
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory import near_dup, snapshot
+from lastivka_core.memory.record import as_dict
+from lastivka_core.memory.snapshot import read_snapshot, verify_snapshot
+from lastivka_core.memory.storage import file_stamp
+
+
+TEXT = "купити молоко, хліб і сир на вечерю завтра зранку"
+
+
+def _fill(m):
+    m.add_thought("кава", "чорна", tags=["напій"], rel="is")
+    m.add_thought("покупки", TEXT, tone="радість")
+    m.add_thought("чай", "зелений", triple=("чай", "has", "жасмин"))
+    m.memory["чай"].append("сміття")  # нестандартний запис переживає знімок як є
+
+
+def _from_snapshot(m):
+    return m._snap_stamp != (0, 0, 0)
+
+
+def _state(m):
+    return {k: [as_dict(r) if not isinstance(r, str) else r for r in v] for k, v in m.memory.items()}, m.triggers
+
+
+def test_checkpoint_snapshot_roundtrip(store, monkeypatch):
+    monkeypatch.setattr(mgr, "NEAR_DUP_THRESHOLD", 0.85)
+    m = mgr.MemoryManager(journal=True)
+    _fill(m)
+    m.smart_search("кава")  # індекс у файлі -> потрапить у знімок
+    m.checkpoint()
+    assert verify_snapshot(store.with_suffix(".snap"), store)["fresh"]
+
+    store.with_suffix(".idx").unlink()
+    m2 = mgr.MemoryManager(journal=True)
+    assert _from_snapshot(m2)  # пам'ять піднята зі знімка
+    assert _state(m2) == _state(m)
+    assert store.with_suffix(".idx").exists()  # індекс відновлено зі знімка
+    assert m2.smart_search("кава", limit=1)[0]["key"] == "кава"
+    # смуги MinHash узяті зі знімка, дублікат ловиться без перерахунку записів
+    assert m2._band_seed is not None
+    with monkeypatch.context() as mp:
+        mp.setattr(near_dup, "band_keys_of", lambda text: (_ for _ in ()).throw(AssertionError(text)))
+        assert not m2.add_thought("покупки", "завтра зранку купити хліб, молоко і сир на вечерю", tone="радість")
+
+    # операції після знімка доганяються з журналу
+    m2.add_thought("сік", "яблучний")
+    m3 = mgr.MemoryManager(journal=True)
+    assert _from_snapshot(m3) and m3.get_thoughts_by_key("сік")[0]["text"] == "яблучний"
+
+
+def test_stale_or_corrupt_snapshot_falls_back_to_json(store):
+    m = mgr.MemoryManager(journal=False)
+    _fill(m)
+    assert m.write_snapshot() == store.with_suffix(".snap")
+    snap = store.with_suffix(".snap")
+
+    # JSON змінено в обхід менеджера — знімок застарів
+    m.add_thought("сік", "яблучний")
+    assert read_snapshot(snap, file_stamp(store)) is None
+    m2 = mgr.MemoryManager(journal=False)
+    assert not _from_snapshot(m2) and "сік" in m2.memory
+
+    m2.write_snapshot()
+    raw = bytearray(snap.read_bytes())
+    raw[-1] ^= 0xFF
+    snap.write_bytes(bytes(raw))
+    report = verify_snapshot(snap, store)
+    assert not report["ok"] and "crc" in report["error"]
+    m3 = mgr.MemoryManager(journal=False)
+    assert not _from_snapshot(m3) and _state(m3) == _state(m2)
+
+
+def test_stale_instance_does_not_snapshot_over_newer_json(store):
+    m1 = mgr.MemoryManager(journal=False)
+    _fill(m1)
+    m1.smart_search("кава")
+    other = mgr.MemoryManager(journal=False)  # "інший процес" дописує і виходить
+    other.add_thought("сік", "яблучний")
+    other.close()
+    # у m1 пам'ять без "сік": знімок із нею під stamp нового JSON загубив би запис
+    assert m1.write_snapshot() is None
+    m1.close()
+    m3 = mgr.MemoryManager(journal=False)
+    assert _from_snapshot(m3) and m3.get_thoughts_by_key("сік")[0]["text"] == "яблучний"
+
+
+def test_snapshot_of_other_python_falls_back_to_json(store, monkeypatch):
+    m = mgr.MemoryManager(journal=False)
+    _fill(m)
+    m.save_memory()
+    snap = m.write_snapshot()
+    monkeypatch.setattr(snapshot, "PY_MAGIC", b"\x00\x00\r\n")
+    assert "Python" in verify_snapshot(snap, store)["error"]
+    m2 = mgr.MemoryManager(journal=False)
+    assert not _from_snapshot(m2) and _state(m2) == _state(m)
+
+
+def test_idle_instance_persists_nothing(store):
+    m = mgr.MemoryManager(journal=False)
+    _fill(m)
+    m.close()
+    snap = store.with_suffix(".snap")
+    assert snap.exists()
+    snap.unlink()
+    mgr.MemoryManager(journal=False).close()  # лише створений (допоміжний екземпляр)
+    assert not snap.exists() and not store.with_suffix(".stats").exists()
+    used = mgr.MemoryManager(journal=False)
+    used.smart_search("кава")
+    used.close()
+    assert snap.exists()
+
+
+
+def test_exit_hook_does_not_keep_instances(store):
+    snap = store.with_suffix(".snap")
+    m = mgr.MemoryManager(journal=False)
+    _fill(m)
+    ref = weakref.ref(m)
+    del m
+    gc.collect()
+    assert ref() is None  # хук виходу не тримає екземпляр
+    mgr._exit_live()
+    assert not snap.exists()
+    live = mgr.MemoryManager(journal=False)
+    live.add_thought("мед", "гречаний")
+    mgr._exit_live()  # незакритий живий екземпляр зберігається при виході
+    assert snap.exists()
+    live.close()
+
+def test_snapshot_cli(store, capsys):
+    from lastivka_core.memory import memory_cli
+
+    m = mgr.MemoryManager(journal=False)
+    _fill(m)
+    path = store.parent / "copy.snap"
+    assert memory_cli.snapshot_command(["create", "--path", str(path)], m)
+    assert memory_cli.snapshot_command(["verify", "--path", str(path)], m)
+    assert os.path.getsize(path) > 0
+    out = capsys.readouterr().out
+    assert "records=4" in out
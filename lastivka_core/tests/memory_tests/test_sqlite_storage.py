@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite-сховище MemoryManager: запис без перезапису файлу, FTS5-пошук, пакети, імпорт JSON
+"""
+import json
+import sqlite3
+
+import pytest
+
+from lastivka_core.memory import manager as mgr
+
+
+def test_crud_and_search(store):
+    m = mgr.MemoryManager(backend="sqlite")
+    assert m._storage.path == store.with_suffix(".db")
+    assert m.add_thought("кава", "чорна з цукром", tags=["напій", "покупка"])
+    assert not m.add_thought("кава", "Чорна з цукром")  # дублікат
+    m.add_thought("чай", "зелений", triple=("чай", "is", "напій з листя"))
+    m.add_thought("сир", "твердий")
+    assert not store.with_suffix(".idx").exists()  # MemoryIndex не будується
+
+    assert m.smart_search("кава", limit=1)[0]["text"] == "чорна з цукром"
+    assert m.smart_search("зелений", limit=1)[0]["key"] == "чай"
+    assert m.smart_search("листям", limit=1)[0]["key"] == "чай"
+    assert [r["key"] for r in m.iter_search("напій")] == [r["key"] for r in m.smart_search("напій")]
+    assert [r["text"] for r in m.search_by_tag("покупка")] == ["чорна з цукром"]
+    assert [r["text"] for r in m.find_thoughts("сир")] == ["твердий"]
+
+    m.delete_thoughts_by_key("сир")
+    assert m.smart_search("твердий") == []
+
+    m2 = mgr.MemoryManager(backend="sqlite")
+    assert m2.get_all_keys() == ["кав", "чай"]
+    assert m2.get_thoughts_by_key("кава")[0]["tags"] == ["напій", "покупка"]
+    assert m2.ask("кава")["text"] == "чорна з цукром"
+
+    db = sqlite3.connect(str(m._storage.path))
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("SELECT COUNT(*) FROM records_fts").fetchone()[0] == 2
+    db.close()
+
+
+def test_batch_is_one_transaction(store):
+    m = mgr.MemoryManager(backend="sqlite")
+    m.add_thought("хліб", "чорний")
+    with pytest.raises(RuntimeError):
+        with m.batch():
+            m.add_thought("масло", "вершкове")
+            m.delete_thoughts_by_key("хліб")
+            raise RuntimeError("boom")
+    assert m.get_all_keys() == ["хліб"]
+    assert m.find_thoughts("масло") == []
+    assert m.add_thoughts([("масло", "вершкове"), ("мед", "гречаний")]) == 2
+    assert mgr.MemoryManager(backend="sqlite").get_all_keys() == ["масл", "мед", "хліб"]
+
+
+def test_json_store_imported_once(store):
+    store.write_text(json.dumps({
+        "кав": [{"key_raw": "кава", "text": "чорна", "tone": "нейтральний"}],
+        "triggers": {"привіт": {"reply": "вітаю"}},
+    }, ensure_ascii=False), encoding="utf-8")
+    m = mgr.MemoryManager(backend="sqlite")
+    assert m.get_thoughts_by_key("кава")[0]["text"] == "чорна"
+    assert m.triggers == {"привіт": {"reply": "вітаю"}}
+    m.clear_memory()
+    assert mgr.MemoryManager(backend="sqlite").get_all_keys() == []
+
+
+def test_backend_from_config_suffix(tmp_path, store_at):
+    db = store_at(tmp_path / "memory.db")
+    m = mgr.MemoryManager()
+    assert m._storage.name == "sqlite" and m._storage.path == db
+    m.add_thought("молоко", "свіже")
+    assert m.smart_search("молока", limit=1)[0]["text"] == "свіже"
+
+
+def test_by_tag_matches_json(tmp_path, store_at):
+    rows = [
+        ("кава", "чорна", ["я", "напій"]),
+        ("чай", "зелений", ["Я", "#"]),
+        ("мед", "гречаний", ["ягода", "50%"]),
+        ("сир", "твердий", ["_", "a"]),
+    ]
+    found = {}
+    for backend, name in (("json", "memory_store.json"), ("sqlite", "memory.db")):
+        store_at(tmp_path / backend / name)
+        m = mgr.MemoryManager(backend=backend)
+        for key, text, tags in rows:
+            m.add_thought(key, text, tags=tags)
+        found[backend] = {
+            tag: [r["text"] for r in m.search_by_tag(tag)]
+            for tag in ("я", " Я ", "#", "%", "50%", "_", "a", "напій", "ягод", "")
+        }
+    assert found["sqlite"] == found["json"]
+    assert found["sqlite"]["я"] == ["чорна", "зелений"]
+    assert found["sqlite"]["_"] == ["твердий"] and found["sqlite"]["%"] == []
+
+
+def test_key_index_sees_other_connections(store):
+    m1 = mgr.MemoryManager(backend="sqlite")
+    m1.add_thought("кава", "чорна")
+    assert m1.find_thoughts("мол") == []  # KeyIndex збудовано
+    m2 = mgr.MemoryManager(backend="sqlite")
+    m2.add_thought("молоко", "свіже")
+    assert [r["text"] for r in m1.find_thoughts("мол")] == ["свіже"]
+    m2.delete_thoughts_by_key("молоко")
+    assert m1.find_thoughts("мол") == []
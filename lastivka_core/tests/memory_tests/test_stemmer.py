@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Компільований стемер дає ті самі стеми, що й попередня реалізація
+"""
+from lastivka_core.memory import index, normalize, smart_memory
+from lastivka_core.memory.stemmer import (
+    SuffixStemmer, UA_STEMMER, _legacy_stem, _synthetic_corpus, stem_many,
+)
+
+
+def test_same_stems_as_legacy():
+    words = _synthetic_corpus(5000) + ["", "я", "ми", "кавами", "Пам’яттю", "  вода  ", "країв"]
+    for w in words:
+        assert UA_STEMMER.stem(w) == _legacy_stem(w), w
+        assert index._ua_stem(w) == _legacy_stem(w, index._UA_ENDINGS), w
+    assert stem_many(words) == [_legacy_stem(w) for w in words]
+    assert normalize.ua_stem("кавою") == "кав"
+
+
+def test_cache_and_proper_nouns():
+    st = SuffixStemmer(("ами", "а"), cache_size=8)
+    assert st.stem_many(["руками", "руками", "мама"]) == ["рук", "рук", "мам"]
+    assert st.cache_info().hits == 1
+    assert smart_memory.ua_stem("Ластівка") == "ластівка"
+    assert smart_memory.ua_stem("ластівка") == "ластівк"
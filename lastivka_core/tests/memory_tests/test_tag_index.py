@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Індекс тегів: search_by_tag і "що купити" в ask() збігаються з повним обходом пам'яті
+"""
+import random
+
+import pytest
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.record import MemoryRecord
+from lastivka_core.memory.tag_index import ALL, TagIndex
+
+TAGS = ["покупка", "напій", "їжа", "товар", "робота", "Магазин"]
+
+
+def _scan_by_tag(memory, tag):
+    return [r for arr in memory.values() for r in arr if tag in [str(x).lower() for x in r.get("tags") or []]]
+
+
+def _scan_latest(memory, priority):
+    best, best_score = None, (-1, float("-inf"))
+    for arr in memory.values():
+        for r in arr:
+            pr = max((priority.get(str(t).lower(), 0) for t in r.get("tags") or []), default=0)
+            score = (pr, r.ts)
+            if score > best_score:
+                best, best_score = r, score
+    return best
+
+
+def test_random_ops_match_full_scan():
+    rnd = random.Random(5)
+    memory = {}
+    tags = TagIndex(memory)
+    for step in range(600):
+        key = f"k{rnd.randrange(40)}"
+        if rnd.random() < 0.15 and key in memory:
+            tags.discard_key(key)
+            del memory[key]
+        else:
+            rec = MemoryRecord(key_norm=key, text=str(step), ts=float(rnd.randrange(50)),
+                               tags=rnd.sample(TAGS, rnd.randrange(3)))
+            bucket = memory.setdefault(key, [])
+            bucket.append(rec)
+            tags.add(key, len(bucket) - 1, rec)
+        for tag in ("покупка", "магазин", "робота"):
+            assert tags.records(tag) == _scan_by_tag(memory, tag)
+        prio = {"покупка": 3, "магазин": 3, "напій": 2, "їжа": 1}
+        want = _scan_latest(memory, prio)
+        got = [(pr, tags.latest(t)) for t, pr in prio.items() if tags.latest(t)]
+        if got:
+            _, (_, key, i) = max(got, key=lambda x: (x[0], x[1][0]))
+        elif tags.latest(ALL):
+            _, key, i = tags.latest(ALL)
+        else:
+            key = None
+        assert (memory[key][i] if key else None) is want
+
+
+def test_manager_uses_tag_index(store):
+    m = mgr.MemoryManager(journal=False)
+    m.add_thought("хліб", "житній", tags=["їжа"])
+    m.add_thought("кава", "чорна", tags=["Покупка", "напій"])
+    m.add_thought("чай", "зелений", tags=["напій"])
+    assert [r["key_raw"] for r in m.search_by_tag("НАПІЙ")] == ["кава", "чай"]
+    assert m.ask("що треба купити?")["text"] == "кава"
+    m.delete_thoughts_by_key("кава")
+    assert m.ask("що треба купити?")["text"] == "чай"
+    with pytest.raises(RuntimeError):
+        with m.batch():
+            m.add_thought("молоко", "свіже", tags=["покупка"])
+            raise RuntimeError
+    assert m.search_by_tag("покупка") == []
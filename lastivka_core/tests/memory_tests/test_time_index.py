@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Індекс часу: between() збігається з повним обходом, часові вирази в ask(), recency у пошуку
+"""
+import random
+from datetime import datetime, timedelta
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.index import MemoryIndex
+from lastivka_core.memory.record import MemoryRecord
+from lastivka_core.memory.time_index import TimeIndex, parse_time_range
+
+
+def test_random_ops_match_full_scan():
+    rnd = random.Random(11)
+    memory = {}
+    times = TimeIndex(memory)
+    for step in range(800):
+        key = f"k{rnd.randrange(40)}"
+        if rnd.random() < 0.15 and key in memory:
+            times.discard_key(key)
+            del memory[key]
+        else:
+            ts = None if rnd.random() < 0.05 else float(rnd.randrange(100))
+            rec = MemoryRecord(key_norm=key, text=str(step), ts=ts)
+            memory.setdefault(key, []).append(rec)
+            times.add(key, len(memory[key]) - 1, rec)
+        lo, hi = sorted(rnd.sample(range(110), 2))
+        got = sorted((ts, key, i) for ts, key, i in times.between(lo, hi))
+        want = sorted(
+            (r.ts, k, i) for k, arr in memory.items() for i, r in enumerate(arr)
+            if r.ts is not None and lo <= r.ts < hi
+        )
+        assert got == want
+    assert len(times) == sum(1 for arr in memory.values() for r in arr if r.ts is not None)
+
+
+def test_parse_time_range():
+    now = datetime(2025, 8, 20, 15, 0)  # середа
+    day = lambda y, m, d: datetime(y, m, d).timestamp()
+    assert parse_time_range("що я казав вчора", now) == (day(2025, 8, 19), day(2025, 8, 20), "що я казав")
+    start, end, rest = parse_time_range("що було минулого тижня про каву", now)
+    assert (start, end, rest) == (day(2025, 8, 11), day(2025, 8, 18), "що було про каву")
+    assert parse_time_range("в минулому місяці", now)[:2] == (day(2025, 7, 1), day(2025, 8, 1))
+    assert parse_time_range("що купити", now) is None
+
+
+def test_manager_between_and_ask(store):
+    m = mgr.MemoryManager(journal=True)
+    m.add_thought("кава", "чорна")
+    m.add_thought("чай", "зелений")
+    m.add_thought("сік", "яблучний")
+    now = datetime.now()
+    yesterday = (now - timedelta(days=1)).replace(hour=12, minute=0).timestamp()
+    # "вчора": кава і чай (чай свіжіший), сік — сьогодні
+    m.memory["кав"][0].ts = yesterday
+    m.memory["чай"][0].ts = yesterday + 60
+    m._time_index().rebuild()
+
+    assert [r["text"] for r in m.between(now - timedelta(days=2))] == ["яблучний", "зелений", "чорна"]
+    assert [r["text"] for r in m.between(end=now.date(), newest_first=False)] == ["чорна", "зелений"]
+    assert m.ask("що я казав вчора?")["text"] == "зелений"
+    assert m.ask("що я казав вчора про каву?")["text"] == "чорна"
+    assert m.ask("що було сьогодні?")["text"] == "яблучний"
+
+    m.delete_thoughts_by_key("чай")
+    assert m.ask("що я казав вчора?")["text"] == "чорна"
+
+
+def test_recency_weight_prefers_newer():
+    now = 1_700_000_000.0
+    memory = {
+        "кав": [
+            {"key_raw": "кава", "text": "чорна кава", "timestamp": datetime.fromtimestamp(now - 90 * 86400).isoformat()},
+            {"key_raw": "кава", "text": "чорна кава", "timestamp": datetime.fromtimestamp(now - 86400).isoformat()},
+        ],
+    }
+    idx = MemoryIndex(memory)
+    plain = idx.search("чорна кава", limit=2)
+    assert plain[0][2] == plain[1][2]
+    ranked = idx.search("чорна кава", limit=2, weights={"recency": 10.0, "now": now})
+    assert ranked[0][1] is memory["кав"][1] and ranked[0][2] > ranked[1][2]
+
+
+def test_index_file_keeps_timestamps(tmp_path):
+    memory = {"кав": [MemoryRecord(key_norm="кав", text="чорна", ts=1234.5), MemoryRecord(key_norm="кав", text="без часу")]}
+    built = MemoryIndex(memory)
+    assert built.save(tmp_path / "m.idx")
+    loaded = MemoryIndex(memory, build=False)
+    assert loaded.load(tmp_path / "m.idx")
+    ts = list(loaded._rec_ts)
+    assert ts[0] == 1234.5 and ts[1] != ts[1]
+    loaded.close()
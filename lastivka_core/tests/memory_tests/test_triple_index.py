@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Індекс трійок: шаблонні запити match(), один перехід join(), реляційні питання в ask()
+"""
+import random
+
+from lastivka_core.memory import manager as mgr
+from lastivka_core.memory.record import MemoryRecord
+from lastivka_core.memory.triple_index import TripleIndex, matches, pattern_terms, record_terms
+
+
+def test_index_matches_scan():
+    rnd = random.Random(3)
+    subjects, rels, objs = ["кав", "чай", "яблук", "трав"], ["is", "has", "likes"], ["зелений", "чорна", "солодке яблуко", "зелене листя"]
+    memory = {}
+    idx = TripleIndex(memory)
+    for step in range(300):
+        key = rnd.choice(subjects)
+        if rnd.random() < 0.1 and key in memory:
+            idx.discard_key(key)
+            del memory[key]
+            continue
+        rec = MemoryRecord(key_norm=key, text=str(step), triple=(key, rnd.choice(rels), rnd.choice(objs)))
+        memory.setdefault(key, []).append(rec)
+        idx.add(key, len(memory[key]) - 1, rec)
+    for pattern in [dict(), dict(subject="кав"), dict(rel="has"), dict(obj="зелене"),
+                    dict(rel="is", obj="зелений"), dict(subject="яблук", rel="likes", obj="яблуко")]:
+        s, p, o = pattern_terms(**pattern)
+        want = [(k, i) for k, arr in memory.items() for i, r in enumerate(arr)
+                if matches(record_terms(k, r), s, p, o)]
+        assert idx.match(**pattern) == want, pattern
+
+
+def test_manager_match_join_and_ask(store):
+    m = mgr.MemoryManager(journal=False)
+    m.add_thought("трава", "зелена")
+    m.add_thought("чай", "зелений")
+    m.add_thought("кава", "капучино")
+    m.add_thought("капучино", "піна", rel="has")
+    assert [r["key_raw"] for r in m.match(rel="is", obj="зелений")] == ["трава", "чай"]
+    assert [r["text"] for r in m.match(subject="Кава")] == ["капучино"]
+
+    pairs = m.join({"subject": "кава"}, {"rel": "has"})
+    assert [(a["key_raw"], b["key_raw"], b["text"]) for a, b in pairs] == [("кава", "капучино", "піна")]
+
+    m.memory["чай"][0].ts += 1  # гарантовано свіжіший за "трава"
+    assert m.ask("що в мене зелене?")["key"] == "чай"  # найсвіжіший
+    m.delete_thoughts_by_key("чай")
+    assert m.ask("що у мене зелене?")["key"] == "трава"
+    assert m.match(obj="зелений", subject="чай") == []
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+TF-IDF символьних n-грам: косинусний top-k збігається з прямим підрахунком, text_vector у пошуку
+"""
+import math
+import random
+
+import pytest
+
+from lastivka_core.memory import vector_index
+from lastivka_core.memory.index import MemoryIndex
+from lastivka_core.memory.vector_index import CharNgramVectors, ngrams
+
+WORDS = ["кава", "чорна", "молоко", "цукор", "зелений", "чай", "сир", "хліб", "житній", "мед", "гречаний"]
+
+
+def _brute(docs, query):
+    n = len(docs)
+    df = {}
+    for _, t in docs:
+        for g in ngrams(t):
+            df[g] = df.get(g, 0) + 1
+
+    def vec(t):
+        v = {g: (1 + math.log(c)) * (math.log((1 + n) / (1 + df[g])) + 1) for g, c in ngrams(t).items() if g in df}
+        norm = math.sqrt(sum(x * x for x in v.values())) or 1.0
+        return {g: x / norm for g, x in v.items()}
+
+    q = vec(query)
+    out = {}
+    for d, t in docs:
+        dv = vec(t)
+        s = sum(w * dv.get(g, 0.0) for g, w in q.items())
+        if s > 0:
+            out[d] = s
+    return out
+
+
+def test_top_k_matches_brute_force():
+    rnd = random.Random(4)
+    docs = [(d, " ".join(rnd.sample(WORDS, 3))) for d in range(200)]
+    vectors = CharNgramVectors(docs)
+    for query in ("чорна кава з цукром", "зелені чаї", "хліба житнього"):
+        got = dict(vectors.top_k(query, k=None))
+        want = _brute(docs, query)
+        assert got.keys() == want.keys()
+        # запит нормується з idf n-грам, яких немає в корпусі — відношення сталі
+        ratios = [got[d] / want[d] for d in got]
+        assert max(ratios) - min(ratios) < 1e-5
+        top = vectors.top_k(query, k=5)
+        assert [d for d, _ in top] == sorted(got, key=lambda d: (-got[d], d))[:5]
+
+
+def test_numpy_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    rnd = random.Random(7)
+    docs = [(d * 3, " ".join(rnd.sample(WORDS, rnd.randint(1, 4)))) for d in range(300)]  # id з пропусками
+
+    def scores(vectors):
+        vectors.add(1000, "чорна кава з молоком і медом")
+        vectors.discard(3)
+        return {q: vectors.top_k(q, k=None) for q in ("чорна кава з цукром", "зелені чаї", "мед", "житній хліб")}
+
+    fast = scores(CharNgramVectors(docs))
+    assert vector_index.np is not None
+    monkeypatch.setattr(vector_index, "np", None)
+    slow = scores(CharNgramVectors(docs))
+    for q in fast:
+        assert [d for d, _ in fast[q]] == [d for d, _ in slow[q]], q
+        assert all(abs(a - b) < 1e-5 for (_, a), (_, b) in zip(fast[q], slow[q])), q
+
+
+def test_delta_and_discard():
+    vectors = CharNgramVectors([(0, "чорна кава"), (1, "зелений чай")])
+    vectors.add(5, "чорна кава з молоком")
+    assert [d for d, _ in vectors.top_k("кава з молоком", k=2)] == [5, 0]
+    vectors.discard(5)
+    assert [d for d, _ in vectors.top_k("кава з молоком", k=2)] == [0]
+    assert vectors.top_k("кава", min_score=0.99) == []
+    assert len(vectors) == 2
+
+
+def test_index_text_vector_finds_typos():
+    memory = {
+        "кав": [{"key_raw": "кава", "text": "чорна без цукру"}],
+        "чай": [{"key_raw": "чай", "text": "зелений з жасмином"}],
+    }
+    idx = MemoryIndex(memory)
+    # жодного спільного токена/стема — класичний пошук не бачить запису
+    assert idx.search("жасміном зеленим", limit=1, weights={"fuzzy": 0}) == []
+    hits = idx.search("жасміном зеленим", limit=1, weights={"fuzzy": 0, "text_fuzzy": 0, "text_vector": 30})
+    assert hits and hits[0][0] == "чай"
+    assert idx.similar("чорна без цукра", limit=1)[0][0] == "кав"
+
+    memory["кав"].append({"key_raw": "кава", "text": "з жасмином і зеленим чаєм"})
+    idx.add_record("кав", 1)
+    assert {k for k, _, _ in idx.similar("жасмином зеленим", limit=2)} == {"кав", "чай"}
+    idx.remove_key("чай")
+    del memory["чай"]
+    assert [k for k, _, _ in idx.similar("жасмином зеленим", limit=2)] == ["кав"]